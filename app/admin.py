@@ -0,0 +1,85 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from config import get_admin_token, get_profile_hz, get_profile_seconds
+from constants import MAX_PROFILE_SECONDS
+from drain import is_draining, start_drain
+from profiling import (
+    DEFAULT_TOP,
+    ProfileBusyError,
+    load_worker_profiles,
+    run_profile,
+)
+from redis_client import get_redis_client
+from sessions import current_session_hub
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Пропускает запрос только с верным заголовком X-Admin-Token."""
+    token = get_admin_token()
+    if not token:
+        raise HTTPException(status_code=404, detail="Admin API is disabled")
+    if not hmac.compare_digest(x_admin_token or "", token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+
+def drain_status() -> dict:
+    """Состояние вывода шлюза из работы."""
+    hub = current_session_hub()
+    return {
+        "draining": is_draining(),
+        "sessions": 0 if hub is None else len(hub)
+    }
+
+
+@router.post("/drain")
+async def drain(timeout: Optional[float] = None):
+    """Запускает вывод шлюза из работы; завершение — по GET /admin/drain."""
+    await start_drain(timeout)
+    return drain_status()
+
+
+@router.get("/drain")
+async def get_drain_status():
+    """Возвращает состояние вывода шлюза из работы."""
+    return drain_status()
+
+
+@router.get("/profile")
+async def profile(
+    seconds: Optional[float] = Query(None, gt=0, le=MAX_PROFILE_SECONDS),
+    hz: Optional[float] = Query(None, gt=0, le=1000),
+    top: int = Query(DEFAULT_TOP, gt=0, le=500),
+    memory: bool = True,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+):
+    """Профилирует шлюз: свернутые стеки CPU и крупнейшие выделения памяти.
+
+    format=collapsed возвращает только стеки в текстовом формате
+    flamegraph.pl / speedscope.
+    """
+    try:
+        report = await run_profile(seconds or get_profile_seconds(),
+                                   hz or get_profile_hz(), top,
+                                   memory and format == "json")
+    except ProfileBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "collapsed":
+        return PlainTextResponse(report["collapsed"])
+    return report
+
+
+@router.get("/profile/workers")
+async def worker_profiles():
+    """Возвращает последние отчеты профилирования воркеров (по SIGUSR1)."""
+    redis = await get_redis_client()
+    try:
+        return await load_worker_profiles(redis)
+    finally:
+        await redis.close()
@@ -0,0 +1,84 @@
+from typing import Optional
+
+from config import (
+    get_audio_bytes_per_second,
+    get_audio_frame_size,
+    get_audio_window_ms,
+    get_audio_window_overlap_ms,
+)
+
+
+def duration_to_bytes(duration_ms: int) -> int:
+    """Переводит длительность в мс в число байт, выровненное по фрейму."""
+    frame_size = get_audio_frame_size()
+    size = get_audio_bytes_per_second() * duration_ms // 1000
+    return size - size % frame_size
+
+
+class AudioAggregator:
+    """Склеивает мелкие чанки сессии в окна фиксированного размера.
+
+    Буфер выделяется один раз под размер окна. После выдачи полного окна
+    его хвост длиной overlap_size остается в начале буфера как контекст
+    для следующего окна.
+    """
+
+    __slots__ = ("_buffer", "_window_size", "_overlap_size", "_filled",
+                 "_carried")
+
+    def __init__(self, window_size: int, overlap_size: int = 0):
+        if window_size <= 0:
+            raise ValueError("Window size must be positive")
+        if not 0 <= overlap_size < window_size:
+            raise ValueError("Overlap must be in range [0, window size)")
+        self._buffer = bytearray(window_size)
+        self._window_size = window_size
+        self._overlap_size = overlap_size
+        self._filled = 0
+        # Сколько байт в начале буфера перенесено из предыдущего окна
+        self._carried = 0
+
+    @property
+    def pending(self) -> int:
+        """Количество новых (еще не отправленных) байт в буфере."""
+        return self._filled - self._carried
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Добавляет данные и возвращает список заполненных окон."""
+        windows = []
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self._window_size - self._filled)
+            self._buffer[self._filled:self._filled + take] = view[:take]
+            self._filled += take
+            view = view[take:]
+
+            if self._filled == self._window_size:
+                windows.append(bytes(self._buffer))
+                if self._overlap_size:
+                    tail = self._window_size - self._overlap_size
+                    self._buffer[:self._overlap_size] = self._buffer[tail:]
+                self._filled = self._carried = self._overlap_size
+        return windows
+
+    def flush(self) -> Optional[bytes]:
+        """Возвращает неполное окно (если есть новые данные) и очищает буфер."""
+        if not self.pending:
+            return None
+        window = bytes(self._buffer[:self._filled])
+        # После паузы контекст предыдущего окна уже неактуален
+        self._filled = self._carried = 0
+        return window
+
+
+def create_aggregator() -> Optional[AudioAggregator]:
+    """Создает агрегатор по настройкам окружения или None, если он выключен."""
+    window_ms = get_audio_window_ms()
+    if window_ms <= 0:
+        return None
+    window_size = duration_to_bytes(window_ms)
+    if window_size <= 0:
+        return None
+    overlap_size = min(duration_to_bytes(get_audio_window_overlap_ms()),
+                       window_size - get_audio_frame_size())
+    return AudioAggregator(window_size, max(overlap_size, 0))
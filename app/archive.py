@@ -0,0 +1,318 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, Optional
+
+from config import (
+    get_archive_buffer_bytes,
+    get_archive_dir,
+    get_archive_segment_bytes,
+    get_archive_segment_seconds,
+    is_audio_archive_enabled,
+)
+from metrics import get_process_id, metrics
+
+logger = logging.getLogger(__name__)
+
+# Сегмент <имя>.seg — записи RECORD с ключом сессии и аудио; индекс
+# <имя>.idx — записи INDEX_ENTRY с ключом сессии. Индекс пишется после
+# данных и не указывает за конец сегмента; без индекса сегмент читается
+# сканированием заголовков. Имя начинается с времени создания в мс,
+# поэтому сегменты сортируются по нему.
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+# Длина ключа сессии, seq, длина аудио
+RECORD = struct.Struct("<HQI")
+# Длина ключа сессии, seq, смещение аудио в сегменте, длина аудио
+INDEX_ENTRY = struct.Struct("<HQQI")
+
+
+class ArchiveConflictError(ValueError):
+    """В архиве два разных чанка сессии с одним seq."""
+
+
+def write_block(segment_path: str, data: bytes, index_path: str,
+                index: bytes):
+    """Дописывает блок сегмента, затем его индекс (в потоке записи)."""
+    for path, block in ((segment_path, data), (index_path, index)):
+        with open(path, "ab", buffering=0) as file:
+            file.write(block)
+            os.fsync(file.fileno())
+
+
+class AudioArchiver:
+    """Пишет чанки сессий процесса в сегменты архива.
+
+    append копит записи в памяти; буфер размером buffer_bytes (или
+    по flush) уходит на диск одним последовательным блоком в отдельном
+    потоке, не занимая цикл событий. Блоки пишутся одним потоком
+    по порядку. Сегмент сменяется, когда превысит segment_bytes или
+    станет старше segment_seconds.
+    """
+
+    def __init__(self, directory: str, prefix: str, segment_bytes: int,
+                 segment_seconds: float, buffer_bytes: int):
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.buffer_bytes = buffer_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="archive")
+        self._segment: Optional[str] = None
+        self._opened_at = 0.0
+        self._created_ms = 0
+        # Размер сегмента вместе с еще не записанным буфером
+        self._size = 0
+        self._data = bytearray()
+        self._index = bytearray()
+        self._last_write: Optional[Future] = None
+
+    @property
+    def segment(self) -> Optional[str]:
+        """Путь текущего сегмента без расширения."""
+        return self._segment
+
+    def _open_segment(self, now: float):
+        self.flush()
+        # Сегменты, начатые в одну миллисекунду, получают разные имена
+        created_ms = max(int(now * 1000), self._created_ms + 1)
+        while os.path.exists(os.path.join(
+                self.directory, f"{created_ms}-{self.prefix}{SEGMENT_SUFFIX}")):
+            created_ms += 1
+        self._segment = os.path.join(
+            self.directory, f"{created_ms}-{self.prefix}")
+        self._created_ms = created_ms
+        self._opened_at = now
+        self._size = 0
+        metrics.inc("archive_segments")
+
+    def append(self, session: str, seq: int, audio: bytes):
+        """Добавляет чанк сессии в архив."""
+        key = session.encode("utf-8")
+        now = time.time()
+        if (self._segment is None
+                or (self._size and self._size + RECORD.size + len(key)
+                    + len(audio) > self.segment_bytes)
+                or now - self._opened_at >= self.segment_seconds):
+            self._open_segment(now)
+        offset = self._size + RECORD.size + len(key)
+        self._data += RECORD.pack(len(key), seq, len(audio))
+        self._data += key
+        self._data += audio
+        self._index += INDEX_ENTRY.pack(len(key), seq, offset, len(audio))
+        self._index += key
+        self._size = offset + len(audio)
+        if len(self._data) >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        """Отдает накопленный буфер потоку записи."""
+        if not self._data:
+            return
+        data, index = bytes(self._data), bytes(self._index)
+        self._data.clear()
+        self._index.clear()
+        self._last_write = self._executor.submit(
+            write_block, self._segment + SEGMENT_SUFFIX, data,
+            self._segment + INDEX_SUFFIX, index)
+        self._last_write.add_done_callback(self._written)
+
+    @staticmethod
+    def _written(future: Future):
+        error = future.exception()
+        if error is not None:
+            metrics.inc("archive_write_errors")
+            logger.error(f"Failed to write audio archive: {error}")
+            return
+        metrics.inc("archive_blocks_written")
+
+    async def close(self):
+        """Записывает остаток буфера и дожидается записи на диск."""
+        self.flush()
+        if self._last_write is not None:
+            try:
+                await asyncio.wrap_future(self._last_write)
+            except Exception:
+                pass
+        self._executor.shutdown(wait=False)
+
+
+def create_audio_archiver() -> Optional[AudioArchiver]:
+    """Создает архив аудио процесса или None, если архивирование выключено."""
+    if not is_audio_archive_enabled():
+        return None
+    return AudioArchiver(
+        get_archive_dir(),
+        get_process_id(),
+        get_archive_segment_bytes(),
+        get_archive_segment_seconds(),
+        get_archive_buffer_bytes(),
+    )
+
+
+class SegmentReader:
+    """Произвольный доступ к чанкам сегмента через отображение в память.
+
+    Чанки отдаются как memoryview поверх mmap без копирования; отданные
+    чанки остаются действительными и после close. Повторная доставка
+    чанка с тем же аудио хранится одной записью; чтение сессии, у которой
+    под одним seq записано разное аудио, завершается ArchiveConflictError.
+    """
+
+    def __init__(self, segment_path: str):
+        if segment_path.endswith(SEGMENT_SUFFIX):
+            segment_path = segment_path[:-len(SEGMENT_SUFFIX)]
+        self.path = segment_path
+        self._file = open(segment_path + SEGMENT_SUFFIX, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                     if size else b"")
+        self._view = memoryview(self._map)
+        # Ключ сессии -> {seq: (смещение, длина)}
+        self._sessions: dict[str, dict[int, tuple[int, int]]] = {}
+        # Ключ сессии -> seq, под которыми записано разное аудио
+        self._conflicts: dict[str, set[int]] = {}
+        entries = []
+        if os.path.exists(segment_path + INDEX_SUFFIX):
+            entries = list(self._read_index(segment_path + INDEX_SUFFIX))
+        # Записи за последней проиндексированной (индекс блока не успел
+        # записаться до сбоя) восстанавливаются по заголовкам
+        end = entries[-1][2] + entries[-1][3] if entries else 0
+        entries.extend(self._scan(end))
+        for session, seq, offset, length in entries:
+            if offset + length > size:
+                # Хвост сегмента, не дописанный до сбоя
+                break
+            chunks = self._sessions.setdefault(session, {})
+            known = chunks.setdefault(seq, (offset, length))
+            first = self._view[known[0]:known[0] + known[1]]
+            if first != self._view[offset:offset + length]:
+                self._conflicts.setdefault(session, set()).add(seq)
+
+    @staticmethod
+    def _read_index(path: str) -> Iterator[tuple]:
+        with open(path, "rb") as file:
+            index = file.read()
+        position = 0
+        while position + INDEX_ENTRY.size <= len(index):
+            key_length, seq, offset, length = INDEX_ENTRY.unpack_from(
+                index, position)
+            position += INDEX_ENTRY.size
+            if position + key_length > len(index):
+                break
+            session = index[position:position + key_length].decode("utf-8")
+            position += key_length
+            yield session, seq, offset, length
+
+    def _scan(self, position: int = 0) -> Iterator[tuple]:
+        """Восстанавливает индекс по заголовкам записей сегмента."""
+        while position + RECORD.size <= len(self._map):
+            key_length, seq, length = RECORD.unpack_from(self._map, position)
+            position += RECORD.size
+            if position + key_length > len(self._map):
+                break
+            session = bytes(
+                self._view[position:position + key_length]).decode("utf-8")
+            position += key_length
+            yield session, seq, position, length
+            position += length
+
+    def sessions(self) -> list[str]:
+        """Ключи сессий, чанки которых есть в сегменте."""
+        return list(self._sessions)
+
+    def _check(self, session: str):
+        conflicts = self._conflicts.get(session)
+        if conflicts:
+            raise ArchiveConflictError(
+                f"Session {session} has conflicting chunks "
+                f"{sorted(conflicts)} in {self.path}{SEGMENT_SUFFIX}")
+
+    def chunks(self, session: str) -> list[tuple[int, memoryview]]:
+        """Чанки сессии в порядке seq."""
+        self._check(session)
+        entries = self._sessions.get(session, {})
+        return [(seq, self._view[offset:offset + length])
+                for seq, (offset, length) in sorted(entries.items())]
+
+    def read(self, session: str, seq: int) -> Optional[memoryview]:
+        """Чанк сессии с номером seq или None."""
+        if seq in self._conflicts.get(session, ()):
+            self._check(session)
+        entry = self._sessions.get(session, {}).get(seq)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._view[offset:offset + length]
+
+    def close(self):
+        self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                # Отображение закроется, когда освободятся отданные чанки
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def list_segments(directory: str) -> list[str]:
+    """Сегменты каталога архива в порядке создания."""
+    names = [name for name in os.listdir(directory)
+             if name.endswith(SEGMENT_SUFFIX)]
+    return [os.path.join(directory, name) for name in sorted(
+        names, key=lambda name: (int(name.split("-", 1)[0]), name))]
+
+
+def read_session(directory: str, session: str) -> list[tuple[int, bytes]]:
+    """Все чанки сессии из сегментов архива в порядке seq.
+
+    Копии повторно доставленного чанка в разных сегментах сводятся
+    к одной; разное аудио под одним seq — ArchiveConflictError.
+    """
+    chunks: dict[int, bytes] = {}
+    for path in list_segments(directory):
+        with SegmentReader(path) as reader:
+            for seq, audio in reader.chunks(session):
+                known = chunks.setdefault(seq, bytes(audio))
+                if known != audio:
+                    raise ArchiveConflictError(
+                        f"Session {session} has conflicting chunks {seq} "
+                        f"in {path}")
+    return sorted(chunks.items())
+
+
+def main():
+    """Выгружает аудио сессии из архива для повтора или переобработки.
+
+    python archive.py /data/archive 3f2b9c0e8d7a4b61a5c4e2f1d0b9a8c7 > session.pcm
+    """
+    if len(sys.argv) != 3:
+        print("Usage: python archive.py <archive_dir> <session>",
+              file=sys.stderr)
+        sys.exit(2)
+    try:
+        chunks = read_session(sys.argv[1], sys.argv[2])
+    except ArchiveConflictError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    for _, audio in chunks:
+        sys.stdout.buffer.write(audio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import json
+import logging
+from typing import Optional
+
+from redis.exceptions import ResponseError
+
+from metrics import metrics
+from redis_client import publish_message
+from sharding import get_shard_router, load_shards, shard_channel, shard_stream
+from config import (
+    get_audio_stream_maxlen,
+    get_worker_heartbeat_interval_ms,
+    get_worker_heartbeat_ttl_ms,
+    is_audio_sharding_enabled,
+    is_audio_stream_enabled,
+)
+from constants import (
+    AUDIO_CHANNEL,
+    AUDIO_CONSUMER_GROUP,
+    AUDIO_STREAM,
+    BULK_AUDIO_CHANNEL,
+    BULK_AUDIO_STREAM,
+    WORKER_HEARTBEAT_KEY_PREFIX,
+)
+
+logger = logging.getLogger(__name__)
+
+AUDIO_STREAMS = (AUDIO_STREAM, BULK_AUDIO_STREAM)
+
+# Сколько записей чужого списка ожидающих забирается за один проход
+CLAIM_BATCH_SIZE = 100
+
+# После стольких доставок запись считается неисправимой и отбрасывается,
+# чтобы чанк, роняющий воркер, не ронял по очереди всех соседей
+MAX_DELIVERIES = 5
+
+
+async def publish_audio(redis, message: str, bulk: bool = False,
+                        key: Optional[str] = None, batcher=None):
+    """Отправляет аудио-сообщение воркерам выбранным транспортом.
+
+    С AUDIO_SHARDING интерактивное аудио сессии с ключом key попадает
+    в поток (канал) ее шарда; без живых шардов — в общий. С batcher
+    сообщение уходит в Redis общим конвейером процесса.
+    """
+    shard = None
+    if key is not None and not bulk and is_audio_sharding_enabled():
+        shard = await get_shard_router().route(redis, key)
+    if is_audio_stream_enabled():
+        if bulk:
+            stream = BULK_AUDIO_STREAM
+        else:
+            stream = AUDIO_STREAM if shard is None else shard_stream(shard)
+
+        def send(client):
+            return client.xadd(
+                stream,
+                {"data": message},
+                maxlen=get_audio_stream_maxlen(),
+                approximate=True,
+            )
+    else:
+        if bulk:
+            channel = BULK_AUDIO_CHANNEL
+        else:
+            channel = AUDIO_CHANNEL if shard is None else shard_channel(shard)
+
+        def send(client):
+            return publish_message(client, channel, message)
+
+    if batcher is not None:
+        await batcher.submit(send)
+    else:
+        await send(redis)
+
+
+async def list_audio_streams(redis) -> tuple:
+    """Потоки аудио: общие и, с шардированием, потоки всех известных шардов."""
+    if not is_audio_sharding_enabled():
+        return AUDIO_STREAMS
+    live, retired = await load_shards(redis)
+    return AUDIO_STREAMS + tuple(
+        shard_stream(shard) for shard in sorted([*live, *retired]))
+
+
+def decode_entry(fields: dict) -> dict:
+    """Разбирает аудио-сообщение из полей записи потока."""
+    return json.loads(fields[b"data"].decode("utf-8"))
+
+
+async def ensure_consumer_groups(redis, streams=AUDIO_STREAMS):
+    """Создает группу воркеров на потоках аудио, если ее еще нет."""
+    for stream in streams:
+        try:
+            await redis.xgroup_create(
+                stream, AUDIO_CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+
+def heartbeat_key(consumer: str) -> str:
+    """Ключ heartbeat воркера-потребителя в Redis."""
+    return f"{WORKER_HEARTBEAT_KEY_PREFIX}{consumer}"
+
+
+async def send_heartbeat(redis, consumer: str):
+    """Продлевает heartbeat воркера на срок WORKER_HEARTBEAT_TTL_MS."""
+    await redis.set(
+        heartbeat_key(consumer), 1, px=get_worker_heartbeat_ttl_ms())
+
+
+def consumer_name(consumer: dict) -> str:
+    """Имя потребителя из ответа XINFO CONSUMERS."""
+    name = consumer["name"]
+    return name.decode("utf-8") if isinstance(name, bytes) else name
+
+
+async def claim_dead_consumers(redis, consumer: str,
+                               streams=AUDIO_STREAMS) -> list:
+    """Забирает себе ожидающие записи воркеров, переставших слать heartbeat.
+
+    Возвращает список (поток, id, поля) перехваченных записей. Записи,
+    доставленные больше MAX_DELIVERIES раз, подтверждаются без обработки.
+    """
+    claimed = []
+    min_idle_ms = get_worker_heartbeat_interval_ms()
+    for stream in streams:
+        for info in await redis.xinfo_consumers(stream, AUDIO_CONSUMER_GROUP):
+            name = consumer_name(info)
+            if name == consumer or await redis.exists(heartbeat_key(name)):
+                continue
+            if not info["pending"]:
+                # Упавший воркер без незавершенной работы больше не нужен
+                await redis.xgroup_delconsumer(
+                    stream, AUDIO_CONSUMER_GROUP, name)
+                continue
+
+            pending = await redis.xpending_range(
+                stream, AUDIO_CONSUMER_GROUP, min="-", max="+",
+                count=CLAIM_BATCH_SIZE, consumername=name)
+            poisoned = [entry["message_id"] for entry in pending
+                        if entry["times_delivered"] >= MAX_DELIVERIES]
+            if poisoned:
+                await redis.xack(stream, AUDIO_CONSUMER_GROUP, *poisoned)
+                metrics.inc("chunks_dead_lettered", len(poisoned))
+                logger.error(
+                    f"Dropped {len(poisoned)} entries of {stream} delivered "
+                    f"{MAX_DELIVERIES} times without acknowledgement")
+            ids = [entry["message_id"] for entry in pending
+                   if entry["times_delivered"] < MAX_DELIVERIES]
+            if not ids:
+                continue
+
+            # min_idle_time не дает двум соседям забрать одну запись:
+            # перехват обнуляет время простоя записи
+            entries = await redis.xclaim(
+                stream, AUDIO_CONSUMER_GROUP, consumer, min_idle_ms, ids)
+            for entry_id, fields in entries:
+                if fields is None:
+                    # Запись уже вытеснена из потока по MAXLEN
+                    await redis.xack(stream, AUDIO_CONSUMER_GROUP, entry_id)
+                    continue
+                claimed.append((stream, entry_id, fields))
+            if entries:
+                logger.warning(
+                    f"Claimed {len(entries)} pending entries of {stream} "
+                    f"from dead worker {name}")
+    if claimed:
+        metrics.inc("chunks_reclaimed", len(claimed))
+    return claimed
@@ -0,0 +1,80 @@
+import math
+from typing import Optional
+
+# Доля производительности воркера, на которую рассчитывается поток
+# без очереди: запас на всплески поступления
+TARGET_UTILIZATION = 0.8
+
+
+class Autoscaler:
+    """Выбирает число процессов воркера по статусу очереди аудио.
+
+    Производительность одного воркера оценивается, пока воркеры загружены
+    (в очереди больше записей, чем воркеров). Если очередь не разбирается
+    за target_drain секунд, число процессов сразу поднимается до нужного;
+    уменьшается оно по одному и не чаще раза в cooldown секунд, чтобы
+    не раскачиваться на колебаниях нагрузки.
+    """
+
+    __slots__ = ("min_workers", "max_workers", "target_drain", "cooldown",
+                 "settle", "per_worker_rate", "_last_change")
+
+    def __init__(self, min_workers: int, max_workers: int,
+                 target_drain: float, cooldown: float, settle: float):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_drain = target_drain
+        self.cooldown = cooldown
+        # Сколько скорость обработки отражает прежнее число процессов
+        self.settle = settle
+        self.per_worker_rate: Optional[float] = None
+        self._last_change = -math.inf
+
+    def clamp(self, workers: int) -> int:
+        """Ограничивает число процессов границами min_workers..max_workers."""
+        return max(self.min_workers, min(self.max_workers, workers))
+
+    def _update_capacity(self, status: dict, current: int, now: float):
+        """Уточняет производительность воркера, если все воркеры заняты."""
+        processing_rate = status["processing_rate"]
+        if (processing_rate is None or processing_rate <= 0
+                or status["backlog"] <= current
+                or now - self._last_change < self.settle):
+            return
+        rate = processing_rate / current
+        if self.per_worker_rate is None:
+            self.per_worker_rate = rate
+        else:
+            self.per_worker_rate = (self.per_worker_rate + rate) / 2
+
+    def decide(self, status: dict, current: int, now: float) -> int:
+        """Возвращает желаемое число процессов воркера."""
+        self._update_capacity(status, current, now)
+        backlog = status["backlog"]
+        arrival_rate = status["arrival_rate"] or 0.0
+        eta = status["drain_eta_s"]
+
+        if backlog > current and (eta is None or eta > self.target_drain):
+            if self.per_worker_rate is None:
+                # Пока производительность неизвестна, растем по одному
+                # процессу за время установления скорости
+                settled = now - self._last_change >= self.settle
+                desired = current + 1 if settled else current
+            else:
+                desired = math.ceil(
+                    (arrival_rate + backlog / self.target_drain)
+                    / self.per_worker_rate)
+                desired = max(desired, current + 1)
+            desired = self.clamp(desired)
+        elif (self.per_worker_rate is not None
+              and now - self._last_change >= self.cooldown
+              and backlog <= current):
+            needed = math.ceil(
+                arrival_rate / (self.per_worker_rate * TARGET_UTILIZATION))
+            desired = self.clamp(current - 1 if needed < current else current)
+        else:
+            desired = self.clamp(current)
+
+        if desired != current:
+            self._last_change = now
+        return desired
@@ -0,0 +1,32 @@
+import random
+
+# Процесс, проработавший дольше этого срока, перезапускается без задержки
+# предыдущих сбоев
+STABLE_RUN_S = 10.0
+
+
+class Backoff:
+    """Экспоненциальная задержка перезапуска со случайной составляющей.
+
+    Задержка удваивается от base до cap; выдается ее половина плюс
+    случайная доля второй половины, чтобы перезапуски многих процессов
+    после общего сбоя (например, Redis) не совпадали по времени.
+    """
+
+    __slots__ = ("base", "cap", "attempt")
+
+    def __init__(self, base: float, cap: float):
+        self.base = base
+        self.cap = cap
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        """Возвращает задержку очередного перезапуска в секундах."""
+        delay = min(self.cap, self.base * 2 ** self.attempt)
+        if delay < self.cap:
+            self.attempt += 1
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def reset(self):
+        """Сбрасывает задержку к начальной после устойчивой работы."""
+        self.attempt = 0
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+from config import (
+    get_publish_batch_linger_ms,
+    get_publish_batch_max_size,
+    is_publish_batching_enabled,
+)
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Границы бакетов гистограммы размеров конвейеров (сообщений)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class PublishBatcher:
+    """Собирает публикации процесса в общие конвейеры Redis.
+
+    Каждая публикация — функция fill(pipe), добавляющая в конвейер свои
+    команды. Первая публикация после простоя ждет попутчиков до linger
+    секунд (или до max_batch публикаций), затем все накопленное уходит
+    одним конвейером за один круг до Redis. Пока конвейер в пути, новые
+    публикации копятся и уходят следующим без ожидания. Конвейеры
+    отправляются строго по очереди и в порядке вызова submit, поэтому
+    порядок сообщений каждой сессии сохраняется.
+    """
+
+    def __init__(self, redis, max_batch: int, linger: float):
+        self.redis = redis
+        self.max_batch = max(1, max_batch)
+        self.linger = linger
+        self._pending: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, fill: Callable) -> list:
+        """Добавляет команды fill(pipe) в ближайший конвейер.
+
+        Возвращает результаты этих команд или поднимает ошибку первой
+        неудачной из них. Отмена ожидания не отзывает уже поставленные
+        в очередь команды.
+        """
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((fill, future))
+        if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if (self.linger > 0 and not self._closing
+                    and len(self._pending) < self.max_batch):
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.linger)
+                except asyncio.TimeoutError:
+                    pass
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(
+                    min(len(self._pending), self.max_batch))]
+                await self._execute(batch)
+            self._wakeup.clear()
+            if self._closing:
+                return
+
+    async def _execute(self, batch: list):
+        """Отправляет публикации одним конвейером и раздает результаты."""
+        metrics.observe("publish_batch_size", len(batch), BATCH_SIZE_BUCKETS)
+        metrics.inc("publish_batches")
+        metrics.inc("publish_batched_messages", len(batch))
+        spans = []
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for fill, future in batch:
+                    start = len(pipe)
+                    try:
+                        fill(pipe)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    spans.append((start, len(pipe)))
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            logger.error(f"Failed to publish batch of {len(batch)}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), (start, end) in zip(batch, spans):
+            if future.done():
+                continue
+            replies = results[start:end]
+            error = next(
+                (reply for reply in replies if isinstance(reply, Exception)),
+                None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(replies)
+
+    async def close(self):
+        """Отправляет накопленные публикации и останавливает отправку."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        self._closing = True
+        self._wakeup.set()
+        await task
+
+
+def create_publish_batcher(redis) -> Optional[PublishBatcher]:
+    """Создает пакетную публикацию процесса или None, если она выключена."""
+    if not is_publish_batching_enabled():
+        return None
+    return PublishBatcher(
+        redis, get_publish_batch_max_size(),
+        get_publish_batch_linger_ms() / 1000)
+
+
+async def execute_commands(redis, batcher: Optional[PublishBatcher],
+                           fill: Callable) -> list:
+    """Выполняет команды fill(pipe): общим конвейером или своим."""
+    if batcher is not None:
+        return await batcher.submit(fill)
+    async with redis.pipeline(transaction=False) as pipe:
+        fill(pipe)
+        return await pipe.execute()
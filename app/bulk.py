@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+import uuid
+from typing import AsyncIterator
+
+from audio_queue import publish_audio
+from config import get_bulk_max_jobs
+from redis_client import create_pubsub, transcript_channel
+
+logger = logging.getLogger(__name__)
+
+# Лимит пакетных задач отделен от интерактивных WebSocket-сессий,
+# поэтому бэкфилл не может занять ресурсы живого трафика
+_active_bulk_jobs = 0
+
+
+def try_acquire_bulk_slot() -> bool:
+    """Занимает слот пакетной задачи без ожидания; False, если слотов нет."""
+    global _active_bulk_jobs
+    if _active_bulk_jobs >= get_bulk_max_jobs():
+        return False
+    _active_bulk_jobs += 1
+    return True
+
+
+def release_bulk_slot():
+    """Освобождает слот пакетной задачи."""
+    global _active_bulk_jobs
+    _active_bulk_jobs -= 1
+
+
+async def iter_chunks(
+    stream: AsyncIterator[bytes], chunk_size: int
+) -> AsyncIterator[bytes]:
+    """Нарезает поток байт произвольными кусками на чанки chunk_size."""
+    buffer = bytearray()
+    async for piece in stream:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def ndjson_line(data: dict) -> bytes:
+    """Кодирует объект в строку NDJSON."""
+    return json.dumps(data).encode("utf-8") + b"\n"
+
+
+class BulkJob:
+    """Пакетная транскрипция одного потока аудио через воркеры.
+
+    Тело запроса читается по мере отправки чанков: не больше max_inflight
+    чанков ждут транскрипта одновременно, поэтому файл целиком в память
+    не загружается. Транскрипты отдаются в порядке готовности.
+    """
+
+    def __init__(self, redis, chunk_size: int, max_inflight: int,
+                 result_timeout: float):
+        self.job_id = f"bulk-{uuid.uuid4().hex}"
+        self._redis = redis
+        self._chunk_size = chunk_size
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._result_timeout = result_timeout
+        self._published = 0
+        self._size = 0
+        self._last_publish = time.monotonic()
+
+    async def _produce(self, body: AsyncIterator[bytes]):
+        """Читает тело запроса и публикует чанки в канал пакетной обработки."""
+        async for chunk in iter_chunks(body, self._chunk_size):
+            await self._inflight.acquire()
+            await publish_audio(
+                self._redis,
+                json.dumps({
+                    "client_id": self.job_id,
+                    "audio": base64.b64encode(chunk).decode("utf-8"),
+                    "seq": self._published
+                }),
+                bulk=True,
+            )
+            self._published += 1
+            self._size += len(chunk)
+            self._last_publish = time.monotonic()
+        logger.info(
+            f"Bulk job {self.job_id} published {self._published} chunks, "
+            f"{self._size} bytes")
+
+    async def run(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Запускает задачу и выдает строки NDJSON с транскриптами."""
+        pubsub = create_pubsub(self._redis)
+        channel = transcript_channel(self.job_id)
+        # Подписываемся до публикации, чтобы не потерять ранние транскрипты
+        await pubsub.subscribe(channel)
+        producer = asyncio.create_task(self._produce(body))
+        received = 0
+        # seq, транскрипт которых уже отдан: повторная доставка чанка
+        # не освобождает место второй раз
+        seen = set()
+        last_progress = time.monotonic()
+
+        try:
+            while not producer.done() or received < self._published:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0)
+
+                if message is None:
+                    if producer.done() and producer.exception() is not None:
+                        error = producer.exception()
+                        logger.error(f"Bulk job {self.job_id} failed: {error}")
+                        yield ndjson_line({
+                            "job_id": self.job_id,
+                            "status": "error",
+                            "error": f"Failed to read audio: {error}"
+                        })
+                        return
+                    idle = time.monotonic() - max(last_progress,
+                                                  self._last_publish)
+                    if received < self._published and (
+                        idle > self._result_timeout
+                    ):
+                        yield ndjson_line({
+                            "job_id": self.job_id,
+                            "status": "error",
+                            "error": "Timed out waiting for transcripts"
+                        })
+                        return
+                    continue
+
+                transcript = json.loads(message["data"].decode("utf-8"))
+                if transcript.get("client_id") != self.job_id:
+                    continue
+                seq = transcript.get("seq")
+                if seq is None or seq in seen:
+                    # Транскрипты без seq не отвечают ни на один чанк
+                    continue
+                seen.add(seq)
+
+                received += 1
+                last_progress = time.monotonic()
+                self._inflight.release()
+                yield ndjson_line({
+                    "job_id": self.job_id,
+                    "seq": transcript.get("seq"),
+                    "text": transcript["text"],
+                    "status": "transcript"
+                })
+
+            yield ndjson_line({
+                "job_id": self.job_id,
+                "status": "completed",
+                "chunks": received,
+                "size": self._size
+            })
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except (asyncio.CancelledError, Exception):
+                pass
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
@@ -0,0 +1,147 @@
+from typing import Optional
+
+from config import (
+    get_audio_bytes_per_second,
+    get_audio_frame_size,
+    get_chunk_hint_initial_ms,
+    get_chunk_hint_max_ms,
+    get_chunk_hint_min_ms,
+    get_chunk_hint_target_latency_ms,
+    get_max_audio_size,
+    is_chunk_hints_enabled,
+)
+from metrics import metrics
+
+# Вес нового замера в скользящем среднем задержки воркеров
+LATENCY_SMOOTHING = 0.2
+# Шаги изменения рекомендации: рост при перегрузке, спад при запасе
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.8
+# Доля целевой задержки, ниже которой чанк уменьшается
+SHRINK_BELOW = 0.5
+# Доля, на которую очередь должна вырасти между замерами (или приход —
+# превысить обработку), чтобы считать воркеры перегруженными
+OVERLOAD_MARGIN = 0.1
+
+
+class ChunkAdvisor:
+    """Подбирает рекомендуемую клиентам длительность чанка.
+
+    Задержка транскрипта складывается из длительности чанка (клиент копит
+    аудио) и задержки воркеров: от публикации чанка до его транскрипта.
+    Пока задержка воркеров ниже половины target_latency, чанк уменьшается,
+    сокращая ожидание клиента. Когда она выше цели или очередь воркеров
+    растет, чанк растет: сообщений становится меньше, и накладные
+    расходы на каждое (шлюз, Redis, воркер) перестают съедать пропускную
+    способность. Рекомендация не выходит из [min_ms, max_ms].
+    """
+
+    __slots__ = ("min_ms", "max_ms", "target_latency", "chunk_ms",
+                 "latency", "_samples", "_backlog")
+
+    def __init__(self, min_ms: int, max_ms: int, initial_ms: int,
+                 target_latency: float):
+        if not 0 < min_ms <= max_ms:
+            raise ValueError("Chunk hint range must be 0 < min <= max")
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.target_latency = target_latency
+        self.chunk_ms = min(max(initial_ms, min_ms), max_ms)
+        # Скользящее среднее задержки воркеров, в секундах
+        self.latency: Optional[float] = None
+        # Замеров с последнего пересчета
+        self._samples = 0
+        # Очередь воркеров в прошлом статусе (None — неизвестна)
+        self._backlog: Optional[int] = None
+
+    def observe(self, latency: float):
+        """Учитывает задержку воркеров для одного чанка."""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        self._samples += 1
+
+    def update(self, status: Optional[dict] = None) -> bool:
+        """Пересчитывает рекомендацию; True — она изменилась.
+
+        status — статус очереди, опубликованный супервизором воркеров
+        (None — неизвестен). Без новых замеров задержки рекомендация
+        меняется только при растущей очереди.
+        """
+        overloaded = self._overloaded(status)
+        measured = self._samples > 0
+        self._samples = 0
+        chunk_ms = self.chunk_ms
+        if overloaded or (measured and self.latency > self.target_latency):
+            chunk_ms = round(chunk_ms * GROW_FACTOR)
+        elif measured and self.latency < self.target_latency * SHRINK_BELOW:
+            chunk_ms = round(chunk_ms * SHRINK_FACTOR)
+        chunk_ms = min(max(chunk_ms, self.min_ms), self.max_ms)
+        if self.latency is not None:
+            metrics.set_gauge("worker_latency_ms", round(self.latency * 1000))
+        if chunk_ms == self.chunk_ms:
+            return False
+        self.chunk_ms = chunk_ms
+        metrics.set_gauge("chunk_hint_ms", chunk_ms)
+        return True
+
+    def _overloaded(self, status: Optional[dict]) -> bool:
+        """Растет ли очередь воркеров.
+
+        drain_eta_s равен None и при равновесии прихода и обработки, и до
+        первого замера скорости, поэтому перегрузкой считается только очередь,
+        заметно выросшая с прошлого статуса, или приход, заметно
+        опережающий обработку.
+        """
+        previous = self._backlog
+        if status is None:
+            self._backlog = None
+            return False
+        backlog = status.get("backlog", 0)
+        self._backlog = backlog
+        if backlog == 0 or status.get("drain_eta_s") is not None:
+            return False
+        if previous is not None and backlog > previous * (1 + OVERLOAD_MARGIN):
+            return True
+        arrival = status.get("arrival_rate")
+        processing = status.get("processing_rate")
+        return (arrival is not None and processing is not None
+                and arrival > processing * (1 + OVERLOAD_MARGIN))
+
+    def hint(self, audio_format=None, with_size: bool = True) -> dict:
+        """Сообщение с рекомендацией для клиента.
+
+        chunk_bytes считается для объявленного клиентом формата
+        (audio_format) или формата воркеров и не превышает MAX_AUDIO_SIZE;
+        chunk_ms тогда уточняется по нему.
+        """
+        max_bytes = get_max_audio_size()
+        message = {"status": "chunk_hint", "chunk_ms": self.chunk_ms,
+                   "max_bytes": max_bytes}
+        if with_size:
+            if audio_format is None:
+                rate = get_audio_bytes_per_second()
+                frame_size = get_audio_frame_size()
+            else:
+                frame_size = audio_format.frame_size
+                rate = audio_format.sample_rate * frame_size
+            size = min(rate * self.chunk_ms // 1000, max_bytes)
+            size = max(size - size % frame_size, frame_size)
+            message["chunk_ms"] = max(1, size * 1000 // rate)
+            message["chunk_bytes"] = size
+        if self.latency is not None:
+            message["worker_latency_ms"] = round(self.latency * 1000)
+        return message
+
+
+def create_chunk_advisor() -> Optional[ChunkAdvisor]:
+    """Создает подбор длительности чанка или None, если он выключен."""
+    if not is_chunk_hints_enabled():
+        return None
+    return ChunkAdvisor(
+        get_chunk_hint_min_ms(),
+        get_chunk_hint_max_ms(),
+        get_chunk_hint_initial_ms(),
+        get_chunk_hint_target_latency_ms() / 1000,
+    )
@@ -1,13 +1,256 @@
+import json
 import os
 from dotenv import load_dotenv
 
-from constants import DEFAULT_MAX_AUDIO_SIZE_BYTES
+from constants import (
+    DEFAULT_ARCHIVE_BUFFER_BYTES,
+    DEFAULT_ARCHIVE_DIR,
+    DEFAULT_ARCHIVE_FLUSH_MS,
+    DEFAULT_ARCHIVE_SEGMENT_BYTES,
+    DEFAULT_ARCHIVE_SEGMENT_SECONDS,
+    DEFAULT_AUDIO_CHANNELS,
+    DEFAULT_AUDIO_IDLE_FLUSH_MS,
+    DEFAULT_AUDIO_SAMPLE_RATE,
+    DEFAULT_AUDIO_SAMPLE_WIDTH,
+    DEFAULT_AUDIO_STREAM_MAXLEN,
+    DEFAULT_AUDIO_TRANSPORT,
+    DEFAULT_AUDIO_WINDOW_MS,
+    DEFAULT_AUDIO_WINDOW_OVERLAP_MS,
+    DEFAULT_BULK_CHUNK_SIZE_BYTES,
+    DEFAULT_BULK_MAX_INFLIGHT,
+    DEFAULT_BULK_MAX_JOBS,
+    DEFAULT_BULK_RESULT_TIMEOUT_S,
+    DEFAULT_BULK_WORKER_CONCURRENCY,
+    DEFAULT_CHUNK_HINT_INITIAL_MS,
+    DEFAULT_CHUNK_HINT_INTERVAL_S,
+    DEFAULT_CHUNK_HINT_MAX_MS,
+    DEFAULT_CHUNK_HINT_MIN_MS,
+    DEFAULT_CHUNK_HINT_TARGET_LATENCY_MS,
+    DEFAULT_DEDUP_MAX_SESSIONS,
+    DEFAULT_DEDUP_TTL_S,
+    DEFAULT_DEDUP_WINDOW,
+    DEFAULT_DRAIN_TIMEOUT_S,
+    DEFAULT_GATEWAY_BACKLOG,
+    DEFAULT_GATEWAY_HOST,
+    DEFAULT_GATEWAY_PROCESSES,
+    DEFAULT_HISTORY_BATCH_SIZE,
+    DEFAULT_HISTORY_FLUSH_MS,
+    DEFAULT_HISTORY_MAXLEN,
+    DEFAULT_HISTORY_TTL_S,
+    DEFAULT_LOOP_MONITOR_INTERVAL_MS,
+    DEFAULT_MAX_AUDIO_SIZE_BYTES,
+    DEFAULT_MAX_UPLOAD_SIZE_BYTES,
+    DEFAULT_MUX_MAX_STREAMS,
+    DEFAULT_PROFILE_HZ,
+    DEFAULT_PROFILE_SECONDS,
+    DEFAULT_PUBLISH_BATCH_LINGER_MS,
+    DEFAULT_PUBLISH_BATCH_MAX_SIZE,
+    DEFAULT_RATE_LIMIT_BURST_S,
+    DEFAULT_RATE_LIMIT_TIER,
+    DEFAULT_RATE_LIMIT_TIERS,
+    DEFAULT_REORDER_BUFFER_SIZE,
+    DEFAULT_REORDER_TIMEOUT_MS,
+    DEFAULT_REPLAY_BUFFER_SIZE,
+    DEFAULT_SESSION_RESUME_TTL_S,
+    DEFAULT_SHARD_REFRESH_MS,
+    DEFAULT_SHARD_TTL_MS,
+    DEFAULT_SHARD_VNODES,
+    DEFAULT_SLOW_CALLBACK_MS,
+    DEFAULT_STREAMING_IDLE_TIMEOUT_S,
+    DEFAULT_STREAMING_MAX_SESSIONS,
+    DEFAULT_STREAMING_MAX_UTTERANCE_MS,
+    DEFAULT_STREAMING_SILENCE_LEVEL,
+    DEFAULT_TRANSCRIPT_CACHE_MAX_BYTES,
+    DEFAULT_TRANSCRIPT_CACHE_TTL_S,
+    DEFAULT_TRANSCRIPT_CHANNEL_SHARDS,
+    DEFAULT_WORKER_HEARTBEAT_INTERVAL_MS,
+    DEFAULT_WORKER_HEARTBEAT_TTL_MS,
+    DEFAULT_WORKER_MAX_PROCESSES,
+    DEFAULT_WORKER_METRICS_INTERVAL_S,
+    DEFAULT_WORKER_MIN_PROCESSES,
+    DEFAULT_WORKER_PROCESSES,
+    DEFAULT_WORKER_RESTART_BASE_MS,
+    DEFAULT_WORKER_RESTART_MAX_MS,
+    DEFAULT_WORKER_SCALE_DOWN_COOLDOWN_S,
+    DEFAULT_WORKER_STATUS_INTERVAL_S,
+    DEFAULT_WORKER_TARGET_DRAIN_S,
+    DEFAULT_WS_HEARTBEAT_INTERVAL_S,
+    DEFAULT_WS_IDLE_TIMEOUT_S,
+    DEFAULT_WS_PING_INTERVAL_S,
+    DEFAULT_WS_PING_TIMEOUT_S,
+)
 
 load_dotenv()
 
 APP_PORT = int(os.getenv("APP_PORT", "8000"))
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+REDIS_CLUSTER = os.getenv("REDIS_CLUSTER", "0") == "1"
+TRANSCRIPT_CHANNEL_SHARDS = int(
+    os.getenv("TRANSCRIPT_CHANNEL_SHARDS",
+              str(DEFAULT_TRANSCRIPT_CHANNEL_SHARDS)))
+PUBLISH_BATCHING = os.getenv("PUBLISH_BATCHING", "0") == "1"
+PUBLISH_BATCH_MAX_SIZE = int(
+    os.getenv("PUBLISH_BATCH_MAX_SIZE", str(DEFAULT_PUBLISH_BATCH_MAX_SIZE)))
+PUBLISH_BATCH_LINGER_MS = float(
+    os.getenv("PUBLISH_BATCH_LINGER_MS", str(DEFAULT_PUBLISH_BATCH_LINGER_MS)))
 MAX_AUDIO_SIZE = int(os.getenv("MAX_AUDIO_SIZE", str(DEFAULT_MAX_AUDIO_SIZE_BYTES)))
+MAX_UPLOAD_SIZE = int(
+    os.getenv("MAX_UPLOAD_SIZE", str(DEFAULT_MAX_UPLOAD_SIZE_BYTES)))
+
+AUDIO_SAMPLE_RATE = int(
+    os.getenv("AUDIO_SAMPLE_RATE", str(DEFAULT_AUDIO_SAMPLE_RATE)))
+AUDIO_SAMPLE_WIDTH = int(
+    os.getenv("AUDIO_SAMPLE_WIDTH", str(DEFAULT_AUDIO_SAMPLE_WIDTH)))
+AUDIO_CHANNELS = int(os.getenv("AUDIO_CHANNELS", str(DEFAULT_AUDIO_CHANNELS)))
+AUDIO_WINDOW_MS = int(os.getenv("AUDIO_WINDOW_MS", str(DEFAULT_AUDIO_WINDOW_MS)))
+AUDIO_WINDOW_OVERLAP_MS = int(
+    os.getenv("AUDIO_WINDOW_OVERLAP_MS", str(DEFAULT_AUDIO_WINDOW_OVERLAP_MS)))
+AUDIO_IDLE_FLUSH_MS = int(
+    os.getenv("AUDIO_IDLE_FLUSH_MS", str(DEFAULT_AUDIO_IDLE_FLUSH_MS)))
+
+BULK_CHUNK_SIZE = int(
+    os.getenv("BULK_CHUNK_SIZE", str(DEFAULT_BULK_CHUNK_SIZE_BYTES)))
+BULK_MAX_JOBS = int(os.getenv("BULK_MAX_JOBS", str(DEFAULT_BULK_MAX_JOBS)))
+BULK_MAX_INFLIGHT = int(
+    os.getenv("BULK_MAX_INFLIGHT", str(DEFAULT_BULK_MAX_INFLIGHT)))
+BULK_RESULT_TIMEOUT = float(
+    os.getenv("BULK_RESULT_TIMEOUT", str(DEFAULT_BULK_RESULT_TIMEOUT_S)))
+BULK_WORKER_CONCURRENCY = int(
+    os.getenv("BULK_WORKER_CONCURRENCY", str(DEFAULT_BULK_WORKER_CONCURRENCY)))
+MUX_MAX_STREAMS = int(os.getenv("MUX_MAX_STREAMS", str(DEFAULT_MUX_MAX_STREAMS)))
+WS_HEARTBEAT_INTERVAL = float(
+    os.getenv("WS_HEARTBEAT_INTERVAL", str(DEFAULT_WS_HEARTBEAT_INTERVAL_S)))
+WS_IDLE_TIMEOUT = float(
+    os.getenv("WS_IDLE_TIMEOUT", str(DEFAULT_WS_IDLE_TIMEOUT_S)))
+WS_PING_INTERVAL = float(
+    os.getenv("WS_PING_INTERVAL", str(DEFAULT_WS_PING_INTERVAL_S)))
+WS_PING_TIMEOUT = float(
+    os.getenv("WS_PING_TIMEOUT", str(DEFAULT_WS_PING_TIMEOUT_S)))
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", str(DEFAULT_DRAIN_TIMEOUT_S)))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+RATE_LIMIT_TIERS = json.loads(
+    os.getenv("RATE_LIMIT_TIERS", json.dumps(DEFAULT_RATE_LIMIT_TIERS)))
+RATE_LIMIT_DEFAULT_TIER = os.getenv(
+    "RATE_LIMIT_DEFAULT_TIER", DEFAULT_RATE_LIMIT_TIER)
+RATE_LIMIT_BURST = float(
+    os.getenv("RATE_LIMIT_BURST", str(DEFAULT_RATE_LIMIT_BURST_S)))
+RATE_LIMIT_REDIS = os.getenv("RATE_LIMIT_REDIS", "0") == "1"
+# Тарифы API-ключей: "ключ:тариф,ключ:тариф"
+API_KEY_TIERS = dict(
+    entry.strip().split(":", 1)
+    for entry in os.getenv("API_KEY_TIERS", "").split(",") if entry.strip()
+)
+
+TRANSCRIPT_REORDER = os.getenv("TRANSCRIPT_REORDER", "0") == "1"
+REORDER_BUFFER_SIZE = int(
+    os.getenv("REORDER_BUFFER_SIZE", str(DEFAULT_REORDER_BUFFER_SIZE)))
+REORDER_TIMEOUT_MS = int(
+    os.getenv("REORDER_TIMEOUT_MS", str(DEFAULT_REORDER_TIMEOUT_MS)))
+
+SESSION_RESUME_TTL = int(
+    os.getenv("SESSION_RESUME_TTL", str(DEFAULT_SESSION_RESUME_TTL_S)))
+REPLAY_BUFFER_SIZE = int(
+    os.getenv("REPLAY_BUFFER_SIZE", str(DEFAULT_REPLAY_BUFFER_SIZE)))
+
+TRANSCRIPT_CACHE_MAX_BYTES = int(
+    os.getenv("TRANSCRIPT_CACHE_MAX_BYTES",
+              str(DEFAULT_TRANSCRIPT_CACHE_MAX_BYTES)))
+TRANSCRIPT_CACHE_REDIS = os.getenv("TRANSCRIPT_CACHE_REDIS", "0") == "1"
+TRANSCRIPT_CACHE_TTL = int(
+    os.getenv("TRANSCRIPT_CACHE_TTL", str(DEFAULT_TRANSCRIPT_CACHE_TTL_S)))
+WORKER_METRICS_INTERVAL = int(
+    os.getenv("WORKER_METRICS_INTERVAL", str(DEFAULT_WORKER_METRICS_INTERVAL_S)))
+DEDUP_WINDOW = int(os.getenv("DEDUP_WINDOW", str(DEFAULT_DEDUP_WINDOW)))
+DEDUP_MAX_SESSIONS = int(
+    os.getenv("DEDUP_MAX_SESSIONS", str(DEFAULT_DEDUP_MAX_SESSIONS)))
+DEDUP_REDIS = os.getenv("DEDUP_REDIS", "0") == "1"
+DEDUP_TTL = int(os.getenv("DEDUP_TTL", str(DEFAULT_DEDUP_TTL_S)))
+
+AUDIO_TRANSPORT = os.getenv("AUDIO_TRANSPORT", DEFAULT_AUDIO_TRANSPORT)
+AUDIO_STREAM_MAXLEN = int(
+    os.getenv("AUDIO_STREAM_MAXLEN", str(DEFAULT_AUDIO_STREAM_MAXLEN)))
+WORKER_HEARTBEAT_INTERVAL_MS = int(
+    os.getenv("WORKER_HEARTBEAT_INTERVAL_MS",
+              str(DEFAULT_WORKER_HEARTBEAT_INTERVAL_MS)))
+WORKER_HEARTBEAT_TTL_MS = int(
+    os.getenv("WORKER_HEARTBEAT_TTL_MS", str(DEFAULT_WORKER_HEARTBEAT_TTL_MS)))
+WORKER_PROCESSES = int(
+    os.getenv("WORKER_PROCESSES", str(DEFAULT_WORKER_PROCESSES)))
+WORKER_RESTART_BASE_MS = int(
+    os.getenv("WORKER_RESTART_BASE_MS", str(DEFAULT_WORKER_RESTART_BASE_MS)))
+WORKER_RESTART_MAX_MS = int(
+    os.getenv("WORKER_RESTART_MAX_MS", str(DEFAULT_WORKER_RESTART_MAX_MS)))
+WORKER_SLOT = os.getenv("WORKER_SLOT")
+WORKER_STATUS_INTERVAL = float(
+    os.getenv("WORKER_STATUS_INTERVAL", str(DEFAULT_WORKER_STATUS_INTERVAL_S)))
+WORKER_AUTOSCALE = os.getenv("WORKER_AUTOSCALE", "0") == "1"
+WORKER_MIN_PROCESSES = int(
+    os.getenv("WORKER_MIN_PROCESSES", str(DEFAULT_WORKER_MIN_PROCESSES)))
+WORKER_MAX_PROCESSES = int(
+    os.getenv("WORKER_MAX_PROCESSES", str(DEFAULT_WORKER_MAX_PROCESSES)))
+WORKER_TARGET_DRAIN = float(
+    os.getenv("WORKER_TARGET_DRAIN", str(DEFAULT_WORKER_TARGET_DRAIN_S)))
+WORKER_SCALE_DOWN_COOLDOWN = float(
+    os.getenv("WORKER_SCALE_DOWN_COOLDOWN",
+              str(DEFAULT_WORKER_SCALE_DOWN_COOLDOWN_S)))
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1") == "1"
+LOOP_MONITOR_INTERVAL_MS = int(
+    os.getenv("LOOP_MONITOR_INTERVAL_MS", str(DEFAULT_LOOP_MONITOR_INTERVAL_MS)))
+SLOW_CALLBACK_MS = int(
+    os.getenv("SLOW_CALLBACK_MS", str(DEFAULT_SLOW_CALLBACK_MS)))
+TRANSCRIPT_STREAMING = os.getenv("TRANSCRIPT_STREAMING", "0") == "1"
+STREAMING_MAX_SESSIONS = int(
+    os.getenv("STREAMING_MAX_SESSIONS", str(DEFAULT_STREAMING_MAX_SESSIONS)))
+STREAMING_IDLE_TIMEOUT = float(
+    os.getenv("STREAMING_IDLE_TIMEOUT", str(DEFAULT_STREAMING_IDLE_TIMEOUT_S)))
+STREAMING_MAX_UTTERANCE_MS = int(
+    os.getenv("STREAMING_MAX_UTTERANCE_MS",
+              str(DEFAULT_STREAMING_MAX_UTTERANCE_MS)))
+STREAMING_SILENCE_LEVEL = int(
+    os.getenv("STREAMING_SILENCE_LEVEL", str(DEFAULT_STREAMING_SILENCE_LEVEL)))
+AUDIO_SHARDING = os.getenv("AUDIO_SHARDING", "0") == "1"
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", str(DEFAULT_SHARD_VNODES)))
+SHARD_TTL_MS = int(os.getenv("SHARD_TTL_MS", str(DEFAULT_SHARD_TTL_MS)))
+SHARD_REFRESH_MS = int(
+    os.getenv("SHARD_REFRESH_MS", str(DEFAULT_SHARD_REFRESH_MS)))
+AUDIO_ARCHIVE = os.getenv("AUDIO_ARCHIVE", "0") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+ARCHIVE_SEGMENT_BYTES = int(
+    os.getenv("ARCHIVE_SEGMENT_BYTES", str(DEFAULT_ARCHIVE_SEGMENT_BYTES)))
+ARCHIVE_SEGMENT_SECONDS = int(
+    os.getenv("ARCHIVE_SEGMENT_SECONDS", str(DEFAULT_ARCHIVE_SEGMENT_SECONDS)))
+ARCHIVE_BUFFER_BYTES = int(
+    os.getenv("ARCHIVE_BUFFER_BYTES", str(DEFAULT_ARCHIVE_BUFFER_BYTES)))
+ARCHIVE_FLUSH_MS = int(
+    os.getenv("ARCHIVE_FLUSH_MS", str(DEFAULT_ARCHIVE_FLUSH_MS)))
+TRANSCRIPT_HISTORY = os.getenv("TRANSCRIPT_HISTORY", "0") == "1"
+HISTORY_TTL = int(os.getenv("HISTORY_TTL", str(DEFAULT_HISTORY_TTL_S)))
+HISTORY_MAXLEN = int(os.getenv("HISTORY_MAXLEN", str(DEFAULT_HISTORY_MAXLEN)))
+HISTORY_FLUSH_MS = int(
+    os.getenv("HISTORY_FLUSH_MS", str(DEFAULT_HISTORY_FLUSH_MS)))
+HISTORY_BATCH_SIZE = int(
+    os.getenv("HISTORY_BATCH_SIZE", str(DEFAULT_HISTORY_BATCH_SIZE)))
+CHUNK_HINTS = os.getenv("CHUNK_HINTS", "0") == "1"
+CHUNK_HINT_MIN_MS = int(
+    os.getenv("CHUNK_HINT_MIN_MS", str(DEFAULT_CHUNK_HINT_MIN_MS)))
+CHUNK_HINT_MAX_MS = int(
+    os.getenv("CHUNK_HINT_MAX_MS", str(DEFAULT_CHUNK_HINT_MAX_MS)))
+CHUNK_HINT_INITIAL_MS = int(
+    os.getenv("CHUNK_HINT_INITIAL_MS", str(DEFAULT_CHUNK_HINT_INITIAL_MS)))
+CHUNK_HINT_TARGET_LATENCY_MS = int(os.getenv(
+    "CHUNK_HINT_TARGET_LATENCY_MS", str(DEFAULT_CHUNK_HINT_TARGET_LATENCY_MS)))
+CHUNK_HINT_INTERVAL = float(
+    os.getenv("CHUNK_HINT_INTERVAL", str(DEFAULT_CHUNK_HINT_INTERVAL_S)))
+GATEWAY_PROCESSES = int(
+    os.getenv("GATEWAY_PROCESSES", str(DEFAULT_GATEWAY_PROCESSES)))
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", DEFAULT_GATEWAY_HOST)
+GATEWAY_BACKLOG = int(
+    os.getenv("GATEWAY_BACKLOG", str(DEFAULT_GATEWAY_BACKLOG)))
+GATEWAY_REUSEPORT = os.getenv("GATEWAY_REUSEPORT", "1") == "1"
+PROFILE_SECONDS = float(
+    os.getenv("PROFILE_SECONDS", str(DEFAULT_PROFILE_SECONDS)))
+PROFILE_HZ = float(os.getenv("PROFILE_HZ", str(DEFAULT_PROFILE_HZ)))
 
 
 def get_app_port() -> int:
@@ -20,6 +263,471 @@ def get_redis_url() -> str:
     return REDIS_URL
 
 
+def is_redis_cluster_enabled() -> bool:
+    """Подключаться ли к Redis Cluster (REDIS_URL — любой из его узлов)."""
+    return REDIS_CLUSTER
+
+
+def get_transcript_channel_shards() -> int:
+    """Возвращает число шардированных каналов транскриптов в кластере."""
+    return TRANSCRIPT_CHANNEL_SHARDS
+
+
+def is_publish_batching_enabled() -> bool:
+    """Собираются ли публикации процесса в общие конвейеры Redis."""
+    return PUBLISH_BATCHING
+
+
+def get_publish_batch_max_size() -> int:
+    """Возвращает максимум сообщений в одном конвейере публикации."""
+    return PUBLISH_BATCH_MAX_SIZE
+
+
+def get_publish_batch_linger_ms() -> float:
+    """Возвращает ожидание попутных сообщений перед отправкой конвейера, в мс."""
+    return PUBLISH_BATCH_LINGER_MS
+
+
 def get_max_audio_size() -> int:
     """Возвращает максимальный размер аудио-чанка в байтах."""
     return MAX_AUDIO_SIZE
+
+
+def get_max_upload_size() -> int:
+    """Возвращает лимит суммарного размера фрагментированной загрузки."""
+    return MAX_UPLOAD_SIZE
+
+
+def get_mux_max_streams() -> int:
+    """Возвращает лимит логических потоков на мультиплексированное соединение."""
+    return MUX_MAX_STREAMS
+
+
+def is_transcript_reorder_enabled() -> bool:
+    """Включен ли буфер упорядочивания транскриптов на шлюзе."""
+    return TRANSCRIPT_REORDER
+
+
+def get_reorder_buffer_size() -> int:
+    """Возвращает максимум транскриптов, ожидающих пропущенный номер."""
+    return REORDER_BUFFER_SIZE
+
+
+def get_reorder_timeout_ms() -> int:
+    """Возвращает максимальное ожидание пропущенного транскрипта в мс."""
+    return REORDER_TIMEOUT_MS
+
+
+def get_session_resume_ttl() -> int:
+    """Возвращает время жизни возобновляемой сессии после активности, в с."""
+    return SESSION_RESUME_TTL
+
+
+def get_replay_buffer_size() -> int:
+    """Возвращает число последних транскриптов в буфере повтора сессии."""
+    return REPLAY_BUFFER_SIZE
+
+
+def get_audio_sample_rate() -> int:
+    """Возвращает частоту дискретизации аудио, которое получают воркеры, в Гц."""
+    return AUDIO_SAMPLE_RATE
+
+
+def get_audio_channels() -> int:
+    """Возвращает число каналов аудио, которое получают воркеры."""
+    return AUDIO_CHANNELS
+
+
+def get_audio_sample_width() -> int:
+    """Возвращает размер одного отсчета аудио в байтах."""
+    return AUDIO_SAMPLE_WIDTH
+
+
+def get_audio_frame_size() -> int:
+    """Возвращает размер одного аудио-фрейма (все каналы) в байтах."""
+    return AUDIO_SAMPLE_WIDTH * AUDIO_CHANNELS
+
+
+def get_audio_bytes_per_second() -> int:
+    """Возвращает битрейт входящего аудио в байтах в секунду."""
+    return AUDIO_SAMPLE_RATE * get_audio_frame_size()
+
+
+def get_audio_window_ms() -> int:
+    """Возвращает длительность окна агрегации в мс (0 — выключено)."""
+    return AUDIO_WINDOW_MS
+
+
+def get_audio_window_overlap_ms() -> int:
+    """Возвращает перекрытие соседних окон агрегации в мс."""
+    return AUDIO_WINDOW_OVERLAP_MS
+
+
+def get_audio_idle_flush_ms() -> int:
+    """Возвращает таймаут простоя, после которого сбрасывается неполное окно."""
+    return AUDIO_IDLE_FLUSH_MS
+
+
+def get_bulk_chunk_size() -> int:
+    """Возвращает размер чанка пакетной транскрипции (не больше MAX_AUDIO_SIZE)."""
+    return min(BULK_CHUNK_SIZE, MAX_AUDIO_SIZE)
+
+
+def get_bulk_max_jobs() -> int:
+    """Возвращает число одновременных пакетных задач на процесс шлюза."""
+    return BULK_MAX_JOBS
+
+
+def get_bulk_max_inflight() -> int:
+    """Возвращает число чанков задачи, ожидающих транскрипта одновременно."""
+    return BULK_MAX_INFLIGHT
+
+
+def get_bulk_result_timeout() -> float:
+    """Возвращает таймаут ожидания очередного транскрипта задачи в секундах."""
+    return BULK_RESULT_TIMEOUT
+
+
+def get_bulk_worker_concurrency() -> int:
+    """Возвращает число пакетных чанков, обрабатываемых воркером параллельно."""
+    return BULK_WORKER_CONCURRENCY
+
+
+def get_transcript_cache_max_bytes() -> int:
+    """Возвращает лимит локального кэша транскриптов в байтах (0 — выключен)."""
+    return TRANSCRIPT_CACHE_MAX_BYTES
+
+
+def is_transcript_cache_redis_enabled() -> bool:
+    """Включен ли общий Redis-уровень кэша транскриптов."""
+    return TRANSCRIPT_CACHE_REDIS
+
+
+def get_transcript_cache_ttl() -> int:
+    """Возвращает TTL записей Redis-уровня кэша транскриптов в секундах."""
+    return TRANSCRIPT_CACHE_TTL
+
+
+def get_worker_metrics_interval() -> int:
+    """Возвращает период публикации метрик воркера в Redis, в секундах."""
+    return WORKER_METRICS_INTERVAL
+
+
+def get_dedup_window() -> int:
+    """Возвращает размер окна обработанных номеров seq на сессию."""
+    return DEDUP_WINDOW
+
+
+def get_dedup_max_sessions() -> int:
+    """Возвращает число сессий, для которых воркер хранит окно номеров."""
+    return DEDUP_MAX_SESSIONS
+
+
+def is_dedup_redis_enabled() -> bool:
+    """Включена ли общая для воркеров дедупликация через Redis."""
+    return DEDUP_REDIS
+
+
+def get_dedup_ttl() -> int:
+    """Возвращает время хранения ключа идемпотентности в Redis, в секундах."""
+    return DEDUP_TTL
+
+
+def get_ws_heartbeat_interval() -> float:
+    """Возвращает паузу в чтении, после которой шлюз шлет heartbeat, в секундах."""
+    return WS_HEARTBEAT_INTERVAL
+
+
+def get_ws_idle_timeout() -> float:
+    """Возвращает паузу в чтении, после которой соединение закрывается, в секундах."""
+    return WS_IDLE_TIMEOUT
+
+
+def get_ws_ping_interval() -> float:
+    """Возвращает интервал ping протокола WebSocket в секундах (0 — выключено)."""
+    return WS_PING_INTERVAL
+
+
+def get_ws_ping_timeout() -> float:
+    """Возвращает ожидание pong, после которого соединение закрывается, в секундах."""
+    return WS_PING_TIMEOUT
+
+
+def get_rate_limit_tiers() -> dict:
+    """Возвращает лимиты тарифов: {тариф: {"session"|"key": {лимиты}}}."""
+    return RATE_LIMIT_TIERS
+
+
+def get_rate_limit_default_tier() -> str:
+    """Возвращает тариф клиентов без известного API-ключа."""
+    return RATE_LIMIT_DEFAULT_TIER
+
+
+def get_rate_limit_burst() -> float:
+    """Возвращает емкость корзин лимитов в секундах полной скорости."""
+    return RATE_LIMIT_BURST
+
+
+def is_rate_limit_redis_enabled() -> bool:
+    """Общие ли лимиты API-ключей для всех узлов шлюза (через Redis)."""
+    return RATE_LIMIT_REDIS
+
+
+def get_api_key_tiers() -> dict:
+    """Возвращает тарифы API-ключей."""
+    return API_KEY_TIERS
+
+
+def get_drain_timeout() -> float:
+    """Возвращает срок вывода шлюза из работы, в секундах."""
+    return DRAIN_TIMEOUT
+
+
+def get_admin_token() -> str:
+    """Возвращает токен административного API (пустой — API выключен)."""
+    return ADMIN_TOKEN
+
+
+def is_audio_stream_enabled() -> bool:
+    """Передается ли аудио воркерам через Redis Streams (иначе pub/sub)."""
+    return AUDIO_TRANSPORT == "stream"
+
+
+def get_audio_stream_maxlen() -> int:
+    """Возвращает приблизительный предел длины потока аудио в Redis."""
+    return AUDIO_STREAM_MAXLEN
+
+
+def get_worker_heartbeat_interval_ms() -> int:
+    """Возвращает период heartbeat воркера и проверки упавших соседей, в мс."""
+    return WORKER_HEARTBEAT_INTERVAL_MS
+
+
+def get_worker_heartbeat_ttl_ms() -> int:
+    """Возвращает срок без heartbeat, после которого воркер считается упавшим."""
+    return WORKER_HEARTBEAT_TTL_MS
+
+
+def get_worker_processes() -> int:
+    """Возвращает число процессов воркера под супервизором."""
+    return WORKER_PROCESSES
+
+
+def get_worker_restart_base_ms() -> int:
+    """Возвращает начальную задержку перезапуска воркера, в мс."""
+    return WORKER_RESTART_BASE_MS
+
+
+def get_worker_restart_max_ms() -> int:
+    """Возвращает предельную задержку перезапуска воркера, в мс."""
+    return WORKER_RESTART_MAX_MS
+
+
+def get_worker_slot():
+    """Возвращает номер слота воркера у супервизора (None — без супервизора)."""
+    return WORKER_SLOT
+
+
+def get_worker_status_interval() -> float:
+    """Возвращает период оценки очереди воркеров супервизором, в секундах."""
+    return WORKER_STATUS_INTERVAL
+
+
+def is_worker_autoscale_enabled() -> bool:
+    """Подбирает ли супервизор число процессов воркера по очереди."""
+    return WORKER_AUTOSCALE
+
+
+def get_worker_min_processes() -> int:
+    """Возвращает нижнюю границу числа процессов при автомасштабировании."""
+    return WORKER_MIN_PROCESSES
+
+
+def get_worker_max_processes() -> int:
+    """Возвращает верхнюю границу числа процессов при автомасштабировании."""
+    return WORKER_MAX_PROCESSES
+
+
+def get_worker_target_drain() -> float:
+    """Возвращает желаемое время разбора очереди аудио, в секундах."""
+    return WORKER_TARGET_DRAIN
+
+
+def get_worker_scale_down_cooldown() -> float:
+    """Возвращает минимальный интервал между уменьшениями числа процессов, в с."""
+    return WORKER_SCALE_DOWN_COOLDOWN
+
+
+def is_loop_monitor_enabled() -> bool:
+    """Замеряет ли процесс задержку цикла событий."""
+    return LOOP_MONITOR
+
+
+def get_loop_monitor_interval_ms() -> int:
+    """Возвращает период замера задержки цикла событий, в мс."""
+    return LOOP_MONITOR_INTERVAL_MS
+
+
+def get_slow_callback_ms() -> int:
+    """Возвращает порог блокировки цикла, после которого снимается стек, в мс."""
+    return SLOW_CALLBACK_MS
+
+
+def is_transcript_streaming_enabled() -> bool:
+    """Выдает ли воркер промежуточные и итоговые транскрипты фраз."""
+    return TRANSCRIPT_STREAMING
+
+
+def get_streaming_max_sessions() -> int:
+    """Возвращает максимум сессий с состоянием распознавания в воркере."""
+    return STREAMING_MAX_SESSIONS
+
+
+def get_streaming_idle_timeout() -> float:
+    """Возвращает простой сессии, после которого фраза завершается, в с."""
+    return STREAMING_IDLE_TIMEOUT
+
+
+def get_streaming_max_utterance_ms() -> int:
+    """Возвращает максимальную длительность фразы, в мс."""
+    return STREAMING_MAX_UTTERANCE_MS
+
+
+def get_streaming_silence_level() -> int:
+    """Возвращает порог амплитуды, ниже которого чанк считается тишиной."""
+    return STREAMING_SILENCE_LEVEL
+
+
+def is_audio_sharding_enabled() -> bool:
+    """Распределяются ли сессии по шардам воркеров консистентным хешированием."""
+    return AUDIO_SHARDING
+
+
+def get_shard_vnodes() -> int:
+    """Возвращает число виртуальных узлов шарда на кольце хешей."""
+    return SHARD_VNODES
+
+
+def get_shard_ttl_ms() -> int:
+    """Возвращает срок без продления, после которого шард покидает кольцо, в мс."""
+    return SHARD_TTL_MS
+
+
+def get_shard_refresh_ms() -> int:
+    """Возвращает период обновления состава шардов на шлюзе и воркерах, в мс."""
+    return SHARD_REFRESH_MS
+
+
+def is_audio_archive_enabled() -> bool:
+    """Сохраняет ли воркер исходное аудио сессий в архив."""
+    return AUDIO_ARCHIVE
+
+
+def get_archive_dir() -> str:
+    """Возвращает каталог сегментов архива аудио."""
+    return ARCHIVE_DIR
+
+
+def get_archive_segment_bytes() -> int:
+    """Возвращает размер сегмента архива, после которого начинается новый."""
+    return ARCHIVE_SEGMENT_BYTES
+
+
+def get_archive_segment_seconds() -> int:
+    """Возвращает возраст сегмента архива, после которого начинается новый, в с."""
+    return ARCHIVE_SEGMENT_SECONDS
+
+
+def get_archive_buffer_bytes() -> int:
+    """Возвращает объем буфера архива, который записывается одним блоком."""
+    return ARCHIVE_BUFFER_BYTES
+
+
+def get_archive_flush_ms() -> int:
+    """Возвращает максимальную задержку записи буфера архива на диск, в мс."""
+    return ARCHIVE_FLUSH_MS
+
+
+def is_transcript_history_enabled() -> bool:
+    """Сохраняют ли воркеры транскрипты сессий в историю."""
+    return TRANSCRIPT_HISTORY
+
+
+def get_history_ttl() -> int:
+    """Возвращает срок хранения истории сессии после последней записи, в с."""
+    return HISTORY_TTL
+
+
+def get_history_maxlen() -> int:
+    """Возвращает максимум транскриптов в истории одной сессии."""
+    return HISTORY_MAXLEN
+
+
+def get_history_flush_ms() -> int:
+    """Возвращает максимальную задержку записи транскрипта в историю, в мс."""
+    return HISTORY_FLUSH_MS
+
+
+def get_history_batch_size() -> int:
+    """Возвращает число транскриптов, после которого история пишется сразу."""
+    return HISTORY_BATCH_SIZE
+
+
+def is_chunk_hints_enabled() -> bool:
+    """Возвращает True, если шлюз рекомендует клиентам длительность чанка."""
+    return CHUNK_HINTS
+
+
+def get_chunk_hint_min_ms() -> int:
+    """Возвращает минимальную рекомендуемую длительность чанка в мс."""
+    return CHUNK_HINT_MIN_MS
+
+
+def get_chunk_hint_max_ms() -> int:
+    """Возвращает максимальную рекомендуемую длительность чанка в мс."""
+    return CHUNK_HINT_MAX_MS
+
+
+def get_chunk_hint_initial_ms() -> int:
+    """Возвращает длительность чанка, рекомендуемую до первых замеров, в мс."""
+    return CHUNK_HINT_INITIAL_MS
+
+
+def get_chunk_hint_target_latency_ms() -> int:
+    """Возвращает целевую задержку воркеров (от публикации до транскрипта) в мс."""
+    return CHUNK_HINT_TARGET_LATENCY_MS
+
+
+def get_chunk_hint_interval() -> float:
+    """Возвращает интервал пересчета рекомендации в секундах."""
+    return CHUNK_HINT_INTERVAL
+
+
+def get_gateway_processes() -> int:
+    """Возвращает число процессов шлюза (по умолчанию — по числу ядер)."""
+    return GATEWAY_PROCESSES or os.cpu_count() or 1
+
+
+def get_gateway_host() -> str:
+    """Возвращает адрес, на котором слушают процессы шлюза."""
+    return GATEWAY_HOST
+
+
+def get_gateway_backlog() -> int:
+    """Возвращает длину очереди входящих соединений сокета шлюза."""
+    return GATEWAY_BACKLOG
+
+
+def is_gateway_reuseport_enabled() -> bool:
+    """Открывает ли каждый процесс шлюза свой сокет с SO_REUSEPORT."""
+    return GATEWAY_REUSEPORT
+
+
+def get_profile_seconds() -> float:
+    """Возвращает длительность профилирования воркера по сигналу, в секундах."""
+    return PROFILE_SECONDS
+
+
+def get_profile_hz() -> float:
+    """Возвращает частоту снятия стеков при профилировании."""
+    return PROFILE_HZ
@@ -2,5 +2,173 @@
 
 AUDIO_CHANNEL = "audio_chunks"
 TRANSCRIPTS_CHANNEL = "transcripts"
+BULK_AUDIO_CHANNEL = "audio_chunks_bulk"
+
+# Очередь аудио на Redis Streams: чанк получает один воркер группы
+# и остается в списке ожидающих, пока тот не подтвердит обработку
+AUDIO_STREAM = "audio_chunks:stream"
+BULK_AUDIO_STREAM = "audio_chunks_bulk:stream"
+AUDIO_CONSUMER_GROUP = "transcribers"
+DEFAULT_AUDIO_TRANSPORT = "stream"
+DEFAULT_AUDIO_STREAM_MAXLEN = 100000
+
+# Redis Cluster: транскрипты делятся на шардированные каналы (SPUBLISH)
+DEFAULT_TRANSCRIPT_CHANNEL_SHARDS = 16
+
+# Пакетная публикация: сообщения процесса уходят в Redis одним конвейером
+DEFAULT_PUBLISH_BATCH_MAX_SIZE = 128
+DEFAULT_PUBLISH_BATCH_LINGER_MS = 0.5
 
 DEFAULT_MAX_AUDIO_SIZE_BYTES = 1024 * 1024  # 1MB
+DEFAULT_MAX_UPLOAD_SIZE_BYTES = 512 * 1024 * 1024  # 512MB на загрузку
+
+# Поля аудио-сообщения, которые воркер возвращает в транскрипте,
+# а шлюз пересылает клиенту
+AUDIO_METADATA_FIELDS = (
+    "seq", "stream_id", "upload_id", "fragment_seq", "final",
+)
+
+# Возобновление сессий после переподключения
+RESUME_TOKEN_KEY_PREFIX = "resume:"
+SESSION_STATE_KEY_PREFIX = "session:"
+REPLAY_KEY_PREFIX = "replay:"
+DEFAULT_SESSION_RESUME_TTL_S = 300
+DEFAULT_REPLAY_BUFFER_SIZE = 100
+
+# Буфер упорядочивания транскриптов на шлюзе
+DEFAULT_REORDER_BUFFER_SIZE = 64
+DEFAULT_REORDER_TIMEOUT_MS = 2000
+
+# Максимум логических потоков в одном мультиплексированном соединении
+DEFAULT_MUX_MAX_STREAMS = 1024
+
+# Ping/pong протокола WebSocket (uvicorn): интервал и ожидание pong
+DEFAULT_WS_PING_INTERVAL_S = 20
+DEFAULT_WS_PING_TIMEOUT_S = 20
+
+# JSON-heartbeat и закрытие соединений без фреймов клиента (0 — выключено):
+# слушающие клиенты не обязаны ничего присылать, поэтому по умолчанию выключено
+DEFAULT_WS_HEARTBEAT_INTERVAL_S = 0
+DEFAULT_WS_IDLE_TIMEOUT_S = 0
+
+# Ограничение скорости клиентов по тарифам: лимиты сессии (соединения,
+# на /ws/mux — потока) и API-ключа (всех его соединений) на чанки/с
+# и байты/с, 0 — без лимита. По умолчанию лимитов нет: их включает
+# RATE_LIMIT_TIERS
+RATE_LIMIT_KEY_PREFIX = "ratelimit:"
+DEFAULT_RATE_LIMIT_TIERS = {"default": {}}
+DEFAULT_RATE_LIMIT_TIER = "default"
+DEFAULT_RATE_LIMIT_BURST_S = 2
+
+# Вывод шлюза из работы: срок ожидания транскриптов сессий
+DEFAULT_DRAIN_TIMEOUT_S = 30
+
+# Формат входящего аудио (PCM16 mono 16 кГц)
+DEFAULT_AUDIO_SAMPLE_RATE = 16000
+DEFAULT_AUDIO_SAMPLE_WIDTH = 2
+DEFAULT_AUDIO_CHANNELS = 1
+
+# Формат, который клиент может объявить при подключении; шлюз приводит
+# аудио к формату выше
+AUDIO_ENCODINGS = ("pcm16", "float32")
+AUDIO_MIN_SAMPLE_RATE = 8000
+AUDIO_MAX_SAMPLE_RATE = 192000
+AUDIO_MAX_CHANNELS = 8
+
+# Агрегация чанков в окна (0 — агрегация отключена)
+DEFAULT_AUDIO_WINDOW_MS = 0
+DEFAULT_AUDIO_WINDOW_OVERLAP_MS = 0
+DEFAULT_AUDIO_IDLE_FLUSH_MS = 500
+
+# Пакетная (HTTP) транскрипция
+DEFAULT_BULK_CHUNK_SIZE_BYTES = 256 * 1024
+DEFAULT_BULK_MAX_JOBS = 4
+DEFAULT_BULK_MAX_INFLIGHT = 8
+DEFAULT_BULK_RESULT_TIMEOUT_S = 30
+DEFAULT_BULK_WORKER_CONCURRENCY = 4
+
+# Кэш транскриптов по хешу аудио. По умолчанию выключен: повтор аудио
+# получает прежний текст, что верно только для детерминированного движка
+TRANSCRIPT_CACHE_KEY_PREFIX = "tcache:"
+DEFAULT_TRANSCRIPT_CACHE_MAX_BYTES = 0
+DEFAULT_TRANSCRIPT_CACHE_TTL_S = 3600
+
+# Метрики процессов
+WORKER_METRICS_KEY_PREFIX = "metrics:worker:"
+GATEWAY_METRICS_KEY_PREFIX = "metrics:gateway:"
+DEFAULT_WORKER_METRICS_INTERVAL_S = 5
+
+# Супервизор воркеров и перехват работы упавших воркеров
+WORKER_HEARTBEAT_KEY_PREFIX = "worker:heartbeat:"
+DEFAULT_WORKER_HEARTBEAT_INTERVAL_MS = 100
+DEFAULT_WORKER_HEARTBEAT_TTL_MS = 500
+DEFAULT_WORKER_PROCESSES = 2
+DEFAULT_WORKER_RESTART_BASE_MS = 50
+DEFAULT_WORKER_RESTART_MAX_MS = 5000
+
+# Статус очереди воркеров и локальное автомасштабирование супервизора
+WORKER_STATUS_KEY = "workers:status"
+DEFAULT_WORKER_STATUS_INTERVAL_S = 1
+DEFAULT_WORKER_MIN_PROCESSES = 1
+DEFAULT_WORKER_MAX_PROCESSES = 8
+DEFAULT_WORKER_TARGET_DRAIN_S = 10
+DEFAULT_WORKER_SCALE_DOWN_COOLDOWN_S = 30
+
+# Задержка цикла событий и медленные обработчики
+DEFAULT_LOOP_MONITOR_INTERVAL_MS = 100
+DEFAULT_SLOW_CALLBACK_MS = 100
+
+# Потоковые транскрипты: промежуточные (partial) и итоговые (final)
+DEFAULT_STREAMING_MAX_SESSIONS = 10000
+DEFAULT_STREAMING_IDLE_TIMEOUT_S = 10
+DEFAULT_STREAMING_MAX_UTTERANCE_MS = 15000
+# Пиковая амплитуда 16-битного PCM, ниже которой чанк считается тишиной
+DEFAULT_STREAMING_SILENCE_LEVEL = 500
+
+# Шардирование сессий по воркерам: поток (канал) аудио на каждый шард
+AUDIO_SHARDS_KEY = "audio_chunks:shards"
+DEFAULT_SHARD_VNODES = 128
+DEFAULT_SHARD_TTL_MS = 5000
+DEFAULT_SHARD_REFRESH_MS = 1000
+
+# Архив исходного аудио в сегментах только для дописывания
+DEFAULT_ARCHIVE_DIR = "/data/archive"
+DEFAULT_ARCHIVE_SEGMENT_BYTES = 256 * 1024 * 1024
+DEFAULT_ARCHIVE_SEGMENT_SECONDS = 3600
+DEFAULT_ARCHIVE_BUFFER_BYTES = 4 * 1024 * 1024
+DEFAULT_ARCHIVE_FLUSH_MS = 1000
+
+# История транскриптов: поток Redis на сессию с ограниченным сроком жизни
+HISTORY_KEY_PREFIX = "history:"
+HISTORY_TOKEN_KEY_PREFIX = "history_token:"
+DEFAULT_HISTORY_TTL_S = 86400
+DEFAULT_HISTORY_MAXLEN = 10000
+DEFAULT_HISTORY_FLUSH_MS = 200
+DEFAULT_HISTORY_BATCH_SIZE = 500
+HISTORY_PAGE_DEFAULT = 100
+HISTORY_PAGE_MAX = 1000
+
+# Рекомендации клиентам по длительности чанка (CHUNK_HINTS)
+DEFAULT_CHUNK_HINT_MIN_MS = 100
+DEFAULT_CHUNK_HINT_MAX_MS = 2000
+DEFAULT_CHUNK_HINT_INITIAL_MS = 250
+DEFAULT_CHUNK_HINT_TARGET_LATENCY_MS = 500
+DEFAULT_CHUNK_HINT_INTERVAL_S = 2
+
+# Многопроцессный шлюз (0 процессов — по числу ядер)
+DEFAULT_GATEWAY_PROCESSES = 0
+DEFAULT_GATEWAY_HOST = "0.0.0.0"
+DEFAULT_GATEWAY_BACKLOG = 2048
+
+# Профилирование процессов по запросу
+WORKER_PROFILE_KEY_PREFIX = "profile:worker:"
+PROFILE_REPORT_TTL_S = 3600
+DEFAULT_PROFILE_SECONDS = 10
+DEFAULT_PROFILE_HZ = 100
+MAX_PROFILE_SECONDS = 120
+
+# Идемпотентная обработка чанков
+DEDUP_KEY_PREFIX = "dedup:"
+DEFAULT_DEDUP_WINDOW = 1024
+DEFAULT_DEDUP_MAX_SESSIONS = 10000
+DEFAULT_DEDUP_TTL_S = 600
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Optional
+
+from constants import DEDUP_KEY_PREFIX
+
+
+class SeqWindow:
+    """Скользящее окно уже обработанных номеров seq в виде битовой маски.
+
+    Хранит size последних номеров; номера старше окна считаются
+    обработанными, так как повтор настолько старого чанка уже неактуален.
+    """
+
+    __slots__ = ("_base", "_bits", "_size")
+
+    def __init__(self, size: int):
+        self._base = 0
+        self._bits = 0
+        self._size = size
+
+    def __contains__(self, seq: int) -> bool:
+        if seq < self._base:
+            return True
+        offset = seq - self._base
+        return offset < self._size and bool(self._bits >> offset & 1)
+
+    def add(self, seq: int) -> bool:
+        """Отмечает номер; возвращает False, если он уже был в окне."""
+        if seq in self:
+            return False
+        offset = seq - self._base
+        if offset >= self._size:
+            shift = offset - self._size + 1
+            self._bits >>= shift
+            self._base += shift
+            offset -= shift
+        self._bits |= 1 << offset
+        return True
+
+
+class DedupIndex:
+    """Окна обработанных номеров по сессиям с вытеснением давних сессий."""
+
+    __slots__ = ("_windows", "_window_size", "_max_sessions")
+
+    def __init__(self, window_size: int, max_sessions: int):
+        self._windows: OrderedDict = OrderedDict()
+        self._window_size = window_size
+        self._max_sessions = max_sessions
+
+    def _window(self, session_key) -> SeqWindow:
+        window = self._windows.get(session_key)
+        if window is None:
+            window = self._windows[session_key] = SeqWindow(self._window_size)
+            while len(self._windows) > self._max_sessions:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(session_key)
+        return window
+
+    def seen(self, session_key, seq: int) -> bool:
+        """Был ли номер сессии уже отмечен."""
+        window = self._windows.get(session_key)
+        return window is not None and seq in window
+
+    def add(self, session_key, seq: int) -> bool:
+        """Отмечает номер сессии; False, если он уже был отмечен."""
+        return self._window(session_key).add(seq)
+
+
+def session_key(payload: dict) -> str:
+    """Ключ сессии (или логического потока) аудио-сообщения."""
+    stream_id = payload.get("stream_id")
+    if stream_id is None:
+        return str(payload["client_id"])
+    return f"{payload['client_id']}/{stream_id}"
+
+
+def idempotency_key(payload: dict) -> Optional[str]:
+    """Детерминированный ключ чанка: сессия и seq; None, если seq нет."""
+    seq = payload.get("seq")
+    if seq is None:
+        return None
+    return f"{DEDUP_KEY_PREFIX}{session_key(payload)}:{seq}"
@@ -0,0 +1,82 @@
+from typing import Optional
+
+from config import (
+    get_dedup_window,
+    get_reorder_buffer_size,
+    get_reorder_timeout_ms,
+)
+from dedup import SeqWindow
+from metrics import metrics
+from reorder import ReorderBuffer
+
+
+class TranscriptDelivery:
+    """Порядок и уникальность транскриптов, отправляемых одному клиенту.
+
+    Транскрипты группируются по stream_id (None — обычное соединение).
+    Повторы одного seq отбрасываются; при reorder=True транскрипты
+    выдаются по порядку seq через ReorderBuffer, начиная со start_seq —
+    первого seq, опубликованного соединением (у возобновленной сессии
+    не ноль).
+    """
+
+    __slots__ = ("_reorder", "_start_seq", "_buffers", "_delivered")
+
+    def __init__(self, reorder: bool, start_seq: int = 0):
+        self._reorder = reorder
+        self._start_seq = start_seq
+        self._buffers: dict = {}
+        self._delivered: dict = {}
+
+    def is_delivered(self, response: dict) -> bool:
+        """Был ли транскрипт с этим seq уже принят."""
+        seq = response.get("seq")
+        window = self._delivered.get(response.get("stream_id"))
+        return seq is not None and window is not None and seq in window
+
+    def mark_delivered(self, response: dict) -> bool:
+        """Отмечает транскрипт отправленным; False для повтора."""
+        seq = response.get("seq")
+        if seq is None:
+            return True
+        stream_id = response.get("stream_id")
+        window = self._delivered.get(stream_id)
+        if window is None:
+            window = self._delivered[stream_id] = SeqWindow(get_dedup_window())
+        if window.add(seq):
+            return True
+        metrics.inc("duplicate_transcripts_suppressed")
+        return False
+
+    def accept(self, response: dict, now: float) -> list[dict]:
+        """Принимает транскрипт и возвращает готовые к отправке."""
+        if not self.mark_delivered(response):
+            return []
+        seq = response.get("seq")
+        if not self._reorder or seq is None:
+            return [response]
+        stream_id = response.get("stream_id")
+        buffer = self._buffers.get(stream_id)
+        if buffer is None:
+            buffer = self._buffers[stream_id] = ReorderBuffer(
+                get_reorder_buffer_size(), get_reorder_timeout_ms() / 1000,
+                start_seq=self._start_seq)
+        return buffer.push(seq, response, now)
+
+    def expire(self, now: float) -> list[dict]:
+        """Выдает транскрипты, чьи пропуски ждут дольше таймаута."""
+        expired = []
+        for buffer in self._buffers.values():
+            expired.extend(buffer.expire(now))
+        return expired
+
+    def next_wait(self, now: float) -> Optional[float]:
+        """Время до ближайшего таймаута буферов (None — без ограничения)."""
+        deadlines = [
+            deadline for deadline in (
+                buffer.next_deadline() for buffer in self._buffers.values()
+            ) if deadline is not None
+        ]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - now, 0.0)
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import signal
+from typing import Optional
+
+from config import get_drain_timeout
+from sessions import get_session_hub
+
+logger = logging.getLogger(__name__)
+
+_drain_task: Optional[asyncio.Task] = None
+
+
+async def start_drain(timeout: Optional[float] = None) -> asyncio.Task:
+    """Запускает вывод шлюза из работы (повторный вызов возвращает ту же задачу)."""
+    global _drain_task
+    if _drain_task is None:
+        hub = await get_session_hub()
+        _drain_task = asyncio.create_task(
+            hub.drain(get_drain_timeout() if timeout is None else timeout))
+    return _drain_task
+
+
+def is_draining() -> bool:
+    """Запущен ли вывод шлюза из работы."""
+    return _drain_task is not None
+
+
+def install_drain_signal_handler():
+    """Подменяет завершение по SIGTERM выводом из работы.
+
+    После вывода (или по повторному SIGTERM) вызывается прежний обработчик,
+    то есть штатное завершение uvicorn.
+    """
+    loop = asyncio.get_running_loop()
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def shutdown():
+        loop.remove_signal_handler(signal.SIGTERM)
+        if callable(previous):
+            previous(signal.SIGTERM, None)
+        else:
+            signal.signal(signal.SIGTERM, previous)
+            signal.raise_signal(signal.SIGTERM)
+
+    async def drain_and_shutdown():
+        try:
+            await (await start_drain())
+        except Exception as e:
+            logger.error(f"Drain failed: {e}")
+        finally:
+            shutdown()
+
+    def on_sigterm():
+        if is_draining():
+            logger.info("Second SIGTERM received, shutting down now")
+            shutdown()
+            return
+        logger.info("SIGTERM received, draining gateway")
+        asyncio.ensure_future(drain_and_shutdown())
+
+    try:
+        loop.add_signal_handler(signal.SIGTERM, on_sigterm)
+    except (NotImplementedError, RuntimeError, ValueError) as e:
+        # Не главный поток или платформа без сигналов цикла событий
+        logger.warning(f"SIGTERM drain handler is not installed: {e}")
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from protocol import ProtocolError
+
+
+class FragmentedUpload:
+    """Состояние фрагментированной загрузки одной сессии.
+
+    Хранит только счетчики: сами фрагменты сразу уходят в Redis, поэтому
+    память шлюза на загрузку ограничена одним фрагментом.
+    """
+
+    __slots__ = ("upload_id", "next_seq", "awaiting_seq", "size", "max_size",
+                 "normalizer")
+
+    def __init__(self, upload_id: str, max_size: int, normalizer=None):
+        self.upload_id = upload_id
+        self.next_seq = 0
+        self.awaiting_seq: Optional[int] = None
+        # size — объем в формате клиента, до нормализации
+        self.size = 0
+        self.max_size = max_size
+        # Нормализатор фрагментов загрузки (None — формат воркеров)
+        self.normalizer = normalizer
+
+    def expect(self, seq: int):
+        """Регистрирует управляющий фрейм continue для следующего фрагмента."""
+        if self.awaiting_seq is not None:
+            raise ProtocolError(
+                f"Fragment {self.awaiting_seq} announced but not received")
+        if seq != self.next_seq:
+            raise ProtocolError(
+                f"Unexpected fragment seq {seq} (expected {self.next_seq})")
+        self.awaiting_seq = seq
+
+    def accept(self, data: bytes) -> int:
+        """Принимает бинарный фрагмент и возвращает его номер."""
+        if self.awaiting_seq is None:
+            raise ProtocolError("Fragment received without 'continue' frame")
+        if self.max_size and self.size + len(data) > self.max_size:
+            raise ProtocolError(
+                f"Upload too large (max {self.max_size} bytes)")
+        seq = self.awaiting_seq
+        self.awaiting_seq = None
+        self.next_seq += 1
+        self.size += len(data)
+        return seq
+
+    def finish(self, fragments: int):
+        """Проверяет итоговое число фрагментов из управляющего фрейма end."""
+        if self.awaiting_seq is not None:
+            raise ProtocolError(
+                f"Fragment {self.awaiting_seq} announced but not received")
+        if fragments != self.next_seq:
+            raise ProtocolError(
+                f"Upload ended with {fragments} fragments, "
+                f"received {self.next_seq}")
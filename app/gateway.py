@@ -0,0 +1,195 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+from typing import Optional
+
+from backoff import STABLE_RUN_S, Backoff
+from config import (
+    get_app_port,
+    get_drain_timeout,
+    get_gateway_backlog,
+    get_gateway_host,
+    get_gateway_processes,
+    get_worker_restart_base_ms,
+    get_worker_restart_max_ms,
+    get_ws_ping_interval,
+    get_ws_ping_timeout,
+    is_gateway_reuseport_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Запас к DRAIN_TIMEOUT, после которого незавершенные процессы убиваются
+STOP_MARGIN_S = 5.0
+
+
+def listen_socket(host: str, port: int, reuseport: bool) -> socket.socket:
+    """Открывает слушающий сокет шлюза.
+
+    С SO_REUSEPORT у каждого процесса свой сокет на том же порту, и ядро
+    распределяет новые соединения между процессами равномерно, без
+    общей очереди accept.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(get_gateway_backlog())
+    sock.set_inheritable(True)
+    return sock
+
+
+def supports_reuseport() -> bool:
+    return is_gateway_reuseport_enabled() and hasattr(socket, "SO_REUSEPORT")
+
+
+def select_implementation(module: str, fallback: str) -> str:
+    """Возвращает module, если он установлен, иначе fallback."""
+    if importlib.util.find_spec(module) is None:
+        return fallback
+    return module
+
+
+def serve(slot: int, fd: Optional[int]):
+    """Процесс шлюза: uvicorn на своем или унаследованном сокете."""
+    import uvicorn
+
+    if fd is None:
+        sock = listen_socket(get_gateway_host(), get_app_port(), True)
+    else:
+        sock = socket.socket(fileno=fd)
+    loop = select_implementation("uvloop", "asyncio")
+    http = select_implementation("httptools", "h11")
+    config = uvicorn.Config(
+        "main:app",
+        loop=loop,
+        http=http,
+        ws_per_message_deflate=False,
+        # Ping/pong протокола: браузеры и websockets отвечают на него сами
+        ws_ping_interval=get_ws_ping_interval() or None,
+        ws_ping_timeout=get_ws_ping_timeout() or None,
+        backlog=get_gateway_backlog(),
+        access_log=False,
+    )
+    # Логирование процесса настраивает uvicorn, как и при запуске из CLI
+    logging.getLogger("uvicorn.error").info(
+        f"Gateway slot {slot} serving with loop={loop}, http={http}")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class GatewaySupervisor:
+    """Держит processes процессов шлюза на одном порту и перезапускает упавшие.
+
+    Процессы запускаются заново (не fork), поэтому клиенты Redis, общая
+    подписка на транскрипты и фоновые задачи создаются в каждом процессе
+    своим lifespan. SIGTERM передается процессам, и каждый выводит свои
+    соединения из работы.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self.stopping = False
+        self._children: dict[int, asyncio.subprocess.Process] = {}
+        self._stopped = asyncio.Event()
+        self._shared_socket: Optional[socket.socket] = None
+
+    async def _spawn(self, slot: int) -> asyncio.subprocess.Process:
+        """Запускает процесс шлюза в слоте."""
+        env = {**os.environ, "GATEWAY_SLOT": str(slot)}
+        pass_fds = ()
+        if self._shared_socket is not None:
+            # Без SO_REUSEPORT процессы принимают соединения с общего сокета
+            env["GATEWAY_FD"] = str(self._shared_socket.fileno())
+            pass_fds = (self._shared_socket.fileno(),)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(APP_DIR, "gateway.py"),
+            cwd=APP_DIR, env=env, pass_fds=pass_fds,
+        )
+        logger.info(f"Started gateway slot {slot} (pid {process.pid})")
+        return process
+
+    async def _run_slot(self, slot: int):
+        """Перезапускает процесс слота, пока шлюз не остановлен."""
+        loop = asyncio.get_running_loop()
+        backoff = Backoff(get_worker_restart_base_ms() / 1000,
+                          get_worker_restart_max_ms() / 1000)
+        while not self.stopping:
+            started = loop.time()
+            process = self._children[slot] = await self._spawn(slot)
+            if self.stopping:
+                process.terminate()
+            code = await process.wait()
+            del self._children[slot]
+            if self.stopping:
+                break
+            if loop.time() - started >= STABLE_RUN_S:
+                backoff.reset()
+            delay = backoff.next_delay()
+            logger.error(
+                f"Gateway slot {slot} exited with code {code}, "
+                f"restarting in {delay * 1000:.0f} ms")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        """Передает SIGTERM процессам шлюза: они выводят соединения из работы."""
+        if self.stopping:
+            return
+        logger.info("Stopping gateway processes...")
+        self.stopping = True
+        self._stopped.set()
+        for process in self._children.values():
+            process.terminate()
+
+    async def _kill_after_timeout(self):
+        """Убивает процессы, не завершившиеся за DRAIN_TIMEOUT с запасом."""
+        await self._stopped.wait()
+        await asyncio.sleep(get_drain_timeout() + STOP_MARGIN_S)
+        for slot, process in self._children.items():
+            logger.warning(f"Killing gateway slot {slot} (pid {process.pid})")
+            process.kill()
+
+    async def run(self):
+        """Запускает процессы шлюза и ждет их остановки."""
+        if not supports_reuseport():
+            self._shared_socket = listen_socket(
+                get_gateway_host(), get_app_port(), False)
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
+        killer = asyncio.create_task(self._kill_after_timeout())
+        logger.info(
+            f"Starting {self.processes} gateway processes on "
+            f"{get_gateway_host()}:{get_app_port()} "
+            f"({'SO_REUSEPORT' if self._shared_socket is None else 'shared socket'})")
+        try:
+            await asyncio.gather(
+                *(self._run_slot(slot) for slot in range(self.processes)))
+        finally:
+            killer.cancel()
+            if self._shared_socket is not None:
+                self._shared_socket.close()
+        logger.info("All gateway processes stopped")
+
+
+if __name__ == "__main__":
+    slot = os.getenv("GATEWAY_SLOT")
+    if slot is None:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        asyncio.run(GatewaySupervisor(get_gateway_processes()).run())
+    else:
+        fd = os.getenv("GATEWAY_FD")
+        serve(int(slot), None if fd is None else int(fd))
@@ -0,0 +1,175 @@
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+from collections import deque
+from typing import Optional
+
+from config import (
+    get_history_batch_size,
+    get_history_maxlen,
+    get_history_ttl,
+    is_transcript_history_enabled,
+)
+from constants import HISTORY_KEY_PREFIX, HISTORY_TOKEN_KEY_PREFIX
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Сколько транскриптов ждет записи, пока Redis недоступен; старшие
+# вытесняются, чтобы память воркера не росла без предела
+MAX_PENDING = 100000
+
+
+def history_key(session_id) -> str:
+    """Ключ потока Redis с историей транскриптов сессии."""
+    return f"{HISTORY_KEY_PREFIX}{session_id}"
+
+
+def history_token_key(session_id) -> str:
+    """Ключ Redis с токеном чтения истории сессии."""
+    return f"{HISTORY_TOKEN_KEY_PREFIX}{session_id}"
+
+
+async def issue_history_token(redis, session_id) -> str:
+    """Возвращает токен чтения истории сессии, создавая его при первом вызове.
+
+    Возобновленная сессия получает тот же токен, что и при подключении.
+    """
+    key = history_token_key(session_id)
+    token = secrets.token_urlsafe(24)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(key, token, nx=True, ex=get_history_ttl())
+        pipe.get(key)
+        _, stored = await pipe.execute()
+    return token if stored is None else stored.decode("utf-8")
+
+
+async def check_history_token(redis, session_id, token: Optional[str]) -> bool:
+    """Проверяет, что token дает доступ к истории сессии."""
+    if not token:
+        return False
+    stored = await redis.get(history_token_key(session_id))
+    return stored is not None and hmac.compare_digest(
+        stored, token.encode("utf-8"))
+
+
+class HistoryWriter:
+    """Пишет транскрипты сессий в историю пачками, вне пути доставки.
+
+    append только кладет транскрипт в очередь процесса; фоновая задача
+    раз в интервал (или по набору batch_size транскриптов) дописывает
+    их одним конвейером XADD в потоки сессий и продлевает срок их жизни.
+    Идентификатор записи потока служит курсором постраничного чтения;
+    токен чтения истории живет столько же, сколько она сама.
+    """
+
+    def __init__(self, redis, ttl: int, maxlen: int, batch_size: int):
+        self.redis = redis
+        self.ttl = ttl
+        self.maxlen = maxlen
+        self.batch_size = batch_size
+        self._pending: deque = deque(maxlen=MAX_PENDING)
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def append(self, session_id, message: bytes):
+        """Ставит транскрипт сессии в очередь записи."""
+        if len(self._pending) == MAX_PENDING:
+            metrics.inc("history_dropped")
+        self._pending.append((str(session_id), message))
+        if len(self._pending) >= self.batch_size:
+            self._ready.set()
+
+    async def flush(self):
+        """Записывает накопленные транскрипты одним конвейером."""
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        self._pending.clear()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for session_id, message in batch:
+                    pipe.xadd(history_key(session_id), {"data": message},
+                              maxlen=self.maxlen, approximate=True)
+                for session_id in {session_id for session_id, _ in batch}:
+                    pipe.expire(history_key(session_id), self.ttl)
+                    pipe.expire(history_token_key(session_id), self.ttl)
+                await pipe.execute()
+        except asyncio.CancelledError:
+            # Остановка посреди записи: пачку допишет close
+            self._requeue(batch)
+            raise
+        except Exception as e:
+            # Пачка вернется в очередь и уйдет со следующей записью
+            self._requeue(batch)
+            metrics.inc("history_write_errors")
+            logger.error(f"Failed to write transcript history: {e}")
+            return
+        metrics.inc("history_transcripts_written", len(batch))
+
+    def _requeue(self, batch: list):
+        """Возвращает пачку в начало очереди.
+
+        Если вместе с новыми транскриптами она не помещается, вытесняются
+        самые старые транскрипты пачки, а не новые из конца очереди.
+        """
+        overflow = len(batch) + len(self._pending) - MAX_PENDING
+        if overflow > 0:
+            metrics.inc("history_dropped", overflow)
+            batch = batch[overflow:]
+        self._pending.extendleft(reversed(batch))
+
+    async def _run(self, interval: float):
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            await self.flush()
+
+    def start(self, interval: float):
+        """Запускает запись раз в interval секунд или по набору пачки."""
+        self._task = asyncio.create_task(self._run(interval))
+
+    async def close(self):
+        """Останавливает фоновую запись и дописывает очередь."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+
+def create_history_writer(redis) -> Optional[HistoryWriter]:
+    """Создает запись истории транскриптов или None, если она выключена."""
+    if not is_transcript_history_enabled():
+        return None
+    return HistoryWriter(redis, get_history_ttl(), get_history_maxlen(),
+                         get_history_batch_size())
+
+
+async def load_history(redis, session_id, cursor: Optional[str],
+                       limit: int) -> tuple[list[tuple[str, dict]], bool]:
+    """Страница истории сессии: до limit пар (курсор, транскрипт) после cursor.
+
+    XRANGE с COUNT читает только запрошенную страницу; второе значение —
+    есть ли транскрипты после нее.
+    """
+    start = "-" if cursor is None else f"({cursor}"
+    entries = await redis.xrange(
+        history_key(session_id), min=start, max="+", count=limit + 1)
+    page = []
+    for entry_id, fields in entries[:limit]:
+        if isinstance(entry_id, bytes):
+            entry_id = entry_id.decode("utf-8")
+        page.append((entry_id, json.loads(fields[b"data"].decode("utf-8"))))
+    return page, len(entries) > limit
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import metrics
+from config import (
+    get_loop_monitor_interval_ms,
+    get_slow_callback_ms,
+    is_loop_monitor_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+# Границы бакетов задержки цикла событий (секунды)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Сколько внутренних кадров стека сохранять для медленного обработчика
+STACK_LIMIT = 30
+
+
+class LoopMonitor:
+    """Замеряет задержку цикла событий и снимает стек при его блокировке.
+
+    Задача цикла просыпается раз в interval секунд и записывает опоздание
+    в гистограмму event_loop_lag_seconds. Поток-сторож проверяет, когда
+    задача просыпалась в последний раз: если цикл занят дольше threshold,
+    он один раз снимает стек потока цикла — это стек обработчика, который
+    держит цикл. После пробуждения задача сохраняет событие slow_callbacks
+    с длительностью блокировки и этим стеком.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._thread_id: Optional[int] = None
+        self._last_tick = 0.0
+        self._stall_stack: Optional[list[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Запускает замеры в текущем цикле событий и поток-сторож."""
+        self._thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._task = asyncio.create_task(self._sample())
+        threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._stopped.set()
+
+    async def _sample(self):
+        """Записывает опоздание пробуждения и медленные обработчики."""
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            lag = max(0.0, now - expected)
+            metrics.observe("event_loop_lag_seconds", lag, LAG_BUCKETS)
+            if lag >= self.threshold:
+                metrics.inc("slow_callbacks_total")
+                metrics.record("slow_callbacks", {
+                    "duration_ms": round(lag * 1000, 1),
+                    "at": time.time(),
+                    "stack": self._stall_stack,
+                })
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+            self._stall_stack = None
+
+    def _watch(self):
+        """Поток-сторож: снимает стек цикла, занятого дольше порога."""
+        while not self._stopped.wait(self.threshold / 2):
+            tick = self._last_tick
+            if self._stall_stack is not None:
+                continue
+            if time.monotonic() - tick - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = [f"{entry.filename}:{entry.lineno} in {entry.name}"
+                     for entry in traceback.extract_stack(frame, STACK_LIMIT)]
+            del frame
+            # Цикл мог освободиться, пока снимался стек
+            if self._last_tick == tick:
+                self._stall_stack = stack
+
+
+def start_loop_monitor() -> Optional[LoopMonitor]:
+    """Запускает монитор цикла событий процесса, если он включен."""
+    if not is_loop_monitor_enabled():
+        return None
+    monitor = LoopMonitor(get_loop_monitor_interval_ms() / 1000,
+                          get_slow_callback_ms() / 1000)
+    monitor.start()
+    return monitor
@@ -1,11 +1,75 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from config import get_app_port, get_redis_url
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from admin import router as admin_router
+from bulk import BulkJob, release_bulk_slot, try_acquire_bulk_slot
+from config import (
+    get_app_port,
+    get_bulk_chunk_size,
+    get_bulk_max_inflight,
+    get_bulk_result_timeout,
+    get_redis_url,
+    get_worker_metrics_interval,
+    is_transcript_history_enabled,
+)
+from constants import (
+    GATEWAY_METRICS_KEY_PREFIX,
+    HISTORY_PAGE_DEFAULT,
+    HISTORY_PAGE_MAX,
+)
+from drain import install_drain_signal_handler
+from history import check_history_token, load_history
+from loopmonitor import start_loop_monitor
+from metrics import load_process_metrics, metrics, report_process_metrics
+from redis_client import get_redis_client
+from sessions import build_transcript_response, close_session_hub
+from worker_status import load_worker_status
 from ws import router as ws_router
 
-app = FastAPI()
 
+class DuplexStreamingResponse(StreamingResponse):
+    """Потоковый ответ, который не читает receive.
+
+    StreamingResponse слушает http.disconnect через receive и тем самым
+    конкурирует с request.stream() за чанки тела. Здесь тело читает сам
+    обработчик, а разрыв соединения проявляется как ClientDisconnect.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запускает фоновые задачи процесса шлюза и освобождает ресурсы.
+
+    Все состояние (клиенты Redis, общая подписка, монитор цикла) создается
+    здесь или лениво в цикле процесса, поэтому каждый процесс
+    многопроцессного шлюза получает свое. SIGTERM выводит шлюз из работы.
+    """
+    install_drain_signal_handler()
+    monitor = start_loop_monitor()
+    # Снимки метрик всех процессов шлюза собираются в /metrics через Redis
+    redis = await get_redis_client()
+    reporter = asyncio.create_task(report_process_metrics(
+        redis, get_worker_metrics_interval(), GATEWAY_METRICS_KEY_PREFIX))
+    yield
+    reporter.cancel()
+    await redis.close()
+    if monitor is not None:
+        monitor.stop()
+    await close_session_hub()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(ws_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
@@ -21,3 +85,99 @@ def get_config():
         "APP_PORT": get_app_port(),
         "REDIS_URL": get_redis_url()
     }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Возвращает метрики этого процесса шлюза и снимки остальных процессов.
+
+    gateways — последние снимки всех процессов шлюза, workers — воркеров.
+    """
+    redis = await get_redis_client()
+    try:
+        gateways = await load_process_metrics(
+            redis, GATEWAY_METRICS_KEY_PREFIX)
+        workers = await load_process_metrics(redis)
+    finally:
+        await redis.close()
+    return {"gateway": metrics.snapshot(), "gateways": gateways,
+            "workers": workers}
+
+
+@app.get("/workers/status")
+async def get_worker_status():
+    """Возвращает очередь аудио, скорость ее обработки и оценку времени разбора."""
+    redis = await get_redis_client()
+    try:
+        return await load_worker_status(redis)
+    finally:
+        await redis.close()
+
+
+@app.get("/sessions/{session_id}/transcripts")
+async def get_transcript_history(
+    session_id: str,
+    cursor: Optional[str] = Query(None, pattern=r"^\d+-\d+$"),
+    limit: int = Query(HISTORY_PAGE_DEFAULT, gt=0, le=HISTORY_PAGE_MAX),
+    x_history_token: Optional[str] = Header(None),
+):
+    """Возвращает страницу истории транскриптов сессии после cursor.
+
+    Доступ — по токену, выданному клиенту при подключении (заголовок
+    X-History-Token). next_cursor — курсор последнего транскрипта страницы
+    (или переданный, если новых нет): с ним запрашивается следующая.
+    """
+    if not is_transcript_history_enabled():
+        raise HTTPException(
+            status_code=404, detail="Transcript history is disabled")
+    redis = await get_redis_client()
+    try:
+        if not await check_history_token(redis, session_id, x_history_token):
+            raise HTTPException(
+                status_code=403, detail="Invalid history token")
+        page, has_more = await load_history(redis, session_id, cursor, limit)
+    finally:
+        await redis.close()
+    return {
+        "session_id": session_id,
+        "transcripts": [
+            {**build_transcript_response(
+                transcript, transcript.get("client_id", session_id)),
+             "cursor": entry_id}
+            for entry_id, transcript in page
+        ],
+        "next_cursor": page[-1][0] if page else cursor,
+        "has_more": has_more,
+    }
+
+
+@app.post("/transcribe")
+async def transcribe_bulk(request: Request):
+    """Принимает потоковое тело с аудио и отдает транскрипты в NDJSON."""
+    if not try_acquire_bulk_slot():
+        raise HTTPException(
+            status_code=503, detail="Too many bulk jobs in progress")
+
+    try:
+        redis = await get_redis_client()
+    except Exception:
+        release_bulk_slot()
+        raise
+
+    job = BulkJob(
+        redis,
+        chunk_size=get_bulk_chunk_size(),
+        max_inflight=get_bulk_max_inflight(),
+        result_timeout=get_bulk_result_timeout()
+    )
+
+    async def stream_results():
+        try:
+            async for line in job.run(request.stream()):
+                yield line
+        finally:
+            release_bulk_slot()
+            await redis.close()
+
+    return DuplexStreamingResponse(
+        stream_results(), media_type="application/x-ndjson")
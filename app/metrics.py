@@ -0,0 +1,134 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import socket
+from collections import deque
+from typing import Optional, Sequence
+
+from constants import WORKER_METRICS_KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Границы бакетов гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами бакетов."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        buckets = {str(bound): count
+                   for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {"buckets": buckets, "sum": self.total, "count": self.count}
+
+
+class Metrics:
+    """Реестр метрик процесса: счетчики, значения, гистограммы и события."""
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self.events: dict[str, deque] = {}
+
+    def inc(self, name: str, value: int = 1):
+        """Увеличивает счетчик."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Устанавливает текущее значение."""
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float,
+                buckets: Optional[Sequence[float]] = None):
+        """Добавляет наблюдение в гистограмму (создается при первом вызове)."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(
+                buckets or DEFAULT_BUCKETS)
+        histogram.observe(value)
+
+    def record(self, name: str, event: dict, limit: int = 20):
+        """Сохраняет событие, оставляя limit последних событий с этим именем."""
+        events = self.events.get(name)
+        if events is None:
+            events = self.events[name] = deque(maxlen=limit)
+        events.append(event)
+
+    def snapshot(self) -> dict:
+        """Возвращает все метрики в виде JSON-совместимого словаря."""
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "histograms": {
+                name: histogram.snapshot()
+                for name, histogram in self.histograms.items()
+            },
+            "events": {
+                name: list(events) for name, events in self.events.items()
+            }
+        }
+
+
+metrics = Metrics()
+
+
+def get_process_id() -> str:
+    """Идентификатор процесса вида <host>-<pid> для ключей в Redis."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def publish_process_metrics(redis, process_id: str, ttl: int,
+                                  prefix: str = WORKER_METRICS_KEY_PREFIX):
+    """Сохраняет снимок метрик процесса в Redis с ограниченным сроком жизни."""
+    await redis.set(
+        f"{prefix}{process_id}",
+        json.dumps(metrics.snapshot()),
+        ex=ttl
+    )
+
+
+async def report_process_metrics(redis, interval: int,
+                                 prefix: str = WORKER_METRICS_KEY_PREFIX):
+    """Публикует метрики процесса в Redis раз в interval секунд."""
+    process_id = get_process_id()
+    while True:
+        try:
+            await publish_process_metrics(
+                redis, process_id, ttl=interval * 3, prefix=prefix)
+        except Exception as e:
+            logger.error(f"Failed to publish process metrics: {e}")
+        await asyncio.sleep(interval)
+
+
+async def load_process_metrics(
+        redis, prefix: str = WORKER_METRICS_KEY_PREFIX) -> dict[str, dict]:
+    """Собирает последние снимки метрик всех живых процессов с префиксом."""
+    keys = [key async for key in redis.scan_iter(match=f"{prefix}*")]
+    if not keys:
+        return {}
+    # По одному GET в конвейере: в кластере ключи лежат в разных слотах
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.get(key)
+        values = await pipe.execute()
+    return {
+        key.decode("utf-8")[len(prefix):]: json.loads(value)
+        for key, value in zip(keys, values) if value is not None
+    }
@@ -0,0 +1,273 @@
+from typing import Any, Mapping, Optional
+
+import numpy as np
+
+from config import (
+    get_audio_channels,
+    get_audio_sample_rate,
+    get_audio_sample_width,
+)
+from constants import (
+    AUDIO_ENCODINGS,
+    AUDIO_MAX_CHANNELS,
+    AUDIO_MAX_SAMPLE_RATE,
+    AUDIO_MIN_SAMPLE_RATE,
+)
+from protocol import ProtocolError
+
+# Тип отсчета кодирования (little-endian) и кодирование по ширине отсчета
+SAMPLE_DTYPES = {"pcm16": np.dtype("<i2"), "float32": np.dtype("<f4")}
+WIDTH_ENCODINGS = {2: "pcm16", 4: "float32"}
+PCM16_SCALE = 32768.0
+# Фильтр против наложения спектров при понижении частоты: окно Кайзера
+# (затухание ~100 дБ), срез на доле новой частоты Найквиста и число
+# отводов на каждую единицу коэффициента понижения
+ANTIALIAS_BETA = 10.0
+ANTIALIAS_CUTOFF = 0.9
+ANTIALIAS_TAPS_PER_RATIO = 32
+
+
+class AudioFormat:
+    """Формат аудио: кодирование отсчетов, частота и число каналов."""
+
+    __slots__ = ("encoding", "sample_rate", "channels")
+
+    def __init__(self, encoding: str, sample_rate: int, channels: int):
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def frame_size(self) -> int:
+        """Размер фрейма (отсчеты всех каналов) в байтах."""
+        return SAMPLE_DTYPES[self.encoding].itemsize * self.channels
+
+    def _key(self) -> tuple:
+        return self.encoding, self.sample_rate, self.channels
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, AudioFormat) and self._key() == other._key()
+
+    def __repr__(self) -> str:
+        return (f"AudioFormat({self.encoding}, {self.sample_rate} Hz, "
+                f"{self.channels} ch)")
+
+
+def canonical_format() -> AudioFormat:
+    """Формат, в котором аудио получают воркеры (AUDIO_* настройки)."""
+    encoding = WIDTH_ENCODINGS.get(get_audio_sample_width())
+    if encoding is None:
+        raise ProtocolError("Audio format negotiation is not supported")
+    return AudioFormat(encoding, get_audio_sample_rate(), get_audio_channels())
+
+
+def _read_int(params: Mapping[str, Any], field: str, default: int,
+              low: int, high: int) -> int:
+    value = params.get(field, default)
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if (isinstance(value, bool) or not isinstance(value, int)
+            or not low <= value <= high):
+        raise ProtocolError(
+            f"Field '{field}' must be an integer in range [{low}, {high}]")
+    return value
+
+
+def parse_audio_format(params: Mapping[str, Any]) -> Optional[AudioFormat]:
+    """Разбирает объявленный клиентом формат или None, если он не объявлен.
+
+    params — параметры подключения или управляющее сообщение с полями
+    encoding, sample_rate и channels; пропущенные поля берутся из
+    формата воркеров.
+    """
+    if not any(field in params
+               for field in ("encoding", "sample_rate", "channels")):
+        return None
+    target = canonical_format()
+    encoding = params.get("encoding", target.encoding)
+    if encoding not in AUDIO_ENCODINGS:
+        raise ProtocolError(
+            f"Field 'encoding' must be one of: {', '.join(AUDIO_ENCODINGS)}")
+    return AudioFormat(
+        encoding,
+        _read_int(params, "sample_rate", target.sample_rate,
+                  AUDIO_MIN_SAMPLE_RATE, AUDIO_MAX_SAMPLE_RATE),
+        _read_int(params, "channels", target.channels, 1, AUDIO_MAX_CHANNELS),
+    )
+
+
+def decode(samples: np.ndarray, encoding: str) -> np.ndarray:
+    """Переводит отсчеты в float32 в диапазоне [-1, 1]."""
+    if encoding == "pcm16":
+        return samples.astype(np.float32) / PCM16_SCALE
+    return samples.astype(np.float32)
+
+
+def encode(signal: np.ndarray, encoding: str) -> bytes:
+    """Кодирует float-сигнал отсчетами формата с насыщением."""
+    if encoding == "pcm16":
+        samples = np.rint(signal * PCM16_SCALE)
+        return np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+    return np.clip(signal, -1.0, 1.0).astype("<f4").tobytes()
+
+
+def lowpass_taps(source_rate: int, target_rate: int) -> np.ndarray:
+    """Отводы FIR-фильтра нижних частот для понижения частоты.
+
+    Срез — ANTIALIAS_CUTOFF от частоты Найквиста target_rate; число
+    отводов нечетное, коэффициент передачи на нуле равен единице.
+    """
+    ratio = source_rate / target_rate
+    half = ANTIALIAS_TAPS_PER_RATIO * int(np.ceil(ratio)) // 2
+    cutoff = ANTIALIAS_CUTOFF / ratio
+    n = np.arange(-half, half + 1)
+    taps = np.sinc(cutoff * n) * np.kaiser(2 * half + 1, ANTIALIAS_BETA)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def remix(signal: np.ndarray, channels: int) -> np.ndarray:
+    """Сводит фреймы (строки) к channels каналам."""
+    if signal.shape[1] == channels:
+        return signal
+    if channels == 1:
+        return signal.mean(axis=1, keepdims=True, dtype=np.float32)
+    return np.repeat(signal, channels, axis=1)
+
+
+class AudioNormalizer:
+    """Приводит аудио сессии к формату воркеров по мере поступления чанков.
+
+    Чанк обрабатывается целиком одним векторным проходом NumPy:
+    декодирование в float, сведение каналов, передискретизация линейной
+    интерполяцией и кодирование. При понижении частоты перед интерполяцией
+    сигнал проходит FIR-фильтр нижних частот, иначе частоты выше новой
+    частоты Найквиста накладываются на речь. Неполный фрейм в конце чанка
+    переносится в следующий, а фильтр и передискретизация продолжаются
+    с того же положения, поэтому результат не зависит от нарезки потока
+    на чанки.
+    """
+
+    __slots__ = ("source", "target", "_remainder", "_last", "_offset",
+                 "_taps", "_history")
+
+    def __init__(self, source: AudioFormat, target: AudioFormat):
+        if (source.channels != target.channels
+                and 1 not in (source.channels, target.channels)):
+            raise ProtocolError(
+                f"Cannot convert {source.channels} channels "
+                f"to {target.channels}")
+        self.source = source
+        self.target = target
+        self._remainder = b""
+        # Последний входной фрейм предыдущего чанка — левая точка
+        # интерполяции для начала следующего
+        self._last: Optional[np.ndarray] = None
+        # Положение следующего выходного отсчета после _last
+        # в долях 1 / target.sample_rate входного отсчета
+        self._offset = 0
+        # Отводы фильтра (None — частота не понижается) и входные фреймы,
+        # которые фильтр еще не может обработать: фильтр симметричный,
+        # без задержки, поэтому ждет половину своей длины следующих фреймов
+        self._taps: Optional[np.ndarray] = None
+        if source.sample_rate > target.sample_rate:
+            self._taps = lowpass_taps(source.sample_rate, target.sample_rate)
+        self._history: Optional[np.ndarray] = None
+
+    def feed(self, data: bytes) -> bytes:
+        """Возвращает аудио чанка в формате воркеров (может быть пустым)."""
+        if self._remainder:
+            data = self._remainder + data
+        frame_size = self.source.frame_size
+        usable = len(data) - len(data) % frame_size
+        self._remainder = bytes(data[usable:])
+        if not usable:
+            return b""
+        samples = np.frombuffer(
+            data, dtype=SAMPLE_DTYPES[self.source.encoding],
+            count=usable // SAMPLE_DTYPES[self.source.encoding].itemsize)
+        signal = decode(samples.reshape(-1, self.source.channels),
+                        self.source.encoding)
+        signal = remix(signal, self.target.channels)
+        if self._taps is not None:
+            signal = self._filter(signal)
+        return encode(self._resample(signal), self.target.encoding)
+
+    def flush(self) -> bytes:
+        """Завершает поток: возвращает отсчеты, ждавшие следующего чанка.
+
+        Фильтр дорабатывает конец потока, продолжая его последним фреймом;
+        выходной отсчет, попавший точно на последний входной фрейм,
+        выдается без интерполяции; неполный фрейм в конце отбрасывается.
+        """
+        tail = np.empty((0, self.target.channels), dtype=np.float32)
+        if self._history is not None:
+            half = len(self._taps) // 2
+            tail = self._resample(
+                self._filter(np.repeat(self._history[-1:], half, axis=0)))
+        last, offset = self._last, self._offset
+        self._remainder = b""
+        self._last = None
+        self._offset = 0
+        self._history = None
+        if last is not None and not offset:
+            tail = np.concatenate((tail, last))
+        if not len(tail):
+            return b""
+        return encode(tail, self.target.encoding)
+
+    def _filter(self, signal: np.ndarray) -> np.ndarray:
+        """Пропускает фреймы через фильтр нижних частот.
+
+        Возвращает отфильтрованные фреймы, для которых уже пришла
+        половина длины фильтра следующих; начало потока продолжается
+        назад первым фреймом.
+        """
+        taps = self._taps
+        if self._history is None:
+            signal = np.concatenate(
+                (np.repeat(signal[:1], len(taps) // 2, axis=0), signal))
+        else:
+            signal = np.concatenate((self._history, signal))
+        self._history = signal[-(len(taps) - 1):]
+        if len(signal) < len(taps):
+            return signal[:0]
+        return np.stack([np.convolve(signal[:, channel], taps, "valid")
+                         for channel in range(signal.shape[1])], axis=1)
+
+    def _resample(self, signal: np.ndarray) -> np.ndarray:
+        source_rate = self.source.sample_rate
+        target_rate = self.target.sample_rate
+        if source_rate == target_rate or not len(signal):
+            return signal
+        if self._last is not None:
+            signal = np.concatenate((self._last, signal))
+        # Выходной отсчет k лежит во входе в точке
+        # (offset + k * source_rate) / target_rate; берутся точки левее
+        # последнего фрейма, остальные ждут следующего чанка
+        span = (len(signal) - 1) * target_rate - self._offset
+        count = max(0, -(-span // source_rate))
+        positions = self._offset + np.arange(
+            count, dtype=np.int64) * source_rate
+        index = positions // target_rate
+        weight = ((positions % target_rate).astype(np.float32)
+                  / target_rate)[:, None]
+        resampled = (signal[index] * (1 - weight)
+                     + signal[index + 1] * weight)
+        self._offset += count * source_rate - (len(signal) - 1) * target_rate
+        self._last = signal[-1:].copy()
+        return resampled
+
+
+def create_normalizer(params: Mapping[str, Any]) -> Optional[AudioNormalizer]:
+    """Создает нормализатор объявленного формата или None.
+
+    None — формат не объявлен (аудио передается воркерам как есть)
+    или совпадает с форматом воркеров.
+    """
+    source = parse_audio_format(params)
+    if source is None:
+        return None
+    target = canonical_format()
+    if source == target:
+        return None
+    return AudioNormalizer(source, target)
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from constants import PROFILE_REPORT_TTL_S, WORKER_PROFILE_KEY_PREFIX
+
+# Кадры, которые не относятся к профилируемому коду
+_IGNORED_FILES = (__file__, tracemalloc.__file__,
+                  "<frozen importlib._bootstrap>", "<unknown>")
+
+# Сколько строк кода с наибольшим объемом памяти попадает в отчет
+DEFAULT_TOP = 25
+
+# Одновременно в процессе идет не больше одного профилирования
+_profile_lock = asyncio.Lock()
+
+
+class ProfileBusyError(Exception):
+    """Профилирование процесса уже идет."""
+
+
+def frame_label(frame) -> str:
+    """Подпись кадра в свернутом стеке: функция (файл:строка начала)."""
+    code = frame.f_code
+    return (f"{code.co_name} "
+            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+
+
+def collapse_stack(frame) -> str:
+    """Стек кадра от корня к вершине в формате flamegraph: a;b;c."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик: hz раз в секунду снимает стеки потоков.
+
+    Работает в отдельном потоке и не трогает профилируемый код, поэтому
+    годится для процесса под рабочей нагрузкой. Стек каждого потока
+    начинается с его имени, чтобы цикл событий не смешивался с потоками
+    пула.
+    """
+
+    def __init__(self, hz: float):
+        self.interval = 1 / hz
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def sample(self):
+        """Снимает стеки всех потоков, кроме собственного."""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            thread = names.get(thread_id, str(thread_id))
+            self.stacks[f"{thread};{collapse_stack(frame)}"] += 1
+        self.samples += 1
+
+    def run(self, seconds: float):
+        """Сэмплирует seconds секунд (вызывается в отдельном потоке)."""
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            self.sample()
+            next_sample += self.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+
+    def collapsed(self) -> str:
+        """Свернутые стеки, по строке «стек число» на уникальный стек."""
+        return "\n".join(f"{stack} {count}"
+                         for stack, count in self.stacks.most_common())
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot,
+                    baseline: Optional[tracemalloc.Snapshot],
+                    top: int) -> list[dict]:
+    """Строки кода с наибольшим объемом памяти (прироста от baseline)."""
+    filters = [tracemalloc.Filter(False, name) for name in _IGNORED_FILES]
+    snapshot = snapshot.filter_traces(filters)
+    if baseline is None:
+        stats = snapshot.statistics("lineno")
+    else:
+        stats = snapshot.compare_to(baseline.filter_traces(filters), "lineno")
+    report = []
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        report.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "size_diff_bytes": getattr(stat, "size_diff", stat.size),
+        })
+    return report
+
+
+async def run_profile(seconds: float, hz: float, top: int,
+                      memory: bool = True) -> dict:
+    """Профилирует процесс seconds секунд: CPU по стекам и выделения памяти.
+
+    Если tracemalloc не был включен, он работает только на время окна,
+    и отчет показывает память, выделенную за окно и еще не освобожденную;
+    иначе — прирост относительно снимка в начале окна.
+    """
+    if _profile_lock.locked():
+        raise ProfileBusyError("Profiling is already running")
+    async with _profile_lock:
+        started_tracing = baseline = None
+        if memory:
+            if tracemalloc.is_tracing():
+                baseline = tracemalloc.take_snapshot()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+        sampler = StackSampler(hz)
+        started = time.monotonic()
+        try:
+            await asyncio.to_thread(sampler.run, seconds)
+            allocations = None
+            if memory:
+                allocations = top_allocations(
+                    tracemalloc.take_snapshot(), baseline, top)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return {
+            "duration_s": round(time.monotonic() - started, 3),
+            "samples": sampler.samples,
+            "hz": hz,
+            "collapsed": sampler.collapsed(),
+            "top_allocations": allocations,
+        }
+
+
+async def publish_profile(redis, process_id: str, report: dict):
+    """Сохраняет отчет профилирования процесса в Redis."""
+    await redis.set(f"{WORKER_PROFILE_KEY_PREFIX}{process_id}",
+                    json.dumps({**report, "finished_at": time.time()}),
+                    ex=PROFILE_REPORT_TTL_S)
+
+
+async def load_worker_profiles(redis) -> dict[str, dict]:
+    """Собирает последние отчеты профилирования воркеров."""
+    keys = [key async for key in redis.scan_iter(
+        match=f"{WORKER_PROFILE_KEY_PREFIX}*")]
+    if not keys:
+        return {}
+    # По одному GET в конвейере: в кластере ключи лежат в разных слотах
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.get(key)
+        values = await pipe.execute()
+    return {
+        key.decode("utf-8")[len(WORKER_PROFILE_KEY_PREFIX):]: json.loads(value)
+        for key, value in zip(keys, values) if value is not None
+    }
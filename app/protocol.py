@@ -0,0 +1,63 @@
+import json
+import struct
+from typing import Any
+
+# Заголовок бинарного фрейма мультиплексированного соединения:
+# идентификатор логического потока, uint32 big-endian
+MUX_HEADER = struct.Struct("!I")
+# Наибольший идентификатор потока, помещающийся в заголовок
+MAX_STREAM_ID = 2 ** 32 - 1
+
+
+class ProtocolError(ValueError):
+    """Ошибка протокола управляющих сообщений WebSocket."""
+
+
+def parse_control_message(text: str) -> dict[str, Any]:
+    """Разбирает текстовый управляющий фрейм вида {"type": ..., ...}."""
+    try:
+        message = json.loads(text)
+    except json.JSONDecodeError:
+        raise ProtocolError("Control message is not valid JSON")
+
+    if not isinstance(message, dict) or not isinstance(message.get("type"), str):
+        raise ProtocolError("Control message must be an object with 'type'")
+    return message
+
+
+def require_int(message: dict[str, Any], field: str) -> int:
+    """Возвращает целочисленное неотрицательное поле управляющего сообщения."""
+    value = message.get(field)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ProtocolError(f"Field '{field}' must be a non-negative integer")
+    return value
+
+
+def require_str(message: dict[str, Any], field: str) -> str:
+    """Возвращает непустое строковое поле управляющего сообщения."""
+    value = message.get(field)
+    if not isinstance(value, str) or not value:
+        raise ProtocolError(f"Field '{field}' must be a non-empty string")
+    return value
+
+
+def require_stream_id(message: dict[str, Any]) -> int:
+    """Возвращает идентификатор потока, помещающийся в заголовок фрейма."""
+    stream_id = require_int(message, "stream_id")
+    if stream_id > MAX_STREAM_ID:
+        raise ProtocolError(
+            f"Field 'stream_id' must be in range [0, {MAX_STREAM_ID}]")
+    return stream_id
+
+
+def encode_mux_frame(stream_id: int, payload: bytes) -> bytes:
+    """Добавляет к аудио-данным заголовок с идентификатором потока."""
+    return MUX_HEADER.pack(stream_id) + payload
+
+
+def decode_mux_frame(frame: bytes) -> tuple[int, bytes]:
+    """Разбирает бинарный фрейм на идентификатор потока и аудио-данные."""
+    if len(frame) < MUX_HEADER.size:
+        raise ProtocolError("Frame is shorter than stream header")
+    (stream_id,) = MUX_HEADER.unpack_from(frame)
+    return stream_id, frame[MUX_HEADER.size:]
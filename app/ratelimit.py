@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import math
+from typing import Optional
+
+from metrics import metrics
+from config import (
+    get_api_key_tiers,
+    get_max_audio_size,
+    get_rate_limit_burst,
+    get_rate_limit_default_tier,
+    get_rate_limit_tiers,
+    is_rate_limit_redis_enabled,
+)
+from constants import RATE_LIMIT_KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Корзина ключа в Redis: KEYS[1] — хеш {c, b, t}; ARGV — скорость и емкость
+# по чанкам, скорость и емкость по байтам, размер чанка, TTL ключа (мс).
+# Возвращает 0, если чанк пропущен, иначе сколько ждать в мс. Время берется
+# у Redis, чтобы корзина не зависела от часов узлов шлюза.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'c', 'b', 't')
+local chunk_rate = tonumber(ARGV[1])
+local chunk_capacity = tonumber(ARGV[2])
+local byte_rate = tonumber(ARGV[3])
+local byte_capacity = tonumber(ARGV[4])
+local size = tonumber(ARGV[5])
+local elapsed = math.max(0, now - (tonumber(state[3]) or now)) / 1000
+local chunks = math.min(chunk_capacity,
+    (tonumber(state[1]) or chunk_capacity) + elapsed * chunk_rate)
+local bytes = math.min(byte_capacity,
+    (tonumber(state[2]) or byte_capacity) + elapsed * byte_rate)
+local wait = 0
+if chunk_rate > 0 and chunks < 1 then
+    wait = math.max(wait, (1 - chunks) / chunk_rate)
+end
+if byte_rate > 0 and bytes < size then
+    wait = math.max(wait, (size - bytes) / byte_rate)
+end
+if wait == 0 then
+    chunks = chunks - 1
+    bytes = bytes - size
+end
+redis.call('HSET', KEYS[1], 'c', chunks, 'b', bytes, 't', now)
+redis.call('PEXPIRE', KEYS[1], ARGV[6])
+return math.ceil(wait * 1000)
+"""
+
+
+class TokenBucket:
+    """Корзина токенов: пополняется со скоростью rate до capacity."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Пополняет корзину и возвращает ожидание до amount токенов, в с."""
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+class RateLimit:
+    """Лимит на чанки в секунду и байты в секунду (0 — без ограничения).
+
+    Емкость корзин — burst секунд на полной скорости, но не меньше
+    одного максимального чанка, иначе крупный чанк не прошел бы никогда.
+    """
+
+    __slots__ = ("chunks", "bytes")
+
+    def __init__(self, chunks_per_s: float, bytes_per_s: float,
+                 burst: float, now: float):
+        self.chunks = None
+        self.bytes = None
+        if chunks_per_s > 0:
+            self.chunks = TokenBucket(
+                chunks_per_s, max(chunks_per_s * burst, 1.0), now)
+        if bytes_per_s > 0:
+            self.bytes = TokenBucket(
+                bytes_per_s,
+                max(bytes_per_s * burst, get_max_audio_size()), now)
+
+    def wait_time(self, size: int, now: float) -> float:
+        """Возвращает ожидание до пропуска чанка size байт (0 — можно сейчас)."""
+        wait = 0.0
+        if self.chunks is not None:
+            wait = self.chunks.wait_time(1, now)
+        if self.bytes is not None:
+            wait = max(wait, self.bytes.wait_time(size, now))
+        return wait
+
+    def consume(self, size: int):
+        """Списывает чанк size байт после успешной проверки wait_time."""
+        if self.chunks is not None:
+            self.chunks.tokens -= 1
+        if self.bytes is not None:
+            self.bytes.tokens -= size
+
+
+def parse_limit(spec: Optional[dict]) -> tuple[float, float]:
+    """Возвращает (чанков/с, байт/с) из описания лимита тарифа."""
+    if not spec:
+        return 0.0, 0.0
+    return (float(spec.get("chunks_per_s", 0)),
+            float(spec.get("bytes_per_s", 0)))
+
+
+def is_unlimited(limit: tuple[float, float]) -> bool:
+    return limit[0] <= 0 and limit[1] <= 0
+
+
+# Корзины API-ключей, общие для всех соединений процесса; число ключей
+# ограничено настройкой API_KEY_TIERS
+_key_limits: dict[str, RateLimit] = {}
+_token_bucket_script = None
+
+
+def redis_bucket_key(api_key: str) -> str:
+    """Ключ корзины API-ключа в Redis (сам ключ в Redis не попадает)."""
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+    return f"{RATE_LIMIT_KEY_PREFIX}{digest}"
+
+
+class ClientLimiter:
+    """Лимиты соединения: своя корзина сессии и общая корзина API-ключа.
+
+    На /ws/mux лимит сессии действует на каждый логический поток
+    отдельно (stream_id в acquire), иначе соединение со многими звонками
+    упиралось бы в лимит одного. Проверка чанка — O(1): по две корзины
+    на сессию и ключ; с общими лимитами (RATE_LIMIT_REDIS=1) корзина
+    ключа проверяется одним вызовом скрипта в Redis.
+    """
+
+    __slots__ = ("tier", "api_key", "session", "streams", "_session_limit",
+                 "_burst", "_key_limit", "_redis")
+
+    def __init__(self, tier: str, api_key: Optional[str], now: float,
+                 redis=None):
+        tiers = get_rate_limit_tiers()
+        spec = tiers.get(tier) or tiers.get(get_rate_limit_default_tier(), {})
+        burst = get_rate_limit_burst()
+        self.tier = tier
+        self.api_key = api_key
+
+        session_limit = parse_limit(spec.get("session"))
+        self.session = None
+        if not is_unlimited(session_limit):
+            self.session = RateLimit(*session_limit, burst, now)
+        self._session_limit = session_limit
+        self._burst = burst
+        # Корзины потоков /ws/mux: stream_id -> RateLimit (по требованию);
+        # как и публикаторы, живут до конца соединения, поэтому повторное
+        # открытие потока не обнуляет его лимит
+        self.streams: dict[int, RateLimit] = {}
+
+        self._key_limit = parse_limit(spec.get("key"))
+        self._redis = redis if is_rate_limit_redis_enabled() else None
+        if api_key is None or is_unlimited(self._key_limit):
+            self.api_key = None
+        elif self._redis is None and api_key not in _key_limits:
+            _key_limits[api_key] = RateLimit(*self._key_limit, burst, now)
+
+    async def _key_wait_time(self, size: int, now: float) -> float:
+        """Проверяет и списывает чанк из корзины API-ключа."""
+        if self._redis is None:
+            limit = _key_limits[self.api_key]
+            wait = limit.wait_time(size, now)
+            if wait == 0:
+                limit.consume(size)
+            return wait
+
+        global _token_bucket_script
+        if _token_bucket_script is None:
+            _token_bucket_script = self._redis.register_script(
+                TOKEN_BUCKET_SCRIPT)
+        chunks_per_s, bytes_per_s = self._key_limit
+        burst = get_rate_limit_burst()
+        try:
+            wait_ms = await _token_bucket_script(
+                keys=[redis_bucket_key(self.api_key)],
+                args=[chunks_per_s, max(chunks_per_s * burst, 1.0),
+                      bytes_per_s,
+                      max(bytes_per_s * burst, get_max_audio_size()),
+                      size, math.ceil(burst * 2000)],
+                client=self._redis)
+        except Exception as e:
+            # Недоступность Redis не должна останавливать аудио
+            logger.error(f"Shared rate limit check failed: {e}")
+            return 0.0
+        return int(wait_ms) / 1000
+
+    def _stream_limit(self, stream_id: int, now: float) -> RateLimit:
+        limit = self.streams.get(stream_id)
+        if limit is None:
+            limit = self.streams[stream_id] = RateLimit(
+                *self._session_limit, self._burst, now)
+        return limit
+
+    async def acquire(self, size: int, now: float,
+                      stream_id: Optional[int] = None) -> float:
+        """Пропускает чанк size байт или возвращает, сколько ждать, в с.
+
+        stream_id — поток /ws/mux со своей корзиной лимита сессии.
+        Токены списываются только при пропуске по обоим лимитам.
+        """
+        session = self.session
+        if session is not None and stream_id is not None:
+            session = self._stream_limit(stream_id, now)
+        if session is not None:
+            wait = session.wait_time(size, now)
+            if wait > 0:
+                metrics.inc("chunks_rate_limited")
+                return wait
+        if self.api_key is not None:
+            wait = await self._key_wait_time(size, now)
+            if wait > 0:
+                metrics.inc("chunks_rate_limited")
+                return wait
+        if session is not None:
+            session.consume(size)
+        return 0.0
+
+
+def create_client_limiter(websocket, redis, now: float) -> ClientLimiter:
+    """Создает лимиты соединения по API-ключу (X-API-Key или ?api_key=)."""
+    api_key = (websocket.headers.get("x-api-key")
+               or websocket.query_params.get("api_key"))
+    tier = get_api_key_tiers().get(api_key) if api_key else None
+    if tier is None:
+        # Неизвестный ключ не дает собственной квоты: лимит по умолчанию
+        return ClientLimiter(get_rate_limit_default_tier(), None, now, redis)
+    return ClientLimiter(tier, api_key, now, redis)
@@ -1,14 +1,179 @@
+import asyncio
+import zlib
+from typing import Optional
+
 import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+from redis.crc import key_slot
 
-from config import get_redis_url
+from config import (
+    get_redis_url,
+    get_transcript_channel_shards,
+    is_redis_cluster_enabled,
+)
 from constants import AUDIO_CHANNEL, TRANSCRIPTS_CHANNEL
 
 
 async def get_redis_client():
-    """Создает и возвращает асинхронный клиент Redis (redis.asyncio)."""
+    """Создает и возвращает асинхронный клиент Redis (redis.asyncio).
+
+    С REDIS_CLUSTER=1 это клиент Redis Cluster: REDIS_URL указывает
+    на любой узел, а команды с ключом уходят узлу-владельцу его слота.
+    """
+    if is_redis_cluster_enabled():
+        return RedisCluster.from_url(get_redis_url(), decode_responses=False)
     return redis.from_url(get_redis_url(), decode_responses=False)
 
 
+def transcript_channel(client_id) -> str:
+    """Канал транскриптов сессии.
+
+    В кластере транскрипты делятся на TRANSCRIPT_CHANNEL_SHARDS
+    шардированных каналов по хешу client_id; хеш-тег в имени раскладывает
+    каналы по разным слотам, а значит, и узлам.
+    """
+    if not is_redis_cluster_enabled():
+        return TRANSCRIPTS_CHANNEL
+    shard = zlib.crc32(str(client_id).encode("utf-8")) % (
+        get_transcript_channel_shards())
+    return f"{TRANSCRIPTS_CHANNEL}:{{{shard}}}"
+
+
+def transcript_channels() -> list[str]:
+    """Все каналы транскриптов (для шлюза, раздающего их своим сессиям)."""
+    if not is_redis_cluster_enabled():
+        return [TRANSCRIPTS_CHANNEL]
+    return [f"{TRANSCRIPTS_CHANNEL}:{{{shard}}}"
+            for shard in range(get_transcript_channel_shards())]
+
+
+def publish_message(client, channel: str, message):
+    """PUBLISH, а в кластере SPUBLISH: сообщение получает только узел слота.
+
+    client — клиент или конвейер; возвращает то же, что его publish.
+    """
+    if is_redis_cluster_enabled():
+        return client.spublish(channel, message)
+    return client.publish(channel, message)
+
+
+def group_by_slot(keys) -> list[list]:
+    """Делит ключи на группы, которые можно передать в одну команду.
+
+    Вне кластера все ключи — одна группа; в кластере многоключевая
+    команда (например, XREADGROUP по нескольким потокам) допустима
+    только для ключей одного слота.
+    """
+    if not is_redis_cluster_enabled():
+        return [list(keys)]
+    groups: dict[int, list] = {}
+    for key in keys:
+        groups.setdefault(key_slot(key.encode("utf-8")), []).append(key)
+    return list(groups.values())
+
+
+def create_pubsub(client):
+    """Подписка на каналы: обычная или, в кластере, шардированная."""
+    if is_redis_cluster_enabled():
+        return ShardedPubSub(client)
+    return client.pubsub()
+
+
+class ShardedPubSub:
+    """Подписка на шардированные каналы Redis Cluster (SSUBSCRIBE).
+
+    Шардированное сообщение проходит только через узел-владелец слота
+    канала, а не рассылается всем узлам кластера, как PUBLISH. На каждый
+    узел с нужными каналами открывается своя подписка, и сообщения всех
+    узлов сливаются в одну очередь. Поддерживается используемая часть
+    интерфейса PubSub; сообщения приходят с типом "message".
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        # Имя узла -> (клиент узла, подписка, задача чтения)
+        self._nodes: dict[str, tuple] = {}
+        self._channels: dict[str, str] = {}
+        self._messages: asyncio.Queue = asyncio.Queue()
+
+    def _connect(self, node):
+        """Клиент узла и подписка на нем."""
+        client = redis.Redis(connection_pool=redis.ConnectionPool(
+            connection_class=node.connection_class, **node.connection_kwargs))
+        return client, client.pubsub()
+
+    def _node_pubsub(self, node):
+        entry = self._nodes.get(node.name)
+        if entry is None:
+            entry = self._nodes[node.name] = (*self._connect(node), None)
+        return entry[1]
+
+    async def _read(self, pubsub):
+        """Перекладывает сообщения подписки узла в общую очередь."""
+        try:
+            async for message in pubsub.listen():
+                if message["type"] in ("smessage", b"smessage"):
+                    self._messages.put_nowait({**message, "type": "message"})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Ошибка узла достается читателю очереди
+            self._messages.put_nowait(e)
+
+    async def subscribe(self, *channels: str):
+        """Подписывается на каналы у узлов-владельцев их слотов."""
+        await self.cluster.initialize()
+        for channel in channels:
+            node = self.cluster.get_node_from_key(channel)
+            # По одному каналу: каналы узла могут лежать в разных слотах
+            await self._node_pubsub(node).ssubscribe(channel)
+            self._channels[channel] = node.name
+        for name, (client, pubsub, task) in self._nodes.items():
+            if task is None:
+                self._nodes[name] = (
+                    client, pubsub, asyncio.create_task(self._read(pubsub)))
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels:
+            name = self._channels.pop(channel, None)
+            if name is not None:
+                await self._nodes[name][1].sunsubscribe(channel)
+
+    async def get_message(self, ignore_subscribe_messages: bool = True,
+                          timeout: Optional[float] = 0.0) -> Optional[dict]:
+        """Следующее сообщение любого узла или None по таймауту."""
+        if not self._messages.empty():
+            item = self._messages.get_nowait()
+        elif timeout is not None and timeout <= 0:
+            return None
+        else:
+            try:
+                item = await asyncio.wait_for(self._messages.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def listen(self):
+        while True:
+            yield await self.get_message(timeout=None)
+
+    async def close(self):
+        """Останавливает чтение и закрывает подписки и клиенты узлов."""
+        for client, pubsub, task in self._nodes.values():
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+            await pubsub.close()
+            await client.close()
+        self._nodes.clear()
+        self._channels.clear()
+
+
 async def test_redis_connection():
     """Проверяет доступность Redis командой PING."""
     try:
@@ -25,7 +190,7 @@ async def publish_audio_chunk(data: bytes):
     """Публикует бинарный аудио-чанк в канал Redis."""
     redis = await get_redis_client()
     try:
-        await redis.publish(AUDIO_CHANNEL, data)
+        await publish_message(redis, AUDIO_CHANNEL, data)
     finally:
         await redis.close()
 
@@ -33,9 +198,10 @@ async def publish_audio_chunk(data: bytes):
 async def subscribe_to_transcripts(callback):
     """Подписывается на канал транскриптов и вызывает callback на каждое сообщение."""
     redis = await get_redis_client()
-    pubsub = redis.pubsub()
+    pubsub = create_pubsub(redis)
+    channels = transcript_channels()
     try:
-        await pubsub.subscribe(TRANSCRIPTS_CHANNEL)
+        await pubsub.subscribe(*channels)
         async for message in pubsub.listen():
             if message["type"] == "message":
                 text = message["data"].decode("utf-8", errors="ignore")
@@ -43,6 +209,6 @@ async def subscribe_to_transcripts(callback):
     except Exception as e:
         print(f"Error in transcript subscription: {e}")
     finally:
-        await pubsub.unsubscribe(TRANSCRIPTS_CHANNEL)
+        await pubsub.unsubscribe(*channels)
         await pubsub.close()
         await redis.close()
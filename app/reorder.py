@@ -0,0 +1,65 @@
+from typing import Any, Optional
+
+
+class ReorderBuffer:
+    """Выдает элементы в порядке seq, ожидая пропущенные ограниченное время.
+
+    Пропуск в последовательности ждет не дольше timeout секунд и не дольше,
+    чем в буфере накопится max_size элементов; после этого выдача
+    продолжается с ближайшего имеющегося номера. Опоздавшие элементы с
+    номером меньше ожидаемого отдаются сразу, чтобы не терять данные.
+    """
+
+    __slots__ = ("_next_seq", "_pending", "_max_size", "_timeout",
+                 "_gap_since")
+
+    def __init__(self, max_size: int, timeout: float, start_seq: int = 0):
+        self._next_seq = start_seq
+        self._pending: dict[int, Any] = {}
+        self._max_size = max_size
+        self._timeout = timeout
+        self._gap_since: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, seq: int, item: Any, now: float) -> list[Any]:
+        """Добавляет элемент и возвращает элементы, готовые к выдаче."""
+        if seq < self._next_seq:
+            return [item]
+
+        self._pending[seq] = item
+        ready = self._drain(now)
+        if len(self._pending) > self._max_size:
+            ready.extend(self._skip_gap(now))
+        elif self._pending and self._gap_since is None:
+            self._gap_since = now
+        return ready
+
+    def expire(self, now: float) -> list[Any]:
+        """Возвращает элементы, если пропуск ждет дольше таймаута."""
+        if self._gap_since is None or now - self._gap_since < self._timeout:
+            return []
+        return self._skip_gap(now)
+
+    def next_deadline(self) -> Optional[float]:
+        """Момент, когда ожидание текущего пропуска истечет."""
+        if self._gap_since is None:
+            return None
+        return self._gap_since + self._timeout
+
+    def _skip_gap(self, now: float) -> list[Any]:
+        """Пропускает недостающие номера до ближайшего имеющегося."""
+        self._next_seq = min(self._pending)
+        return self._drain(now)
+
+    def _drain(self, now: float) -> list[Any]:
+        """Выдает непрерывную последовательность, начиная с ожидаемого номера."""
+        ready = []
+        while self._next_seq in self._pending:
+            ready.append(self._pending.pop(self._next_seq))
+            self._next_seq += 1
+        if ready:
+            # Таймер ожидания перезапускается для следующего пропуска
+            self._gap_since = now if self._pending else None
+        return ready
@@ -0,0 +1,121 @@
+import json
+import logging
+import secrets
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from config import get_replay_buffer_size, get_session_resume_ttl
+from constants import (
+    REPLAY_KEY_PREFIX,
+    RESUME_TOKEN_KEY_PREFIX,
+    SESSION_STATE_KEY_PREFIX,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResumeState:
+    """Состояние возобновляемой сессии, сохраненное в Redis."""
+
+    session_id: str
+    resume_token: str
+    next_seq: int = 0
+    last_acked_seq: int = -1
+    replay: list[dict] = field(default_factory=list)
+
+    @property
+    def last_processed_seq(self) -> int:
+        """Наибольший seq, для которого воркер уже выдал транскрипт."""
+        seqs = [item["seq"] for item in self.replay if "seq" in item]
+        return max(seqs, default=-1)
+
+    def missed_transcripts(self) -> list[dict]:
+        """Транскрипты из буфера повтора, которые клиент еще не подтвердил."""
+        return [
+            item for item in self.replay
+            if item.get("seq", -1) > self.last_acked_seq
+        ]
+
+
+def _session_key(session_id: str) -> str:
+    return f"{SESSION_STATE_KEY_PREFIX}{session_id}"
+
+
+def _token_key(resume_token: str) -> str:
+    return f"{RESUME_TOKEN_KEY_PREFIX}{resume_token}"
+
+
+def replay_key(session_id: str) -> str:
+    """Ключ Redis-списка с последними транскриптами сессии."""
+    return f"{REPLAY_KEY_PREFIX}{session_id}"
+
+
+async def create_resumable_session(redis) -> ResumeState:
+    """Создает новую возобновляемую сессию и ее токен."""
+    state = ResumeState(
+        session_id=uuid.uuid4().hex,
+        resume_token=secrets.token_urlsafe(24)
+    )
+    ttl = get_session_resume_ttl()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.set(_token_key(state.resume_token), state.session_id, ex=ttl)
+        pipe.hset(_session_key(state.session_id), mapping={
+            "next_seq": state.next_seq,
+            "last_acked_seq": state.last_acked_seq
+        })
+        pipe.expire(_session_key(state.session_id), ttl)
+        await pipe.execute()
+    return state
+
+
+async def load_resumable_session(redis, resume_token: str) -> Optional[ResumeState]:
+    """Загружает сессию по токену; None, если токен неизвестен или истек."""
+    session_id = await redis.get(_token_key(resume_token))
+    if session_id is None:
+        return None
+    session_id = session_id.decode("utf-8")
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(_session_key(session_id))
+        pipe.lrange(replay_key(session_id), 0, -1)
+        stored, replay = await pipe.execute()
+
+    state = ResumeState(
+        session_id=session_id,
+        resume_token=resume_token,
+        next_seq=int(stored.get(b"next_seq", 0)),
+        last_acked_seq=int(stored.get(b"last_acked_seq", -1)),
+        replay=[json.loads(item) for item in replay]
+    )
+    # Если шлюз не успел сохранить прогресс, продолжаем после последнего
+    # обработанного чанка
+    state.next_seq = max(state.next_seq, state.last_processed_seq + 1)
+    return state
+
+
+async def save_session_progress(redis, state: ResumeState, next_seq: int):
+    """Сохраняет следующий seq сессии и продлевает срок жизни ее ключей."""
+    ttl = get_session_resume_ttl()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(_session_key(state.session_id), "next_seq", next_seq)
+        pipe.expire(_session_key(state.session_id), ttl)
+        pipe.expire(_token_key(state.resume_token), ttl)
+        pipe.expire(replay_key(state.session_id), ttl)
+        await pipe.execute()
+
+
+async def ack_session(redis, state: ResumeState, seq: int):
+    """Запоминает последний транскрипт, подтвержденный клиентом."""
+    state.last_acked_seq = max(state.last_acked_seq, seq)
+    await redis.hset(
+        _session_key(state.session_id), "last_acked_seq", state.last_acked_seq)
+
+
+def append_replay(pipe, session_id: str, transcript: bytes):
+    """Добавляет транскрипт в ограниченный буфер повтора (в pipeline)."""
+    key = replay_key(session_id)
+    pipe.rpush(key, transcript)
+    pipe.ltrim(key, -get_replay_buffer_size(), -1)
+    pipe.expire(key, get_session_resume_ttl())
@@ -0,0 +1,597 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Optional
+
+from batcher import create_publish_batcher
+from chunkhints import create_chunk_advisor
+from config import (
+    get_chunk_hint_interval,
+    get_ws_heartbeat_interval,
+    get_ws_idle_timeout,
+    is_transcript_reorder_enabled,
+)
+from constants import AUDIO_METADATA_FIELDS
+from delivery import TranscriptDelivery
+from metrics import metrics
+from redis_client import create_pubsub, get_redis_client, transcript_channels
+from timerwheel import TimerWheel
+from worker_status import load_published_status
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повторной подпиской после ошибки соединения с Redis
+RESUBSCRIBE_DELAY_S = 1.0
+
+# Шаг и число слотов колеса таймеров простаивающих соединений
+REAPER_TICK_S = 1.0
+REAPER_WHEEL_SIZE = 64
+
+# Код закрытия простаивающего соединения и время ожидания закрытия
+IDLE_CLOSE_CODE = 1001
+CLOSE_TIMEOUT_S = 5.0
+
+# Код закрытия при выводе шлюза из работы (Service Restart)
+DRAIN_CLOSE_CODE = 1012
+
+# Статусы фреймов с транскриптами: по чанку или промежуточный
+# и итоговый транскрипт фразы (TRANSCRIPT_STREAMING)
+TRANSCRIPT_STATUSES = ("transcript", "partial", "final")
+
+
+def validate_transcript_data(data: bytes) -> tuple[bool, Optional[str]]:
+    """Проверяет транскрипт: валидная UTF-8 и непустой текст."""
+    if not data:
+        return False, "Transcript data is empty"
+
+    try:
+        text = data.decode("utf-8")
+        if not text.strip():
+            return False, "Transcript text is empty"
+        return True, None
+    except UnicodeDecodeError:
+        return False, "Invalid transcript encoding"
+
+
+def build_transcript_response(transcript_data: dict, client_id) -> dict:
+    """Формирует фрейм транскрипта для клиента с метаданными чанка."""
+    response = {
+        "client_id": client_id,
+        "text": transcript_data["text"],
+        "status": transcript_data.get("status", "transcript")
+    }
+    if "utterance" in transcript_data:
+        response["utterance"] = transcript_data["utterance"]
+    for field in AUDIO_METADATA_FIELDS:
+        if field in transcript_data:
+            response[field] = transcript_data[field]
+    return response
+
+
+def new_session_id() -> str:
+    """Уникальный идентификатор нового соединения.
+
+    Служит ключом сессии у воркеров (seq, дедупликация, архив, история)
+    и при раздаче транскриптов всеми процессами шлюза, поэтому не должен
+    повторяться — в отличие от id() объекта соединения.
+    """
+    return uuid.uuid4().hex
+
+
+def create_delivery(start_seq: int = 0) -> TranscriptDelivery:
+    """Создает фильтр повторов и упорядочивания по настройкам окружения."""
+    return TranscriptDelivery(reorder=is_transcript_reorder_enabled(),
+                              start_seq=start_seq)
+
+
+class Session:
+    """Состояние одного WebSocket-соединения шлюза.
+
+    Не владеет ресурсами Redis: публикация идет через общий клиент,
+    транскрипты доставляет SessionHub. Задача отправки создается только
+    на время, пока у клиента есть неотправленные транскрипты.
+    """
+
+    __slots__ = (
+        "websocket", "client_id", "last_seen", "publisher", "aggregator",
+        "upload", "resume_state", "streams", "publishers", "completed",
+        "open_utterances", "_delivery", "_outbox", "_writer",
+    )
+
+    def __init__(self, websocket, client_id, now: float = 0.0):
+        self.websocket = websocket
+        self.client_id = client_id
+        # Время последнего фрейма от клиента (часы цикла событий)
+        self.last_seen = now
+        self.publisher = None
+        self.aggregator = None
+        self.upload = None
+        self.resume_state = None
+        # Логические потоки /ws/mux: stream_id -> агрегатор и публикатор
+        self.streams = None
+        self.publishers = None
+        # Получено транскриптов на сообщения, опубликованные этим соединением
+        self.completed = 0
+        # stream_id потоков, у которых фраза начата, а итог не получен
+        # (TRANSCRIPT_STREAMING); создается при первой такой фразе
+        self.open_utterances = None
+        self._delivery = None
+        self._outbox = None
+        self._writer = None
+
+    @property
+    def delivery(self) -> TranscriptDelivery:
+        """Фильтр повторов и порядка транскриптов (создается по требованию).
+
+        Создается после публикатора сессии: транскрипты возобновленной
+        сессии упорядочиваются с его start_seq, а не с нуля.
+        """
+        if self._delivery is None:
+            self._delivery = create_delivery(
+                0 if self.publisher is None else self.publisher.start_seq)
+        return self._delivery
+
+    def _all_publishers(self):
+        if self.publishers is not None:
+            return self.publishers.values()
+        return () if self.publisher is None else (self.publisher,)
+
+    @property
+    def inflight(self) -> int:
+        """Число опубликованных сообщений, чьи транскрипты еще не получены."""
+        published = sum(
+            publisher.next_seq - publisher.start_seq
+            for publisher in self._all_publishers()
+        )
+        return published - self.completed
+
+    @property
+    def has_pending_audio(self) -> bool:
+        """Есть ли в агрегаторах данные, еще не отправленные воркерам."""
+        if self.streams is not None:
+            aggregators = self.streams.values()
+        else:
+            aggregators = (self.aggregator,)
+        return any(
+            aggregator is not None and aggregator.pending
+            for aggregator in aggregators
+        )
+
+    def publisher_of(self, stream_id):
+        """Публикатор потока stream_id (None — обычное соединение) или None."""
+        if self.publishers is not None:
+            return self.publishers.get(stream_id)
+        return self.publisher if stream_id is None else None
+
+    def track_utterance(self, response: dict):
+        """Отмечает фразы, начатые промежуточным транскриптом и не завершенные."""
+        stream_id = response.get("stream_id")
+        if response["status"] == "partial" and response["text"]:
+            if self.open_utterances is None:
+                self.open_utterances = set()
+            self.open_utterances.add(stream_id)
+        elif response["status"] == "final" and self.open_utterances:
+            self.open_utterances.discard(stream_id)
+
+    def track_transcript(self, response: dict):
+        """Учитывает транскрипт сообщения, опубликованного этим соединением.
+
+        Возвращает публикатор сообщения или None, если оно не из этого
+        соединения.
+        """
+        seq = response.get("seq")
+        if seq is None:
+            return None
+        publisher = self.publisher_of(response.get("stream_id"))
+        if publisher is None:
+            return None
+        if publisher.start_seq <= seq < publisher.next_seq:
+            self.completed += 1
+            return publisher
+        return None
+
+    def send(self, responses: list[dict]):
+        """Ставит сообщения в очередь отправки клиенту, не блокируя вызов."""
+        if not responses:
+            return
+        if self._outbox is None:
+            self._outbox = deque()
+        self._outbox.extend(responses)
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        """Отправляет очередь сообщений и завершается, опустошив ее."""
+        try:
+            while self._outbox:
+                response = self._outbox.popleft()
+                await self.websocket.send_json(response)
+                if response.get("status") in TRANSCRIPT_STATUSES:
+                    logger.info(f"Sent transcript to client {self.client_id}")
+        except Exception as e:
+            logger.error(
+                f"Failed to send transcript to client {self.client_id}: {e}")
+        finally:
+            self._outbox = None
+            self._writer = None
+
+    async def close(self):
+        """Останавливает отправку неотправленных транскриптов."""
+        writer = self._writer
+        if writer is not None:
+            writer.cancel()
+            try:
+                await writer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def abort(self, code: int, flush: bool = False):
+        """Закрывает соединение по инициативе шлюза.
+
+        При flush=True сначала отправляются сообщения из очереди.
+        """
+        writer = self._writer
+        if flush and writer is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(writer), CLOSE_TIMEOUT_S)
+            except (asyncio.TimeoutError, Exception):
+                pass
+        await self.close()
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=code), CLOSE_TIMEOUT_S)
+        except (asyncio.TimeoutError, Exception) as e:
+            logger.error(f"Failed to close client {self.client_id}: {e}")
+
+
+class SessionHub:
+    """Общие ресурсы шлюза для всех соединений процесса.
+
+    Один клиент Redis (с пулом соединений) для публикации аудио, общие
+    конвейеры публикации (PUBLISH_BATCHING) и одна подписка на канал
+    транскриптов, которая раздает сообщения сессиям по client_id. Одна
+    задача-жнец на колесе таймеров шлет heartbeat молчащим клиентам
+    и закрывает соединения, молчащие дольше idle_timeout.
+    С CHUNK_HINTS хаб замеряет задержку воркеров по транскриптам и рассылает
+    клиентам рекомендованную длительность чанка.
+    """
+
+    def __init__(self, redis, heartbeat_interval: float = 0.0,
+                 idle_timeout: float = 0.0):
+        self.redis = redis
+        self.batcher = create_publish_batcher(redis)
+        self.chunk_advisor = create_chunk_advisor()
+        self._advisor: Optional[asyncio.Task] = None
+        self._sessions: dict = {}
+        # Сессии, чьи транскрипты ждут пропущенных seq в буфере порядка
+        self._waiting: set = set()
+        self._subscribed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat_interval = heartbeat_interval
+        self._idle_timeout = idle_timeout
+        self._wheel: Optional[TimerWheel] = None
+        if heartbeat_interval > 0 or idle_timeout > 0:
+            self._wheel = TimerWheel(REAPER_TICK_S, REAPER_WHEEL_SIZE, now=0.0)
+        self._reaper: Optional[asyncio.Task] = None
+        # Задачи закрытия соединений, начатые шлюзом
+        self._closing: set = set()
+        # Режим вывода из работы: новые соединения и аудио не принимаются
+        self.draining = False
+        self._drained = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def start(self):
+        """Запускает раздачу транскриптов и дожидается подписки на канал."""
+        self._task = asyncio.create_task(self._dispatch_forever())
+        if self._wheel is not None:
+            self._reaper = asyncio.create_task(self._reap_forever())
+        if self.chunk_advisor is not None:
+            self._advisor = asyncio.create_task(
+                self._advise_forever(get_chunk_hint_interval()))
+        await self._subscribed.wait()
+
+    async def close(self):
+        """Останавливает раздачу транскриптов и закрывает клиент Redis."""
+        for task in (self._task, self._reaper, self._advisor):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.redis.close()
+
+    def register(self, session: Session):
+        """Подключает сессию к раздаче транскриптов и контролю простоя."""
+        self._sessions[session.client_id] = session
+        metrics.set_gauge("ws_connections_active", len(self._sessions))
+        if self._wheel is not None:
+            self._schedule_check(session, session.last_seen)
+
+    def unregister(self, session: Session):
+        """Отключает сессию от раздачи транскриптов."""
+        if self._sessions.get(session.client_id) is session:
+            del self._sessions[session.client_id]
+        self._waiting.discard(session)
+        metrics.set_gauge("ws_connections_active", len(self._sessions))
+        if self.draining and not self._sessions:
+            self._drained.set()
+
+    def route(self, data: bytes, now: float):
+        """Передает транскрипт из Redis сессии-получателю."""
+        is_valid, error_msg = validate_transcript_data(data)
+        if not is_valid:
+            logger.error(f"Invalid transcript data: {error_msg}")
+            return
+        try:
+            transcript_data = json.loads(data.decode("utf-8"))
+            session = self._sessions.get(transcript_data.get("client_id"))
+            if session is None:
+                return
+            logger.info(
+                f"Received transcript for client {session.client_id}: "
+                f"{transcript_data['text']}")
+            delivery = session.delivery
+            response = build_transcript_response(
+                transcript_data, session.client_id)
+            if not delivery.is_delivered(response):
+                session.track_utterance(response)
+                publisher = session.track_transcript(response)
+                if (self.chunk_advisor is not None and publisher is not None
+                        and "upload_id" not in response):
+                    sent_at = publisher.sent_at(response["seq"])
+                    if sent_at is not None:
+                        self.chunk_advisor.observe(now - sent_at)
+            session.send(delivery.accept(response, now))
+        except Exception as e:
+            logger.error(f"Error routing transcript: {e}")
+            return
+        if delivery.next_wait(now) is not None:
+            self._waiting.add(session)
+        elif self.draining:
+            self._release_drained(session)
+
+    def expire(self, now: float):
+        """Выдает транскрипты, чьи пропуски ждут дольше таймаута."""
+        for session in list(self._waiting):
+            delivery = session.delivery
+            session.send(delivery.expire(now))
+            if delivery.next_wait(now) is None:
+                self._waiting.discard(session)
+                if self.draining:
+                    self._release_drained(session)
+
+    def send_chunk_hint(self, session: Session):
+        """Ставит в очередь сессии текущую рекомендацию длительности чанка."""
+        if self.chunk_advisor is None:
+            return
+        if session.publishers is not None:
+            # У потоков /ws/mux свои форматы: размер по длительности
+            # считает клиент
+            hint = self.chunk_advisor.hint(with_size=False)
+        else:
+            publisher = session.publisher
+            normalizer = None if publisher is None else publisher.normalizer
+            hint = self.chunk_advisor.hint(
+                None if normalizer is None else normalizer.source)
+        session.send([hint])
+        metrics.inc("chunk_hints_sent")
+
+    async def _advise_forever(self, interval: float):
+        """Раз в interval пересчитывает рекомендацию и рассылает изменения."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                status = await load_published_status(self.redis)
+            except Exception as e:
+                logger.error(f"Failed to load worker status: {e}")
+                status = None
+            if self.chunk_advisor.update(status):
+                logger.info(
+                    f"Recommended chunk duration: "
+                    f"{self.chunk_advisor.chunk_ms} ms")
+                for session in list(self._sessions.values()):
+                    self.send_chunk_hint(session)
+
+    def next_wait(self, now: float) -> Optional[float]:
+        """Время до ближайшего таймаута буферов порядка (None — без него)."""
+        waits = [
+            wait for wait in (
+                session.delivery.next_wait(now) for session in self._waiting
+            ) if wait is not None
+        ]
+        return min(waits) if waits else None
+
+    def _schedule_check(self, session: Session, now: float):
+        """Планирует следующую проверку простоя сессии."""
+        deadline = None
+        if self._idle_timeout > 0:
+            deadline = session.last_seen + self._idle_timeout
+        if self._heartbeat_interval > 0:
+            heartbeat = session.last_seen + self._heartbeat_interval
+            if heartbeat <= now:
+                # Heartbeat уже отправлен: следующий через интервал
+                heartbeat = now + self._heartbeat_interval
+            if deadline is None or heartbeat < deadline:
+                deadline = heartbeat
+        self._wheel.schedule(session, deadline)
+
+    def check_idle(self, now: float):
+        """Шлет heartbeat и закрывает соединения, чьи сроки истекли к now.
+
+        Активность клиента лишь обновляет last_seen; колесо хранит одну
+        запись на сессию, а при срабатывании срок пересчитывается.
+        """
+        for session in self._wheel.advance(now):
+            if self._sessions.get(session.client_id) is not session:
+                # Сессия уже отключена
+                continue
+            idle = now - session.last_seen
+            if self._idle_timeout > 0 and idle >= self._idle_timeout:
+                self.reap(session)
+                continue
+            if self._heartbeat_interval > 0 and idle >= self._heartbeat_interval:
+                session.send([{"status": "ping"}])
+                metrics.inc("ws_heartbeats_sent")
+            self._schedule_check(session, now)
+
+    def reap(self, session: Session):
+        """Отключает сессию от раздачи и закрывает ее соединение."""
+        metrics.inc("ws_connections_reaped")
+        logger.info(
+            f"Closing client {session.client_id}: no frames for "
+            f"{self._idle_timeout:g}s")
+        self._close_session(session, IDLE_CLOSE_CODE)
+
+    def _close_session(self, session: Session, code: int, flush: bool = False):
+        """Отключает сессию от раздачи и закрывает соединение в фоне."""
+        self.unregister(session)
+        task = asyncio.create_task(session.abort(code, flush=flush))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _release_drained(self, session: Session):
+        """Закрывает сессию, получившую все транскрипты, в режиме вывода."""
+        if (session.inflight > 0 or session.has_pending_audio
+                or session in self._waiting
+                or self._sessions.get(session.client_id) is not session):
+            return
+        if session.open_utterances and session.resume_state is None:
+            # Итог начатой фразы воркеры выдают по концу сессии; его
+            # ждем до закрытия (не дольше таймаута вывода). Возобновляемая
+            # сессия продолжит фразу после переподключения.
+            self._end_utterances(session)
+            return
+        metrics.inc("drain_sessions_completed")
+        logger.info(f"Client {session.client_id} drained")
+        self._close_session(session, DRAIN_CLOSE_CODE, flush=True)
+
+    def _end_utterances(self, session: Session):
+        """Отправляет конец сессии потокам с незавершенными фразами."""
+        for stream_id in session.open_utterances:
+            publisher = session.publisher_of(stream_id)
+            if publisher is None or publisher.ended:
+                continue
+            task = asyncio.create_task(publisher.end())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def release_if_drained(self, session: Session):
+        """Проверяет сессию после публикации остатка аудио в режиме вывода."""
+        if self.draining:
+            self._release_drained(session)
+
+    async def drain(self, timeout: float):
+        """Выводит шлюз из работы, не теряя транскриптов.
+
+        Клиенты получают {"status": "draining"}; каждая сессия закрывается
+        с кодом 1012, как только получит транскрипты всего опубликованного
+        аудио и итоги начатых фраз (TRANSCRIPT_STREAMING), оставшиеся —
+        по истечении timeout.
+        """
+        if not self.draining:
+            self.draining = True
+            metrics.set_gauge("gateway_draining", 1)
+            logger.info(
+                f"Draining gateway: {len(self._sessions)} sessions, "
+                f"timeout {timeout:g}s")
+            notice = {"status": "draining", "timeout": timeout}
+            for session in list(self._sessions.values()):
+                session.send([notice])
+                self._release_drained(session)
+            if not self._sessions:
+                self._drained.set()
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout)
+        except asyncio.TimeoutError:
+            for session in list(self._sessions.values()):
+                metrics.inc("drain_sessions_forced")
+                logger.info(
+                    f"Client {session.client_id} closed with "
+                    f"{session.inflight} transcripts in flight")
+                self._close_session(session, DRAIN_CLOSE_CODE, flush=True)
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        logger.info("Gateway drained")
+
+    async def _reap_forever(self):
+        """Раз в тик колеса проверяет сроки простоя соединений."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(REAPER_TICK_S)
+            try:
+                self.check_idle(loop.time())
+            except Exception as e:
+                logger.error(f"Idle connection reaper error: {e}")
+
+    async def _dispatch(self):
+        """Слушает канал транскриптов и раздает сообщения сессиям."""
+        pubsub = create_pubsub(self.redis)
+        try:
+            await pubsub.subscribe(*transcript_channels())
+            logger.info("Gateway subscribed to transcripts channel")
+            self._subscribed.set()
+            loop = asyncio.get_running_loop()
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.next_wait(loop.time())
+                )
+                if message is not None and message["type"] == "message":
+                    self.route(message["data"], loop.time())
+                self.expire(loop.time())
+        finally:
+            await pubsub.close()
+
+    async def _dispatch_forever(self):
+        """Держит подписку на транскрипты, переподписываясь после ошибок."""
+        while True:
+            try:
+                await self._dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Transcript dispatcher error: {e}")
+                await asyncio.sleep(RESUBSCRIBE_DELAY_S)
+
+
+_hub: Optional[SessionHub] = None
+_hub_lock: Optional[asyncio.Lock] = None
+
+
+async def get_session_hub() -> SessionHub:
+    """Возвращает общий SessionHub процесса, запуская его при первом вызове."""
+    global _hub, _hub_lock
+    if _hub is not None:
+        return _hub
+    if _hub_lock is None:
+        _hub_lock = asyncio.Lock()
+    async with _hub_lock:
+        if _hub is None:
+            hub = SessionHub(
+                await get_redis_client(),
+                heartbeat_interval=get_ws_heartbeat_interval(),
+                idle_timeout=get_ws_idle_timeout()
+            )
+            await hub.start()
+            _hub = hub
+    return _hub
+
+
+def current_session_hub() -> Optional[SessionHub]:
+    """Возвращает общий SessionHub процесса, если он уже запущен."""
+    return _hub
+
+
+async def close_session_hub():
+    """Останавливает общий SessionHub процесса, если он был запущен."""
+    global _hub
+    if _hub is not None:
+        hub, _hub = _hub, None
+        await hub.close()
@@ -0,0 +1,142 @@
+import bisect
+import hashlib
+import logging
+import time
+from typing import Iterable, Optional
+
+from metrics import metrics
+from config import get_shard_refresh_ms, get_shard_ttl_ms, get_shard_vnodes
+from constants import (
+    AUDIO_CHANNEL,
+    AUDIO_SHARDS_KEY,
+    AUDIO_STREAM,
+    DEFAULT_SHARD_VNODES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def ring_hash(key: str) -> int:
+    """64-битный хеш ключа, одинаковый во всех процессах (в отличие от hash)."""
+    return int.from_bytes(
+        hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Кольцо консистентного хеширования шардов.
+
+    Каждый шард занимает vnodes точек кольца; ключ принадлежит шарду
+    ближайшей точки по часовой стрелке от хеша ключа. При появлении или
+    уходе шарда владельца меняют только ключи дуг, примыкающих к его
+    точкам, — в среднем 1/N всех ключей, остальные сессии остаются
+    на своих воркерах.
+    """
+
+    __slots__ = ("shards", "_points", "_owners")
+
+    def __init__(self, shards: Iterable[str] = (),
+                 vnodes: int = DEFAULT_SHARD_VNODES):
+        self.shards = frozenset(shards)
+        points = sorted((ring_hash(f"{shard}#{index}"), shard)
+                        for shard in self.shards for index in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def get(self, key: str) -> Optional[str]:
+        """Шард-владелец ключа (None — кольцо пусто)."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, ring_hash(key))
+        return self._owners[index % len(self._owners)]
+
+
+def shard_stream(shard: str) -> str:
+    """Поток Redis с аудио сессий шарда."""
+    return f"{AUDIO_STREAM}:{shard}"
+
+
+def shard_channel(shard: str) -> str:
+    """Канал pub/sub с аудио сессий шарда."""
+    return f"{AUDIO_CHANNEL}:{shard}"
+
+
+async def register_shard(redis, shard: str):
+    """Продлевает членство шарда в кольце на SHARD_TTL_MS."""
+    await redis.zadd(
+        AUDIO_SHARDS_KEY, {shard: time.time() * 1000 + get_shard_ttl_ms()})
+
+
+async def retire_shard(redis, shard: str):
+    """Выводит шард из кольца сразу: его поток дорабатывает сосед."""
+    await redis.zadd(AUDIO_SHARDS_KEY, {shard: time.time() * 1000})
+
+
+async def forget_shard(redis, shard: str):
+    """Удаляет выведенный шард, чей поток разобран."""
+    await redis.zrem(AUDIO_SHARDS_KEY, shard)
+
+
+async def load_shards(redis) -> tuple[list[str], dict[str, float]]:
+    """Возвращает живые шарды и выведенные шарды со временем вывода, мс."""
+    now = time.time() * 1000
+    live, retired = [], {}
+    for member, expires_at in await redis.zrange(
+            AUDIO_SHARDS_KEY, 0, -1, withscores=True):
+        shard = member.decode("utf-8") if isinstance(member, bytes) else member
+        if expires_at > now:
+            live.append(shard)
+        else:
+            retired[shard] = expires_at
+    return live, retired
+
+
+class ShardRouter:
+    """Кольцо живых шардов на шлюзе, обновляемое раз в SHARD_REFRESH_MS.
+
+    Состав читается из Redis при маршрутизации, если с прошлого чтения
+    прошел период обновления; остальные вызовы обходятся без запросов.
+    """
+
+    __slots__ = ("ring", "vnodes", "refresh_interval", "_next_refresh")
+
+    def __init__(self, vnodes: int, refresh_ms: int):
+        self.ring = HashRing((), vnodes)
+        self.vnodes = vnodes
+        self.refresh_interval = refresh_ms / 1000
+        self._next_refresh = 0.0
+
+    def update(self, shards: list[str]):
+        """Перестраивает кольцо, если состав шардов изменился."""
+        if self.ring.shards == frozenset(shards):
+            return
+        logger.info(f"Shard ring changed: {sorted(shards)}")
+        self.ring = HashRing(shards, self.vnodes)
+        metrics.inc("shard_ring_changes")
+        metrics.set_gauge("shard_ring_size", len(self.ring))
+
+    async def route(self, redis, key: str) -> Optional[str]:
+        """Шард сессии с ключом key (None — живых шардов нет)."""
+        now = time.monotonic()
+        if now >= self._next_refresh:
+            # Остальные вызовы до конца обновления используют прежнее кольцо
+            self._next_refresh = now + self.refresh_interval
+            try:
+                live, _ = await load_shards(redis)
+                self.update(live)
+            except Exception as e:
+                logger.error(f"Failed to refresh shard ring: {e}")
+        return self.ring.get(key)
+
+
+_router: Optional[ShardRouter] = None
+
+
+def get_shard_router() -> ShardRouter:
+    """Кольцо шардов процесса шлюза."""
+    global _router
+    if _router is None:
+        _router = ShardRouter(get_shard_vnodes(), get_shard_refresh_ms())
+    return _router
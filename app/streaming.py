@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from config import (
+    get_audio_bytes_per_second,
+    get_audio_sample_width,
+    get_streaming_idle_timeout,
+    get_streaming_max_sessions,
+    get_streaming_max_utterance_ms,
+    get_streaming_silence_level,
+    is_transcript_streaming_enabled,
+)
+from dedup import session_key
+from metrics import metrics
+
+
+def is_silence(audio: bytes, sample_width: int, level: int) -> bool:
+    """Тишина ли чанк: пиковая амплитуда 16-битного PCM ниже level.
+
+    Для других форматов тишина не определяется, и фразу завершают
+    только длительность, простой или конец сессии.
+    """
+    if sample_width != 2:
+        return not audio
+    samples = memoryview(audio)[:len(audio) - len(audio) % 2].cast("h")
+    if not samples:
+        return True
+    return max(max(samples), -min(samples)) < level
+
+
+class StreamingTranscript:
+    """Промежуточный (partial) или итоговый (final) транскрипт фразы."""
+
+    __slots__ = ("client_id", "stream_id", "resumable", "status", "text",
+                 "utterance")
+
+    def __init__(self, state: "SessionState", status: str, text: str):
+        self.client_id = state.client_id
+        self.stream_id = state.stream_id
+        self.resumable = state.resumable
+        self.status = status
+        self.text = text
+        self.utterance = state.utterance
+
+    def source(self) -> dict:
+        """Поля сессии для сообщения транскрипта, не привязанного к чанку."""
+        source = {"client_id": self.client_id}
+        if self.stream_id is not None:
+            source["stream_id"] = self.stream_id
+        return source
+
+
+class SessionState:
+    """Состояние распознавания сессии: номер и объем текущей фразы."""
+
+    __slots__ = ("client_id", "stream_id", "resumable", "utterance",
+                 "started_at", "chunks", "duration_ms", "last_seen")
+
+    def __init__(self, payload: dict, now: float):
+        self.client_id = payload["client_id"]
+        self.stream_id = payload.get("stream_id")
+        self.resumable = bool(payload.get("resumable"))
+        self.utterance = 0
+        self.started_at = 0.0
+        self.chunks = 0
+        self.duration_ms = 0.0
+        self.last_seen = now
+
+    def hypothesis(self) -> str:
+        """Mock-гипотеза текущей фразы; строится за O(1) на каждый чанк."""
+        if not self.chunks:
+            return ""
+        started = datetime.fromtimestamp(self.started_at).strftime("%H:%M:%S")
+        return (f"Transcribed: {started} (utterance {self.utterance}: "
+                f"{self.chunks} chunks, {self.duration_ms:.0f} ms)")
+
+    def add(self, duration_ms: float):
+        if not self.chunks:
+            self.started_at = datetime.now().timestamp()
+        self.chunks += 1
+        self.duration_ms += duration_ms
+
+    def finish(self) -> StreamingTranscript:
+        """Завершает фразу и возвращает ее итоговый транскрипт."""
+        transcript = StreamingTranscript(self, "final", self.hypothesis())
+        self.utterance += 1
+        self.chunks = 0
+        self.duration_ms = 0.0
+        return transcript
+
+
+class StreamingDecoder:
+    """Состояния распознавания сессий воркера.
+
+    На каждый чанк выдается промежуточный транскрипт текущей фразы.
+    Фраза завершается итоговым транскриптом на тишине, по достижении
+    max_utterance_ms, в конце сессии или после idle_timeout без чанков.
+    Сессии хранятся в порядке последней активности: самые давние
+    вытесняются сверх max_sessions, а простаивающие снимаются с начала
+    списка за время, пропорциональное их числу.
+    """
+
+    __slots__ = ("_sessions", "max_sessions", "idle_timeout",
+                 "max_utterance_ms", "silence_level", "sample_width",
+                 "bytes_per_ms")
+
+    def __init__(self, max_sessions: int, idle_timeout: float,
+                 max_utterance_ms: int, silence_level: int):
+        self._sessions: OrderedDict = OrderedDict()
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_utterance_ms = max_utterance_ms
+        self.silence_level = silence_level
+        self.sample_width = get_audio_sample_width()
+        self.bytes_per_ms = get_audio_bytes_per_second() / 1000
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _close(self, state: SessionState) -> list[StreamingTranscript]:
+        """Итог незавершенной фразы закрываемой сессии."""
+        if not state.chunks:
+            return []
+        metrics.inc("transcripts_final")
+        return [state.finish()]
+
+    def feed(self, payload: dict, audio: bytes, now: float
+             ) -> tuple[StreamingTranscript, list[StreamingTranscript]]:
+        """Учитывает чанк сессии.
+
+        Возвращает транскрипт чанка и итоги сессий, вытесненных сверх
+        max_sessions.
+        """
+        key = session_key(payload)
+        state = self._sessions.get(key)
+        evicted = []
+        if state is None:
+            state = self._sessions[key] = SessionState(payload, now)
+            while len(self._sessions) > self.max_sessions:
+                _, oldest = self._sessions.popitem(last=False)
+                metrics.inc("streaming_sessions_evicted")
+                evicted.extend(self._close(oldest))
+            metrics.set_gauge("streaming_sessions", len(self._sessions))
+        else:
+            self._sessions.move_to_end(key)
+        state.last_seen = now
+
+        if is_silence(audio, self.sample_width, self.silence_level):
+            if state.chunks:
+                metrics.inc("transcripts_final")
+                return state.finish(), evicted
+            # Тишина вне фразы: пустая гипотеза
+            metrics.inc("transcripts_partial")
+            return StreamingTranscript(state, "partial", ""), evicted
+
+        state.add(len(audio) / self.bytes_per_ms)
+        if state.duration_ms >= self.max_utterance_ms:
+            metrics.inc("transcripts_final")
+            return state.finish(), evicted
+        metrics.inc("transcripts_partial")
+        return StreamingTranscript(state, "partial", state.hypothesis()), evicted
+
+    def end(self, payload: dict) -> list[StreamingTranscript]:
+        """Завершает сессию: итог незавершенной фразы и удаление состояния."""
+        state = self._sessions.pop(session_key(payload), None)
+        metrics.set_gauge("streaming_sessions", len(self._sessions))
+        return [] if state is None else self._close(state)
+
+    def expire(self, now: float) -> list[StreamingTranscript]:
+        """Удаляет сессии без чанков дольше idle_timeout, возвращает их итоги."""
+        finals = []
+        while self._sessions:
+            state = next(iter(self._sessions.values()))
+            if now - state.last_seen < self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+            metrics.inc("streaming_sessions_expired")
+            finals.extend(self._close(state))
+        metrics.set_gauge("streaming_sessions", len(self._sessions))
+        return finals
+
+
+def create_streaming_decoder() -> Optional[StreamingDecoder]:
+    """Создает состояния потокового распознавания, если оно включено."""
+    if not is_transcript_streaming_enabled():
+        return None
+    return StreamingDecoder(
+        get_streaming_max_sessions(),
+        get_streaming_idle_timeout(),
+        get_streaming_max_utterance_ms(),
+        get_streaming_silence_level(),
+    )
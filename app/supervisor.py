@@ -0,0 +1,212 @@
+import asyncio
+import functools
+import logging
+import math
+import os
+import signal
+import sys
+from typing import Optional
+
+from autoscale import Autoscaler
+from backoff import STABLE_RUN_S, Backoff
+from redis_client import get_redis_client
+from worker_status import (
+    RATE_WINDOW_S,
+    WorkerStatusMonitor,
+    publish_worker_status,
+)
+from config import (
+    get_worker_max_processes,
+    get_worker_min_processes,
+    get_worker_processes,
+    get_worker_restart_base_ms,
+    get_worker_restart_max_ms,
+    get_worker_scale_down_cooldown,
+    get_worker_status_interval,
+    get_worker_target_drain,
+    is_worker_autoscale_enabled,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Сколько ждать завершения воркеров после SIGTERM, прежде чем убить их
+STOP_TIMEOUT_S = 10.0
+
+
+class Supervisor:
+    """Держит processes процессов воркера и перезапускает упавшие.
+
+    Каждый процесс получает свой слот (WORKER_SLOT), от которого зависит
+    имя воркера в группе потребителей; перезапуск идет с экспоненциальной
+    задержкой со случайной составляющей, начиная с миллисекунд. Раз в
+    WORKER_STATUS_INTERVAL супервизор публикует статус очереди, а с
+    автомасштабированием меняет по нему число процессов.
+    """
+
+    def __init__(self, processes: int, autoscaler: Optional[Autoscaler] = None):
+        self.processes = processes
+        self.autoscaler = autoscaler
+        self.stopping = False
+        self._children: dict[int, asyncio.subprocess.Process] = {}
+        self._slots: dict[int, asyncio.Task] = {}
+        # Задачи слотов, выведенных при уменьшении, до выхода их процессов
+        self._retiring: dict[int, asyncio.Task] = {}
+        self._stopped = asyncio.Event()
+
+    async def _spawn(self, slot: int) -> asyncio.subprocess.Process:
+        """Запускает процесс воркера в слоте."""
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(APP_DIR, "workers.py"),
+            cwd=APP_DIR,
+            env={**os.environ, "WORKER_SLOT": str(slot)},
+        )
+        logger.info(f"Started worker slot {slot} (pid {process.pid})")
+        return process
+
+    def _is_active(self, slot: int) -> bool:
+        """Работает ли текущая задача слота (не выведена и не остановлена)."""
+        return (not self.stopping
+                and self._slots.get(slot) is asyncio.current_task())
+
+    async def _run_slot(self, slot: int, previous: Optional[asyncio.Task]):
+        """Перезапускает воркер слота, пока слот не выведен или не остановлен."""
+        if previous is not None:
+            # Слот вернули до выхода прежнего процесса: имя воркера
+            # в группе не должно принадлежать двум процессам сразу
+            await previous
+        loop = asyncio.get_running_loop()
+        backoff = Backoff(get_worker_restart_base_ms() / 1000,
+                          get_worker_restart_max_ms() / 1000)
+        while self._is_active(slot):
+            started = loop.time()
+            process = await self._spawn(slot)
+            self._children[slot] = process
+            if not self._is_active(slot):
+                # Слот выведен или супервизор остановлен во время запуска
+                process.terminate()
+            code = await process.wait()
+            del self._children[slot]
+            if not self._is_active(slot):
+                break
+            if loop.time() - started >= STABLE_RUN_S:
+                backoff.reset()
+            delay = backoff.next_delay()
+            logger.error(
+                f"Worker slot {slot} exited with code {code}, "
+                f"restarting in {delay * 1000:.0f} ms")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def scale_to(self, processes: int):
+        """Запускает недостающие слоты и завершает лишние (с конца)."""
+        if processes != self.processes:
+            logger.info(
+                f"Scaling workers from {self.processes} to {processes}")
+        self.processes = processes
+        for slot in range(processes):
+            if slot not in self._slots:
+                previous = self._retiring.pop(slot, None)
+                self._slots[slot] = asyncio.create_task(
+                    self._run_slot(slot, previous))
+        for slot in [slot for slot in self._slots if slot >= processes]:
+            task = self._retiring[slot] = self._slots.pop(slot)
+            task.add_done_callback(functools.partial(self._forget_retired, slot))
+            # Воркер удаляет heartbeat при выходе, и соседи сразу
+            # забирают его неподтвержденные чанки
+            process = self._children.get(slot)
+            if process is not None:
+                process.terminate()
+
+    def _forget_retired(self, slot: int, task: asyncio.Task):
+        if self._retiring.get(slot) is task:
+            del self._retiring[slot]
+
+    async def _watch_status(self):
+        """Публикует статус очереди и применяет решение автомасштабирования."""
+        loop = asyncio.get_running_loop()
+        interval = get_worker_status_interval()
+        monitor = WorkerStatusMonitor()
+        redis = await get_redis_client()
+        try:
+            while True:
+                try:
+                    status = await monitor.sample(redis, loop.time())
+                    status["supervisor_processes"] = self.processes
+                    await publish_worker_status(
+                        redis, status, ttl=max(1, math.ceil(interval * 3)))
+                    if self.autoscaler is not None:
+                        self.scale_to(self.autoscaler.decide(
+                            status, self.processes, loop.time()))
+                except Exception as e:
+                    logger.error(f"Failed to update worker status: {e}")
+                await asyncio.sleep(interval)
+        finally:
+            await redis.close()
+
+    def stop(self):
+        """Останавливает перезапуски и передает SIGTERM воркерам."""
+        if self.stopping:
+            return
+        logger.info("Stopping worker processes...")
+        self.stopping = True
+        self._stopped.set()
+        for process in self._children.values():
+            process.terminate()
+
+    def forward_signal(self, signum: int):
+        """Передает сигнал всем процессам воркера (SIGUSR1 — профилирование)."""
+        for process in self._children.values():
+            process.send_signal(signum)
+
+    async def _kill_after_timeout(self):
+        """Убивает воркеры, не завершившиеся за STOP_TIMEOUT_S."""
+        await self._stopped.wait()
+        await asyncio.sleep(STOP_TIMEOUT_S)
+        for slot, process in self._children.items():
+            logger.warning(f"Killing worker slot {slot} (pid {process.pid})")
+            process.kill()
+
+    async def run(self):
+        """Запускает слоты и ждет их остановки."""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self.stop)
+        loop.add_signal_handler(
+            signal.SIGUSR1, self.forward_signal, signal.SIGUSR1)
+        killer = asyncio.create_task(self._kill_after_timeout())
+        watcher = asyncio.create_task(self._watch_status())
+        self.scale_to(self.processes)
+        try:
+            await self._stopped.wait()
+            await asyncio.gather(
+                *self._slots.values(), *self._retiring.values())
+        finally:
+            watcher.cancel()
+            killer.cancel()
+        logger.info("All worker processes stopped")
+
+
+def create_supervisor() -> Supervisor:
+    """Создает супервизор с постоянным числом процессов или автомасштабированием."""
+    if not is_worker_autoscale_enabled():
+        return Supervisor(get_worker_processes())
+    autoscaler = Autoscaler(
+        get_worker_min_processes(),
+        get_worker_max_processes(),
+        get_worker_target_drain(),
+        get_worker_scale_down_cooldown(),
+        settle=RATE_WINDOW_S,
+    )
+    return Supervisor(autoscaler.clamp(get_worker_processes()), autoscaler)
+
+
+if __name__ == "__main__":
+    asyncio.run(create_supervisor().run())
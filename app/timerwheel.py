@@ -0,0 +1,51 @@
+import math
+from typing import Any
+
+
+class TimerWheel:
+    """Хешированное колесо таймеров.
+
+    Срок округляется вверх до тика и попадает в слот (тик mod size);
+    сроки дальше одного оборота ждут в том же слоте нужного оборота.
+    Добавление — O(1), продвижение — O(число истекших и обойденных записей).
+    Отмены нет: владелец таймера сам проверяет актуальность при срабатывании.
+    """
+
+    __slots__ = ("_tick", "_slots", "_current", "_count")
+
+    def __init__(self, tick: float, size: int, now: float):
+        self._tick = tick
+        self._slots: list[list] = [[] for _ in range(size)]
+        # Номер последнего обработанного тика
+        self._current = math.floor(now / tick)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, item: Any, deadline: float):
+        """Планирует выдачу item не раньше deadline."""
+        tick = max(math.ceil(deadline / self._tick), self._current + 1)
+        self._slots[tick % len(self._slots)].append((tick, item))
+        self._count += 1
+
+    def advance(self, now: float) -> list[Any]:
+        """Продвигает колесо до now и возвращает истекшие элементы."""
+        target = math.floor(now / self._tick)
+        expired = []
+        # За один вызов достаточно обойти каждый слот не больше раза
+        first = max(self._current + 1, target - len(self._slots) + 1)
+        for tick in range(first, target + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            pending = []
+            for entry in slot:
+                if entry[0] <= target:
+                    expired.append(entry[1])
+                else:
+                    pending.append(entry)
+            slot[:] = pending
+        self._current = max(self._current, target)
+        self._count -= len(expired)
+        return expired
@@ -0,0 +1,112 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from config import (
+    get_transcript_cache_max_bytes,
+    get_transcript_cache_ttl,
+    is_transcript_cache_redis_enabled,
+)
+from constants import TRANSCRIPT_CACHE_KEY_PREFIX
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def audio_key(audio_data: bytes) -> str:
+    """Быстрый хеш аудио-данных, используемый как ключ кэша."""
+    return hashlib.blake2b(audio_data, digest_size=16).hexdigest()
+
+
+class TranscriptCache:
+    """Кэш транскриптов по хешу аудио.
+
+    Локальный уровень — LRU в памяти процесса с лимитом в байтах;
+    необязательный общий уровень — Redis с TTL, доступный всем воркерам.
+    """
+
+    def __init__(self, max_bytes: int, redis=None, ttl: int = 0):
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._redis = redis
+        self._ttl = ttl
+
+    @staticmethod
+    def _entry_size(key: str, text: str) -> int:
+        return len(key) + len(text.encode("utf-8"))
+
+    @property
+    def size(self) -> int:
+        """Объем локального уровня в байтах."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Возвращает транскрипт из кэша или None."""
+        text = self._entries.get(key)
+        if text is not None:
+            self._entries.move_to_end(key)
+            metrics.inc("transcript_cache_hits_local")
+            return text
+
+        if self._redis is not None:
+            try:
+                value = await self._redis.get(
+                    f"{TRANSCRIPT_CACHE_KEY_PREFIX}{key}")
+            except Exception as e:
+                logger.error(f"Transcript cache lookup failed: {e}")
+                value = None
+            if value is not None:
+                text = value.decode("utf-8")
+                self._put_local(key, text)
+                metrics.inc("transcript_cache_hits_redis")
+                return text
+
+        metrics.inc("transcript_cache_misses")
+        return None
+
+    async def set(self, key: str, text: str):
+        """Сохраняет транскрипт в кэш."""
+        self._put_local(key, text)
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    f"{TRANSCRIPT_CACHE_KEY_PREFIX}{key}", text,
+                    ex=self._ttl or None)
+            except Exception as e:
+                logger.error(f"Transcript cache store failed: {e}")
+
+    def _put_local(self, key: str, text: str):
+        """Добавляет запись в LRU, вытесняя старые при превышении лимита."""
+        entry_size = self._entry_size(key, text)
+        if entry_size > self._max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= self._entry_size(key, previous)
+        self._entries[key] = text
+        self._size += entry_size
+
+        while self._size > self._max_bytes:
+            old_key, old_text = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_text)
+            metrics.inc("transcript_cache_evictions")
+
+        metrics.set_gauge("transcript_cache_bytes", self._size)
+        metrics.set_gauge("transcript_cache_entries", len(self._entries))
+
+
+def create_transcript_cache(redis) -> Optional[TranscriptCache]:
+    """Создает кэш по настройкам окружения или None, если он выключен."""
+    max_bytes = get_transcript_cache_max_bytes()
+    if max_bytes <= 0:
+        return None
+    return TranscriptCache(
+        max_bytes,
+        redis=redis if is_transcript_cache_redis_enabled() else None,
+        ttl=get_transcript_cache_ttl()
+    )
@@ -0,0 +1,151 @@
+import json
+import time
+from collections import deque
+from typing import Optional
+
+from redis.exceptions import ResponseError
+
+from audio_queue import AUDIO_STREAMS, list_audio_streams
+from constants import AUDIO_CONSUMER_GROUP, WORKER_STATUS_KEY
+
+# Окно, по которому считаются скорости поступления и обработки, секунды
+RATE_WINDOW_S = 5.0
+
+
+async def read_backlog(redis, streams=AUDIO_STREAMS) -> dict:
+    """Читает счетчики очередей аудио одним запросом к Redis.
+
+    Для каждого потока возвращает длину, число записей, еще не выданных
+    группе воркеров (lag), выданных, но не подтвержденных (pending),
+    а также монотонные счетчики добавленных и обработанных записей.
+    """
+    async with redis.pipeline(transaction=False) as pipe:
+        for stream in streams:
+            pipe.xinfo_stream(stream)
+            pipe.xinfo_groups(stream)
+        replies = await pipe.execute(raise_on_error=False)
+
+    backlog = {}
+    for index, stream in enumerate(streams):
+        info, groups = replies[2 * index], replies[2 * index + 1]
+        if isinstance(info, ResponseError) or isinstance(groups, ResponseError):
+            # Поток еще не создан: ни шлюз, ни воркеры им не пользовались
+            info, groups = {}, []
+        group = next((group for group in groups
+                      if group["name"] in (AUDIO_CONSUMER_GROUP,
+                                           AUDIO_CONSUMER_GROUP.encode())),
+                     {})
+        added = info.get("entries-added", 0)
+        read = group.get("entries-read") or 0
+        pending = group.get("pending", 0)
+        lag = group.get("lag")
+        if lag is None:
+            # Redis не считает lag после удаления записей из середины потока
+            lag = max(added - read, 0)
+        backlog[stream] = {
+            "length": info.get("length", 0),
+            "lag": lag,
+            "pending": pending,
+            "consumers": group.get("consumers", 0),
+            "added": added,
+            "completed": max(read - pending, 0),
+        }
+    return backlog
+
+
+class RateWindow:
+    """Скорость роста монотонного счетчика по окну последних замеров."""
+
+    __slots__ = ("window", "_samples")
+
+    def __init__(self, window: float = RATE_WINDOW_S):
+        self.window = window
+        self._samples: deque = deque()
+
+    def add(self, now: float, value: int) -> Optional[float]:
+        """Добавляет замер и возвращает скорость в единицах в секунду."""
+        if self._samples and value < self._samples[-1][1]:
+            # Счетчик сбросился (поток пересоздан): начинаем окно заново
+            self._samples.clear()
+        self._samples.append((now, value))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+        first_time, first_value = self._samples[0]
+        if now <= first_time:
+            return None
+        return (value - first_value) / (now - first_time)
+
+
+def drain_eta(backlog: int, arrival_rate: Optional[float],
+              processing_rate: Optional[float]) -> Optional[float]:
+    """Оценивает время разбора очереди в секундах (None — очередь не убывает)."""
+    if backlog == 0:
+        return 0.0
+    if processing_rate is None:
+        return None
+    net_rate = processing_rate - (arrival_rate or 0.0)
+    if net_rate <= 0:
+        return None
+    return backlog / net_rate
+
+
+def summarize_backlog(streams: dict, arrival_rate: Optional[float] = None,
+                      processing_rate: Optional[float] = None) -> dict:
+    """Собирает статус воркеров из счетчиков потоков и скоростей."""
+    lag = sum(stream["lag"] for stream in streams.values())
+    pending = sum(stream["pending"] for stream in streams.values())
+    return {
+        "queue_length": sum(stream["length"] for stream in streams.values()),
+        "lag": lag,
+        "pending": pending,
+        "backlog": lag + pending,
+        "consumers": max(
+            (stream["consumers"] for stream in streams.values()), default=0),
+        "arrival_rate": arrival_rate,
+        "processing_rate": processing_rate,
+        "drain_eta_s": drain_eta(lag + pending, arrival_rate, processing_rate),
+        "streams": {
+            name: {key: stream[key] for key in ("length", "lag", "pending")}
+            for name, stream in streams.items()
+        },
+        "updated_at": time.time(),
+    }
+
+
+class WorkerStatusMonitor:
+    """Периодически оценивает очередь аудио и скорость ее обработки."""
+
+    __slots__ = ("_arrivals", "_completions")
+
+    def __init__(self, window: float = RATE_WINDOW_S):
+        self._arrivals = RateWindow(window)
+        self._completions = RateWindow(window)
+
+    async def sample(self, redis, now: float) -> dict:
+        """Снимает счетчики очередей и возвращает статус воркеров."""
+        streams = await read_backlog(redis, await list_audio_streams(redis))
+        arrival_rate = self._arrivals.add(
+            now, sum(stream["added"] for stream in streams.values()))
+        processing_rate = self._completions.add(
+            now, sum(stream["completed"] for stream in streams.values()))
+        return summarize_backlog(streams, arrival_rate, processing_rate)
+
+
+async def publish_worker_status(redis, status: dict, ttl: int):
+    """Сохраняет статус воркеров в Redis с ограниченным сроком жизни."""
+    await redis.set(WORKER_STATUS_KEY, json.dumps(status), ex=ttl)
+
+
+async def load_published_status(redis) -> Optional[dict]:
+    """Возвращает статус, опубликованный супервизором, или None."""
+    value = await redis.get(WORKER_STATUS_KEY)
+    return None if value is None else json.loads(value)
+
+
+async def load_worker_status(redis) -> dict:
+    """Возвращает опубликованный статус воркеров или текущую очередь без скоростей."""
+    status = await load_published_status(redis)
+    if status is not None:
+        return status
+    return summarize_backlog(
+        await read_backlog(redis, await list_audio_streams(redis)))
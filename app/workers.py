@@ -2,10 +2,74 @@ import asyncio
 import base64
 import json
 import logging
+import signal
+import socket
+import time
 from datetime import datetime
+from typing import Optional
 
-from redis_client import get_redis_client
-from constants import AUDIO_CHANNEL, TRANSCRIPTS_CHANNEL
+from archive import create_audio_archiver
+from audio_queue import (
+    AUDIO_STREAMS,
+    claim_dead_consumers,
+    decode_entry,
+    ensure_consumer_groups,
+    heartbeat_key,
+    send_heartbeat,
+)
+from backoff import STABLE_RUN_S, Backoff
+from batcher import create_publish_batcher, execute_commands
+from dedup import DedupIndex, idempotency_key, session_key
+from history import create_history_writer
+from loopmonitor import start_loop_monitor
+from metrics import get_process_id, metrics, report_process_metrics
+from profiling import DEFAULT_TOP, ProfileBusyError, publish_profile, run_profile
+from redis_client import (
+    create_pubsub,
+    get_redis_client,
+    group_by_slot,
+    publish_message,
+    transcript_channel,
+)
+from resume import append_replay
+from sharding import (
+    ShardRouter,
+    forget_shard,
+    load_shards,
+    register_shard,
+    retire_shard,
+    shard_channel,
+    shard_stream,
+)
+from streaming import create_streaming_decoder
+from transcript_cache import audio_key, create_transcript_cache
+from config import (
+    get_archive_flush_ms,
+    get_bulk_worker_concurrency,
+    get_dedup_max_sessions,
+    get_dedup_ttl,
+    get_dedup_window,
+    get_history_flush_ms,
+    get_profile_hz,
+    get_profile_seconds,
+    get_shard_refresh_ms,
+    get_shard_vnodes,
+    get_worker_heartbeat_interval_ms,
+    get_worker_metrics_interval,
+    get_worker_restart_base_ms,
+    get_worker_restart_max_ms,
+    get_worker_slot,
+    is_audio_sharding_enabled,
+    is_audio_stream_enabled,
+    is_dedup_redis_enabled,
+)
+from constants import (
+    AUDIO_CHANNEL,
+    AUDIO_CONSUMER_GROUP,
+    AUDIO_METADATA_FIELDS,
+    BULK_AUDIO_CHANNEL,
+    BULK_AUDIO_STREAM,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,6 +77,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Чтение потоков аудио: записей за один XREADGROUP и ожидание новых, мс
+STREAM_READ_COUNT = 32
+STREAM_BLOCK_MS = 1000
+
 
 async def mock_transcribe_audio(audio_data: bytes) -> str:
     """Возвращает mock-транскрипт с текущей меткой времени."""
@@ -21,56 +89,546 @@ async def mock_transcribe_audio(audio_data: bytes) -> str:
     return f"Transcribed: {timestamp} (size: {data_size} bytes)"
 
 
-async def process_audio_chunks():
-    """Подписывается на audio_chunks, генерирует и публикует транскрипты."""
-    logger.info("Starting audio processing worker...")
+async def mock_finalize_upload(fragments: int, total_size: int) -> str:
+    """Возвращает mock-транскрипт завершенной фрагментированной загрузки."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return (
+        f"Transcribed upload: {timestamp} "
+        f"(fragments: {fragments}, size: {total_size} bytes)"
+    )
 
-    redis = None
-    pubsub = None
+
+class WorkerContext:
+    """Состояние процесса воркера, общее для всех обрабатываемых сообщений."""
+
+    __slots__ = ("redis", "cache", "processed", "streaming",
+                 "batcher", "archive", "history")
+
+    def __init__(self, redis):
+        self.redis = redis
+        # Общие конвейеры публикации (None — конвейер на каждое сообщение)
+        self.batcher = create_publish_batcher(redis)
+        # Архив исходного аудио сессий (None — аудио не сохраняется)
+        self.archive = create_audio_archiver()
+        # История транскриптов сессий (None — не сохраняется)
+        self.history = create_history_writer(redis)
+        self.cache = create_transcript_cache(redis)
+        # Уже обработанные номера seq по сессиям
+        self.processed = DedupIndex(
+            get_dedup_window(), get_dedup_max_sessions())
+        # Состояния фраз сессий (None — по транскрипту на каждый чанк)
+        self.streaming = create_streaming_decoder()
+
+
+async def is_duplicate(context: WorkerContext, payload: dict) -> bool:
+    """Обрабатывался ли уже этот чанк (этим или, через Redis, другим воркером)."""
+    key = idempotency_key(payload)
+    if key is None:
+        return False
+    if context.processed.seen(session_key(payload), payload["seq"]):
+        return True
+    if is_dedup_redis_enabled():
+        return bool(await context.redis.exists(key))
+    return False
+
+
+def build_transcript_payload(payload: dict, text: str, **fields) -> bytes:
+    """Формирует сообщение транскрипта с метаданными исходного чанка."""
+    transcript = {"client_id": payload["client_id"], "text": text, **fields}
+    for field in AUDIO_METADATA_FIELDS:
+        if field in payload:
+            transcript[field] = payload[field]
+    return json.dumps(transcript).encode("utf-8")
+
+
+async def transcribe_cached(context: WorkerContext, audio_data: bytes) -> str:
+    """Транскрибирует аудио, переиспользуя результат для повторных данных."""
+    if context.cache is None:
+        return await mock_transcribe_audio(audio_data)
+
+    key = audio_key(audio_data)
+    transcript = await context.cache.get(key)
+    if transcript is None:
+        transcript = await mock_transcribe_audio(audio_data)
+        await context.cache.set(key, transcript)
+    return transcript
+
+
+async def transcribe_payload(context: WorkerContext, payload: dict) -> str:
+    """Транскрибирует чанк или фрагмент; на конце загрузки выдает итог."""
+    if "upload_id" in payload and payload.get("final"):
+        # Фрагменты загрузки разбирают разные воркеры группы, поэтому
+        # объем загрузки приходит в сообщении конца от шлюза
+        return await mock_finalize_upload(
+            payload["fragment_seq"], payload.get("size", 0))
+
+    audio_data = base64.b64decode(payload["audio"])
+    logger.info(
+        f"Received audio chunk from client {payload['client_id']}: "
+        f"{len(audio_data)} bytes"
+    )
+    # Фрагменты загрузки транскрибируются сразу, не дожидаясь ее конца
+    return await transcribe_cached(context, audio_data)
+
+
+def build_streaming_payload(payload: dict, transcript) -> bytes:
+    """Сообщение промежуточного или итогового транскрипта фразы."""
+    return build_transcript_payload(
+        payload, transcript.text,
+        status=transcript.status, utterance=transcript.utterance)
+
+
+async def publish_streaming_finals(context: WorkerContext, finals: list):
+    """Публикует итоги фраз, не привязанные к чанку (конец или простой сессии)."""
+    if not finals:
+        return
+    messages = [(transcript, build_streaming_payload(
+        transcript.source(), transcript)) for transcript in finals]
+
+    def fill(pipe):
+        for transcript, message in messages:
+            publish_message(
+                pipe, transcript_channel(transcript.client_id), message)
+            if transcript.resumable:
+                append_replay(pipe, transcript.client_id, message)
+
+    await execute_commands(context.redis, context.batcher, fill)
+    if context.history is not None:
+        for transcript, message in messages:
+            context.history.append(transcript.client_id, message)
+
+
+async def flush_archive(archive):
+    """Периодически отдает накопленное аудио архива на запись."""
+    interval = get_archive_flush_ms() / 1000
+    while True:
+        await asyncio.sleep(interval)
+        archive.flush()
+
+
+async def expire_streaming_sessions(context: WorkerContext):
+    """Периодически завершает фразы сессий, переставших присылать аудио."""
+    decoder = context.streaming
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(min(1.0, decoder.idle_timeout / 2))
+        try:
+            await publish_streaming_finals(context, decoder.expire(loop.time()))
+        except Exception as e:
+            logger.error(f"Failed to finalize idle sessions: {e}")
+
+
+async def handle_audio_message(context: WorkerContext, payload: dict,
+                               streaming: bool = True):
+    """Транскрибирует аудио-сообщение и публикует результат в transcripts.
+
+    Повторно доставленный чанк (тот же client_id и seq) пропускается.
+    С потоковыми транскриптами (и streaming=True) чанк дает промежуточный
+    или итоговый транскрипт текущей фразы, а сообщение конца сессии —
+    итог фразы.
+    """
+    client_id = payload["client_id"]
+    redis = context.redis
+    decoder = context.streaming if streaming else None
+
+    if payload.get("end"):
+        if decoder is not None:
+            await publish_streaming_finals(context, decoder.end(payload))
+        return
+
+    if await is_duplicate(context, payload):
+        metrics.inc("duplicate_chunks_skipped")
+        logger.info(
+            f"Skipping duplicate chunk {payload['seq']} for client {client_id}")
+        return
+
+    if (context.archive is not None and "audio" in payload
+            and payload.get("seq") is not None):
+        # Архивируется до транскрипции: сбой распознавания не теряет аудио
+        context.archive.append(
+            session_key(payload), payload["seq"],
+            base64.b64decode(payload["audio"]))
+
+    evicted = []
+    # В историю попадают итоговые транскрипты, а не промежуточные
+    final = True
+    if decoder is not None and "upload_id" not in payload:
+        transcript, evicted = decoder.feed(
+            payload, base64.b64decode(payload["audio"]),
+            asyncio.get_running_loop().time())
+        message = build_streaming_payload(payload, transcript)
+        final = transcript.status != "partial"
+    else:
+        # Создаем фиктивный транскрипт
+        text = await transcribe_payload(context, payload)
+        logger.info(f"Generated transcript: {text} for client {client_id}")
+        message = build_transcript_payload(payload, text)
+
+    key = idempotency_key(payload)
+
+    def fill(pipe):
+        publish_message(pipe, transcript_channel(client_id), message)
+        if payload.get("resumable"):
+            # Сохраняем транскрипт для повтора на случай переподключения
+            append_replay(pipe, client_id, message)
+        if key is not None and is_dedup_redis_enabled():
+            # Отмечаем чанк только после успешной обработки, чтобы
+            # повтор после сбоя воркера не был потерян
+            pipe.set(key, 1, ex=get_dedup_ttl())
+
+    await execute_commands(redis, context.batcher, fill)
+    if context.history is not None and final:
+        context.history.append(client_id, message)
+    if key is not None:
+        context.processed.add(session_key(payload), payload["seq"])
+    metrics.inc("chunks_processed_total")
+    logger.info(
+        f"Published transcript to channel: {transcript_channel(client_id)} for client {client_id}"
+    )
+    await publish_streaming_finals(context, evicted)
+
+
+async def handle_bulk_message(context: WorkerContext, payload: dict,
+                              bulk_limit: asyncio.Semaphore):
+    """Обрабатывает пакетный чанк в пределах отдельного лимита параллелизма.
+
+    Пакетная задача ждет по транскрипту на чанк, поэтому потоковые
+    транскрипты фраз к ней не применяются.
+    """
+    async with bulk_limit:
+        try:
+            await handle_audio_message(context, payload, streaming=False)
+        except Exception as e:
+            logger.error(f"Error processing bulk audio chunk: {e}")
+
+
+async def report_metrics(redis):
+    """Периодически публикует метрики воркера в Redis."""
+    await report_process_metrics(redis, get_worker_metrics_interval())
+
+
+async def profile_worker():
+    """Профилирует воркер и сохраняет отчет в Redis (по SIGUSR1)."""
+    seconds = get_profile_seconds()
+    logger.info(f"Profiling worker for {seconds} s...")
     try:
+        report = await run_profile(seconds, get_profile_hz(), DEFAULT_TOP)
         redis = await get_redis_client()
-        pubsub = redis.pubsub()
+        try:
+            await publish_profile(redis, get_process_id(), report)
+        finally:
+            await redis.close()
+    except ProfileBusyError:
+        logger.warning("Profiling is already running")
+        return
+    except Exception as e:
+        logger.error(f"Worker profiling failed: {e}")
+        return
+    logger.info(f"Worker profile saved ({report['samples']} samples)")
+
+
+def worker_consumer_name() -> str:
+    """Имя воркера в группе потребителей.
+
+    Под супервизором имя привязано к слоту, и перезапущенный процесс
+    сам дорабатывает записи, полученные до сбоя.
+    """
+    slot = get_worker_slot()
+    if slot is None:
+        return get_process_id()
+    return f"{socket.gethostname()}-{slot}"
+
+
+async def send_heartbeats(redis, consumer: str):
+    """Периодически продлевает heartbeat воркера в Redis."""
+    interval = get_worker_heartbeat_interval_ms() / 1000
+    while True:
+        try:
+            await send_heartbeat(redis, consumer)
+        except Exception as e:
+            logger.error(f"Failed to send worker heartbeat: {e}")
+        await asyncio.sleep(interval)
+
+
+async def handle_stream_entry(context: WorkerContext, stream: str, entry_id,
+                              fields: dict, bulk_limit: asyncio.Semaphore):
+    """Обрабатывает запись потока аудио и подтверждает ее.
+
+    Ошибка обработки не повторяется: повторно доставляются только
+    записи воркера, упавшего до подтверждения.
+    """
+    try:
+        payload = decode_entry(fields)
+        if stream == BULK_AUDIO_STREAM:
+            await handle_bulk_message(context, payload, bulk_limit)
+        else:
+            await handle_audio_message(context, payload)
+    except Exception as e:
+        logger.error(f"Error processing audio chunk: {e}")
+    await context.redis.xack(stream, AUDIO_CONSUMER_GROUP, entry_id)
+
+
+async def dispatch_entry(context: WorkerContext, stream: str, entry_id,
+                         fields: dict, bulk_limit: asyncio.Semaphore,
+                         bulk_tasks: set):
+    """Обрабатывает интерактивную запись сразу, пакетную — в фоне."""
+    if stream == BULK_AUDIO_STREAM:
+        task = asyncio.create_task(handle_stream_entry(
+            context, stream, entry_id, fields, bulk_limit))
+        bulk_tasks.add(task)
+        task.add_done_callback(bulk_tasks.discard)
+        return
+    await handle_stream_entry(context, stream, entry_id, fields, bulk_limit)
+
+
+async def reclaim_pending(context: WorkerContext, consumer: str,
+                          bulk_limit: asyncio.Semaphore, bulk_tasks: set,
+                          streams=AUDIO_STREAMS):
+    """Периодически перехватывает и обрабатывает записи упавших воркеров."""
+    interval = get_worker_heartbeat_interval_ms() / 1000
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for stream, entry_id, fields in await claim_dead_consumers(
+                    context.redis, consumer, streams):
+                await dispatch_entry(
+                    context, stream, entry_id, fields, bulk_limit, bulk_tasks)
+        except Exception as e:
+            logger.error(f"Failed to reclaim pending audio chunks: {e}")
 
-        # Подписываемся на канал audio_chunks
-        await pubsub.subscribe(AUDIO_CHANNEL)
-        logger.info(f"Subscribed to channel: {AUDIO_CHANNEL}")
+
+async def read_new_entries(context: WorkerContext, consumer: str, streams,
+                           bulk_limit: asyncio.Semaphore, bulk_tasks: set):
+    """Читает новые записи потоков одной командой XREADGROUP."""
+    cursors = {stream: ">" for stream in streams}
+    while True:
+        response = await context.redis.xreadgroup(
+            AUDIO_CONSUMER_GROUP, consumer, cursors,
+            count=STREAM_READ_COUNT, block=STREAM_BLOCK_MS)
+        for stream, entries in response or []:
+            stream = stream.decode("utf-8")
+            for entry_id, fields in entries:
+                await dispatch_entry(
+                    context, stream, entry_id, fields, bulk_limit, bulk_tasks)
+
+
+async def consume_streams(context: WorkerContext, consumer: str,
+                          bulk_limit: asyncio.Semaphore, bulk_tasks: set,
+                          streams=AUDIO_STREAMS):
+    """Читает аудио из потоков Redis в группе воркеров."""
+    redis = context.redis
+    await ensure_consumer_groups(redis, streams)
+
+    # Сначала дорабатываем записи, полученные под этим именем до перезапуска
+    for stream in streams:
+        last_id = "0"
+        while True:
+            response = await redis.xreadgroup(
+                AUDIO_CONSUMER_GROUP, consumer, {stream: last_id},
+                count=STREAM_READ_COUNT)
+            entries = response[0][1] if response else []
+            if not entries:
+                break
+            for entry_id, fields in entries:
+                await dispatch_entry(
+                    context, stream, entry_id, fields, bulk_limit, bulk_tasks)
+            last_id = entries[-1][0]
+
+    logger.info(f"Consuming streams {', '.join(streams)} as {consumer}")
+    # В кластере XREADGROUP читает только потоки одного слота
+    await asyncio.gather(*(
+        read_new_entries(context, consumer, group, bulk_limit, bulk_tasks)
+        for group in group_by_slot(streams)))
+
+
+async def consume_pubsub(context: WorkerContext,
+                         bulk_limit: asyncio.Semaphore, bulk_tasks: set,
+                         channels=(AUDIO_CHANNEL, BULK_AUDIO_CHANNEL)):
+    """Подписывается на аудио-каналы pub/sub (без подтверждения обработки)."""
+    pubsub = create_pubsub(context.redis)
+    try:
+        # Подписываемся на интерактивные и пакетный аудио-каналы
+        await pubsub.subscribe(*channels)
+        logger.info(f"Subscribed to channels: {', '.join(channels)}")
 
         async for message in pubsub.listen():
             if message["type"] == "message":
                 try:
                     payload = json.loads(message["data"].decode("utf-8"))
-                    client_id = payload["client_id"]
-                    audio_data = base64.b64decode(payload["audio"])
-                    logger.info(
-                        f"Received audio chunk from client {client_id}: {len(audio_data)} bytes"
-                    )
-
-                    # Создаем фиктивный транскрипт
-                    transcript = await mock_transcribe_audio(audio_data)
-                    logger.info(
-                        f"Generated transcript: {transcript} for client {client_id}"
-                    )
-
-                    await redis.publish(
-                        TRANSCRIPTS_CHANNEL,
-                        json.dumps({"client_id": client_id,
-                                   "text": transcript}).encode("utf-8")
-                    )
-                    logger.info(
-                        f"Published transcript to channel: {TRANSCRIPTS_CHANNEL} for client {client_id}"
-                    )
+
+                    if message["channel"] == BULK_AUDIO_CHANNEL.encode():
+                        task = asyncio.create_task(handle_bulk_message(
+                            context, payload, bulk_limit))
+                        bulk_tasks.add(task)
+                        task.add_done_callback(bulk_tasks.discard)
+                        continue
+
+                    await handle_audio_message(context, payload)
 
                 except Exception as e:
                     logger.error(f"Error processing audio chunk: {e}")
+    finally:
+        try:
+            await pubsub.unsubscribe(*channels)
+            await pubsub.close()
+        except Exception as e:
+            logger.error(f"Error during unsubscribe: {e}")
+
 
+async def keep_shard_registered(redis, shard: str):
+    """Периодически продлевает членство шарда воркера в кольце."""
+    interval = get_shard_refresh_ms() / 1000
+    while True:
+        try:
+            await register_shard(redis, shard)
+        except Exception as e:
+            logger.error(f"Failed to renew shard {shard}: {e}")
+        await asyncio.sleep(interval)
+
+
+async def adopt_retired_shard(context: WorkerContext, consumer: str,
+                              shard: str, retired_at: float,
+                              bulk_limit: asyncio.Semaphore, bulk_tasks: set):
+    """Дорабатывает поток выведенного шарда и удаляет его, когда он разобран."""
+    redis = context.redis
+    stream = shard_stream(shard)
+    if not await redis.exists(stream):
+        await forget_shard(redis, shard)
+        return
+    await ensure_consumer_groups(redis, (stream,))
+    for _, entry_id, fields in await claim_dead_consumers(
+            redis, consumer, (stream,)):
+        await dispatch_entry(
+            context, stream, entry_id, fields, bulk_limit, bulk_tasks)
+
+    adopted = 0
+    while True:
+        response = await redis.xreadgroup(
+            AUDIO_CONSUMER_GROUP, consumer, {stream: ">"},
+            count=STREAM_READ_COUNT)
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        for entry_id, fields in entries:
+            await dispatch_entry(
+                context, stream, entry_id, fields, bulk_limit, bulk_tasks)
+        adopted += len(entries)
+    if adopted:
+        metrics.inc("shard_entries_adopted", adopted)
+        logger.warning(f"Adopted {adopted} entries of retired shard {shard}")
+
+    # Шлюзы перестают писать в поток за период обновления кольца
+    if time.time() * 1000 - retired_at < 2 * get_shard_refresh_ms():
+        return
+    if (await redis.xpending(stream, AUDIO_CONSUMER_GROUP))["pending"]:
+        return
+    await redis.delete(stream)
+    await forget_shard(redis, shard)
+    logger.info(f"Removed drained stream of retired shard {shard}")
+
+
+async def adopt_retired_shards(context: WorkerContext, consumer: str,
+                               bulk_limit: asyncio.Semaphore, bulk_tasks: set):
+    """Периодически дорабатывает потоки шардов, покинувших кольцо.
+
+    Поток выведенного шарда разбирает один воркер — владелец имени
+    этого шарда на кольце живых шардов.
+    """
+    router = ShardRouter(get_shard_vnodes(), get_shard_refresh_ms())
+    while True:
+        await asyncio.sleep(router.refresh_interval)
+        try:
+            live, retired = await load_shards(context.redis)
+            router.update(live)
+            for shard, retired_at in retired.items():
+                if shard != consumer and router.ring.get(shard) == consumer:
+                    await adopt_retired_shard(
+                        context, consumer, shard, retired_at,
+                        bulk_limit, bulk_tasks)
+        except Exception as e:
+            logger.error(f"Failed to adopt retired shards: {e}")
+
+
+async def process_audio_chunks():
+    """Получает аудио-чанки, генерирует и публикует транскрипты."""
+    logger.info("Starting audio processing worker...")
+
+    redis = None
+    context: Optional[WorkerContext] = None
+    consumer = None
+    shard: Optional[str] = None
+    stopping = False
+    background = []
+    # Пакетные чанки обрабатываются в фоне, не задерживая интерактивные
+    bulk_limit = asyncio.Semaphore(get_bulk_worker_concurrency())
+    bulk_tasks = set()
+    try:
+        redis = await get_redis_client()
+        context = WorkerContext(redis)
+        background.append(asyncio.create_task(report_metrics(redis)))
+        if context.streaming is not None:
+            background.append(
+                asyncio.create_task(expire_streaming_sessions(context)))
+        if context.archive is not None:
+            background.append(
+                asyncio.create_task(flush_archive(context.archive)))
+        if context.history is not None:
+            context.history.start(get_history_flush_ms() / 1000)
+
+        if is_audio_sharding_enabled():
+            # Шард назван по слоту: перезапущенный воркер сохраняет свои сессии
+            shard = worker_consumer_name()
+            await register_shard(redis, shard)
+            background.append(
+                asyncio.create_task(keep_shard_registered(redis, shard)))
+            logger.info(f"Registered shard {shard}")
+
+        if not is_audio_stream_enabled():
+            channels = (AUDIO_CHANNEL, BULK_AUDIO_CHANNEL)
+            if shard is not None:
+                channels += (shard_channel(shard),)
+            await consume_pubsub(context, bulk_limit, bulk_tasks, channels)
+            return
+
+        consumer = worker_consumer_name()
+        streams = AUDIO_STREAMS
+        if shard is not None:
+            streams += (shard_stream(shard),)
+            background.append(asyncio.create_task(adopt_retired_shards(
+                context, consumer, bulk_limit, bulk_tasks)))
+        # Heartbeat до первого чтения: без него соседи сочтут воркер упавшим
+        await send_heartbeat(redis, consumer)
+        background.append(
+            asyncio.create_task(send_heartbeats(redis, consumer)))
+        background.append(asyncio.create_task(reclaim_pending(
+            context, consumer, bulk_limit, bulk_tasks, streams)))
+        await consume_streams(
+            context, consumer, bulk_limit, bulk_tasks, streams)
+
+    except asyncio.CancelledError:
+        stopping = True
+        raise
     except Exception as e:
         logger.error(f"Worker error: {e}")
         raise
     finally:
+        for task in (*bulk_tasks, *background):
+            task.cancel()
         try:
-            if pubsub is not None:
-                await pubsub.unsubscribe(AUDIO_CHANNEL)
-                await pubsub.close()
+            if context is not None and context.batcher is not None:
+                # Транскрипты, уже собранные в конвейер, уходят до выхода
+                await context.batcher.close()
+            if context is not None and context.archive is not None:
+                await context.archive.close()
+            if context is not None and context.history is not None:
+                await context.history.close()
+            if shard is not None and stopping:
+                # Остановленный воркер покидает кольцо, и его сессии
+                # переходят к соседям; после сбоя шард остается за слотом
+                await retire_shard(redis, shard)
+            if consumer is not None:
+                # Незавершенные записи сразу достаются соседям
+                await redis.delete(heartbeat_key(consumer))
             if redis is not None:
                 await redis.close()
             logger.info("Worker stopped")
@@ -79,17 +637,44 @@ async def process_audio_chunks():
 
 
 async def main():
-    """Точка входа воркера с автоперезапуском при ошибках."""
+    """Точка входа воркера с автоперезапуском при ошибках.
+
+    Задержка перезапуска растет экспоненциально от WORKER_RESTART_BASE_MS
+    до WORKER_RESTART_MAX_MS и сбрасывается после устойчивой работы.
+    """
     logger.info("Starting mock transcription worker...")
+    loop = asyncio.get_running_loop()
+    # SIGTERM (например, от супервизора) завершает воркер с очисткой
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    # Задержка цикла попадает в метрики, которые воркер публикует в Redis
+    start_loop_monitor()
+    profiles = set()
 
+    def start_profile():
+        task = asyncio.create_task(profile_worker())
+        profiles.add(task)
+        task.add_done_callback(profiles.discard)
+
+    loop.add_signal_handler(signal.SIGUSR1, start_profile)
+
+    backoff = Backoff(get_worker_restart_base_ms() / 1000,
+                      get_worker_restart_max_ms() / 1000)
     while True:
+        started = loop.time()
         try:
             await process_audio_chunks()
         except Exception as e:
+            metrics.inc("worker_restarts")
+            if loop.time() - started >= STABLE_RUN_S:
+                backoff.reset()
+            delay = backoff.next_delay()
             logger.error(f"Worker crashed: {e}")
-            logger.info("Restarting worker in 5 seconds...")
-            await asyncio.sleep(5)
+            logger.info(f"Restarting worker in {delay * 1000:.0f} ms...")
+            await asyncio.sleep(delay)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -2,19 +2,58 @@ import asyncio
 import base64
 import json
 import logging
+from collections import deque
 from typing import Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from redis_client import get_redis_client
-from constants import AUDIO_CHANNEL, TRANSCRIPTS_CHANNEL
-from config import get_max_audio_size
+from aggregator import create_aggregator
+from audio_queue import publish_audio
+from fragments import FragmentedUpload
+from history import issue_history_token
+from normalize import AudioNormalizer, create_normalizer
+from resume import (
+    ack_session,
+    create_resumable_session,
+    load_resumable_session,
+    save_session_progress,
+)
+from ratelimit import create_client_limiter
+from protocol import (
+    ProtocolError,
+    decode_mux_frame,
+    parse_control_message,
+    require_int,
+    require_stream_id,
+    require_str,
+)
+from sessions import (
+    DRAIN_CLOSE_CODE,
+    Session,
+    build_transcript_response,
+    get_session_hub,
+    new_session_id,
+    validate_transcript_data,  # noqa: F401 — реэкспорт для совместимости
+)
+from config import (
+    get_audio_idle_flush_ms,
+    get_max_audio_size,
+    get_max_upload_size,
+    get_mux_max_streams,
+    is_transcript_history_enabled,
+    is_transcript_streaming_enabled,
+)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+DRAINING_ERROR = "Gateway is draining, reconnect to another instance"
+
+# Сколько последних чанков помнят время публикации для замера задержки
+SENT_TIMES_LIMIT = 256
+
 
 def validate_audio_data(data: bytes) -> tuple[bool, Optional[str]]:
     """Проверяет аудио-данные: не пустые и не превышают лимит размера."""
@@ -28,20 +67,6 @@ def validate_audio_data(data: bytes) -> tuple[bool, Optional[str]]:
     return True, None
 
 
-def validate_transcript_data(data: bytes) -> tuple[bool, Optional[str]]:
-    """Проверяет транскрипт: валидная UTF-8 и непустой текст."""
-    if not data:
-        return False, "Transcript data is empty"
-
-    try:
-        text = data.decode("utf-8")
-        if not text.strip():
-            return False, "Transcript text is empty"
-        return True, None
-    except UnicodeDecodeError:
-        return False, "Invalid transcript encoding"
-
-
 async def send_error_response(websocket: WebSocket, error_message: str):
     """Отправляет клиенту JSON с ошибкой через WebSocket."""
     try:
@@ -54,79 +79,398 @@ async def send_error_response(websocket: WebSocket, error_message: str):
         logger.error(f"Failed to send error response: {e}")
 
 
-async def listen_transcripts(redis, websocket, client_id):
-    """Слушает Redis-канал транскриптов и ретранслирует сообщения клиенту."""
-    pubsub = redis.pubsub()
-    await pubsub.subscribe(TRANSCRIPTS_CHANNEL)
-    logger.info(f"Client {client_id} subscribed to transcripts channel")
+async def send_rate_limited(websocket: WebSocket, wait: float):
+    """Отклоняет чанк сверх лимита клиента, сообщая, когда повторить."""
+    retry_after_ms = max(1, round(wait * 1000))
+    await websocket.send_json({
+        "error": f"Rate limit exceeded, retry in {retry_after_ms} ms",
+        "code": "rate_limited",
+        "retry_after_ms": retry_after_ms,
+        "status": "error"
+    })
+
+
+async def receive_frame(
+    websocket: WebSocket,
+) -> tuple[Optional[bytes], Optional[str]]:
+    """Получает фрейм клиента: (bytes, None) для аудио или (None, text)."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return message.get("bytes"), message.get("text")
 
+
+async def receive_frame_or_idle(
+    websocket: WebSocket, wait_idle: bool, idle_timeout: float
+) -> Optional[tuple[Optional[bytes], Optional[str]]]:
+    """Получает фрейм; при wait_idle возвращает None после паузы idle_timeout."""
+    if not wait_idle:
+        return await receive_frame(websocket)
     try:
-        async for message in pubsub.listen():
-            if message["type"] == "message":
-                try:
-                    # Валидируем данные транскрипта
-                    is_valid, error_msg = validate_transcript_data(
-                        message["data"])
-                    if not is_valid:
-                        logger.error(f"Invalid transcript data: {error_msg}")
-                        await send_error_response(
-                            websocket, error_msg or "Invalid transcript data"
-                        )
-                        continue
-
-                    # Декодируем JSON транскрипта
-                    transcript_data = json.loads(message["data"].decode("utf-8"))
-                    if transcript_data.get("client_id") != client_id:
-                        continue
-                    text = transcript_data["text"]
-                    logger.info(
-                        f"Received transcript for client {client_id}: {text}")
-
-                    # Отправляем транскрипт клиенту
-                    await websocket.send_json({
-                        "client_id": client_id,
-                        "text": text,
-                        "status": "transcript"
-                    })
-                    logger.info(f"Sent transcript to client {client_id}")
-
-                except Exception as e:
-                    logger.error(
-                        f"Error processing transcript for client {client_id}: {e}")
-                    await send_error_response(
-                        websocket,
-                        f"Failed to process transcript: {str(e)}"
-                    )
+        return await asyncio.wait_for(receive_frame(websocket), idle_timeout)
+    except asyncio.TimeoutError:
+        return None
 
-    except Exception as e:
-        logger.error(f"Transcript listener error for client {client_id}: {e}")
-    finally:
-        await pubsub.unsubscribe(TRANSCRIPTS_CHANNEL)
-        await pubsub.close()
+
+class SessionPublisher:
+    """Публикует аудио одной сессии (или потока) в очередь воркеров.
+
+    Каждое сообщение получает следующий номер seq; metadata добавляется
+    во все сообщения (например, stream_id потока). С batcher сообщения
+    уходят общими конвейерами публикации процесса. normalizer приводит
+    аудио к формату воркеров, если клиент объявил свой. С track_latency
+    запоминается время публикации чанков для замера задержки воркеров.
+    """
+
+    __slots__ = ("redis", "client_id", "start_seq", "next_seq", "metadata",
+                 "batcher", "normalizer", "sent", "ended")
+
+    def __init__(self, redis, client_id, start_seq: int = 0, batcher=None,
+                 track_latency: bool = False, **metadata):
+        self.redis = redis
+        self.batcher = batcher
+        self.normalizer = None
+        self.sent = deque(maxlen=SENT_TIMES_LIMIT) if track_latency else None
+        self.client_id = client_id
+        self.start_seq = start_seq
+        self.next_seq = start_seq
+        self.metadata = metadata
+        # Конец сессии уже отправлен воркерам (при выводе шлюза из работы)
+        self.ended = False
+
+    async def publish(self, data: bytes, **extra) -> int:
+        """Публикует аудио и возвращает присвоенный номер seq."""
+        seq = self.next_seq
+        self.next_seq += 1
+        audio_b64 = base64.b64encode(data).decode('utf-8')
+        await publish_audio(
+            self.redis,
+            json.dumps({
+                "client_id": self.client_id,
+                "audio": audio_b64,
+                "seq": seq,
+                **self.metadata,
+                **extra
+            }),
+            key=str(self.client_id),
+            batcher=self.batcher,
+        )
+        if self.sent is not None and not extra:
+            self.sent.append((seq, asyncio.get_running_loop().time()))
         logger.info(
-            f"Client {client_id} unsubscribed from transcripts channel")
+            f"Published audio chunk {seq} to Redis for client "
+            f"{self.client_id}: {len(data)} bytes")
+        return seq
+
+    def sent_at(self, seq: int) -> Optional[float]:
+        """Время публикации чанка seq или None (записи до него забываются)."""
+        sent = self.sent
+        if not sent:
+            return None
+        while sent and sent[0][0] < seq:
+            sent.popleft()
+        if sent and sent[0][0] == seq:
+            return sent.popleft()[1]
+        return None
+
+    async def end(self):
+        """Сообщает воркерам о конце сессии: они выдают итог последней фразы."""
+        if self.ended or not is_transcript_streaming_enabled():
+            return
+        self.ended = True
+        try:
+            await publish_audio(self.redis, json.dumps({
+                "client_id": self.client_id,
+                "end": True,
+                **self.metadata
+            }), key=str(self.client_id), batcher=self.batcher)
+        except Exception as e:
+            logger.error(
+                f"Failed to publish end of session {self.client_id}: {e}")
+
+
+async def publish_or_aggregate(publisher, aggregator, data: bytes) -> Optional[int]:
+    """Публикует чанк целиком или заполненные им окна агрегатора.
+
+    Возвращает seq чанка, если он опубликован целиком без агрегации.
+    """
+    if publisher.normalizer is not None:
+        data = publisher.normalizer.feed(data)
+        if not data:
+            # Чанк короче фрейма ждет продолжения
+            return None
+    if aggregator is None:
+        return await publisher.publish(data)
+    for window in aggregator.feed(data):
+        await publisher.publish(window)
+    return None
+
+
+async def flush_aggregator(publisher, aggregator):
+    """Публикует неполное окно агрегатора, если в нем есть новые данные."""
+    if aggregator is None:
+        return
+    window = aggregator.flush()
+    if window:
+        await publisher.publish(window)
+
+
+async def handle_upload_control(websocket, publisher, message, upload):
+    """Обрабатывает фреймы begin/continue/end и возвращает состояние загрузки."""
+    message_type = message["type"]
+
+    if message_type == "begin":
+        if upload is not None:
+            raise ProtocolError(
+                f"Upload {upload.upload_id} is already in progress")
+        normalizer = publisher.normalizer
+        if normalizer is not None:
+            # Свой нормализатор: загрузка не делит состояние с потоком чанков
+            normalizer = AudioNormalizer(normalizer.source, normalizer.target)
+        upload = FragmentedUpload(
+            require_str(message, "upload_id"), get_max_upload_size(),
+            normalizer)
+        logger.info(
+            f"Client {publisher.client_id} started upload {upload.upload_id}")
+        await websocket.send_json({
+            "status": "upload_started",
+            "upload_id": upload.upload_id
+        })
+        return upload
+
+    if message_type not in ("continue", "end"):
+        raise ProtocolError(f"Unknown control message type: {message_type}")
+    if upload is None or message.get("upload_id") != upload.upload_id:
+        raise ProtocolError("No upload in progress with this upload_id")
+
+    if message_type == "continue":
+        upload.expect(require_int(message, "seq"))
+        return upload
+
+    # end: seq равен количеству отправленных фрагментов
+    upload.finish(require_int(message, "seq"))
+    tail = b"" if upload.normalizer is None else upload.normalizer.flush()
+    await publisher.publish(
+        tail,
+        upload_id=upload.upload_id,
+        fragment_seq=upload.next_seq,
+        final=True,
+        size=upload.size
+    )
+    logger.info(
+        f"Client {publisher.client_id} completed upload {upload.upload_id}: "
+        f"{upload.next_seq} fragments, {upload.size} bytes")
+    await websocket.send_json({
+        "status": "upload_completed",
+        "upload_id": upload.upload_id,
+        "fragments": upload.next_seq,
+        "size": upload.size
+    })
+    return None
+
+
+async def forward_fragment(websocket, publisher, upload, data: bytes):
+    """Пересылает фрагмент загрузки воркеру, не накапливая его в шлюзе.
+
+    Возвращает состояние загрузки или None, если загрузка прервана.
+    """
+    is_valid, error_msg = validate_audio_data(data)
+    if not is_valid:
+        await send_error_response(websocket, error_msg or "Invalid audio data")
+        return upload
+
+    try:
+        fragment_seq = upload.accept(data)
+    except ProtocolError as e:
+        logger.error(
+            f"Upload {upload.upload_id} from client {publisher.client_id} "
+            f"aborted: {e}")
+        await send_error_response(websocket, str(e))
+        return None
+
+    audio = data if upload.normalizer is None else upload.normalizer.feed(data)
+    seq = await publisher.publish(
+        audio,
+        upload_id=upload.upload_id,
+        fragment_seq=fragment_seq
+    )
+    await websocket.send_json({
+        "status": "received",
+        "size": len(data),
+        "seq": seq,
+        "upload_id": upload.upload_id,
+        "fragment_seq": fragment_seq
+    })
+    return upload
+
+
+async def open_resumable_session(redis, websocket):
+    """Создает или восстанавливает сессию по параметрам подключения.
+
+    Возвращает None для обычной (невозобновляемой) сессии.
+    """
+    resume_token = websocket.query_params.get("resume_token")
+    if resume_token:
+        state = await load_resumable_session(redis, resume_token)
+        if state is None:
+            raise ProtocolError("Unknown or expired resume token")
+        logger.info(
+            f"Session {state.session_id} resumed at seq {state.next_seq}")
+        return state
+    if websocket.query_params.get("resumable") == "1":
+        return await create_resumable_session(redis)
+    return None
+
+
+def send_session_info(session: Session, resumed: bool):
+    """Сообщает клиенту токен сессии и прогресс обработки его аудио.
+
+    Сообщения ставятся в очередь сессии раньше любых живых транскриптов.
+    """
+    state = session.resume_state
+    responses = [{
+        "status": "session",
+        "session_id": state.session_id,
+        "resume_token": state.resume_token,
+        "next_seq": state.next_seq,
+        "last_processed_seq": state.last_processed_seq,
+        "resumed": resumed
+    }]
+    if resumed:
+        # Повторяем транскрипты, выданные, пока клиент был отключен
+        for item in state.missed_transcripts():
+            response = build_transcript_response(item, state.session_id)
+            if not session.delivery.mark_delivered(response):
+                continue
+            response["replayed"] = True
+            responses.append(response)
+    session.send(responses)
+
+
+async def send_history_token(redis, session: Session):
+    """Выдает клиенту токен чтения истории транскриптов сессии."""
+    if not is_transcript_history_enabled():
+        return
+    token = await issue_history_token(redis, session.client_id)
+    session.send([{
+        "status": "history",
+        "session_id": session.client_id,
+        "history_token": token
+    }])
+
+
+async def handle_ack(redis, resume_state, message):
+    """Обрабатывает подтверждение транскриптов {"type": "ack", "seq": N}."""
+    if resume_state is None:
+        raise ProtocolError("Session is not resumable")
+    await ack_session(redis, resume_state, require_int(message, "seq"))
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Обрабатывает аудио-чанки клиента и отсылает транскрипты."""
+    hub = await get_session_hub()
+    if hub.draining:
+        # Шлюз выводится из работы: клиент подключится к другому экземпляру
+        await websocket.close(code=DRAIN_CLOSE_CODE)
+        return
     await websocket.accept()
-    client_id = id(websocket)
-    logger.info(f"Client {client_id} connected")
-
-    redis = await get_redis_client()
-    transcript_task = None
+    loop = asyncio.get_running_loop()
+    session = Session(websocket, new_session_id(), loop.time())
+    session.aggregator = create_aggregator()
+    idle_flush_timeout = get_audio_idle_flush_ms() / 1000
+    redis = hub.redis
+    limiter = create_client_limiter(websocket, redis, loop.time())
 
     try:
-        # Создаем задачу для прослушивания транскриптов
-        transcript_task = asyncio.create_task(
-            listen_transcripts(redis, websocket, client_id)
-        )
+        try:
+            session.resume_state = await open_resumable_session(
+                redis, websocket)
+        except ProtocolError as e:
+            await send_error_response(websocket, str(e))
+            await websocket.close(code=1008)
+            return
+
+        resume_state = session.resume_state
+        if resume_state is None:
+            session.publisher = SessionPublisher(
+                redis, session.client_id, batcher=hub.batcher,
+                track_latency=hub.chunk_advisor is not None)
+        else:
+            session.client_id = resume_state.session_id
+            session.publisher = SessionPublisher(
+                redis, session.client_id, start_seq=resume_state.next_seq,
+                batcher=hub.batcher,
+                track_latency=hub.chunk_advisor is not None, resumable=True)
+        try:
+            session.publisher.normalizer = create_normalizer(
+                websocket.query_params)
+        except ProtocolError as e:
+            await send_error_response(websocket, str(e))
+            await websocket.close(code=1008)
+            return
+        client_id = session.client_id
+        logger.info(f"Client {client_id} connected")
+
+        # Транскрипты клиенту раздает общая подписка шлюза; регистрация
+        # раньше чтения буфера повтора, чтобы не потерять транскрипты,
+        # опубликованные между ними
+        hub.register(session)
+        if resume_state is not None:
+            send_session_info(
+                session,
+                resumed=websocket.query_params.get("resume_token") is not None)
+        await send_history_token(redis, session)
+        hub.send_chunk_hint(session)
 
         # Основной цикл обработки аудио данных
         while True:
             try:
-                data = await websocket.receive_bytes()
+                frame = await receive_frame_or_idle(
+                    websocket,
+                    (session.aggregator is not None
+                     and session.aggregator.pending),
+                    idle_flush_timeout
+                )
+                if frame is None:
+                    # Клиент замолчал: сбрасываем неполное окно
+                    await flush_aggregator(session.publisher, session.aggregator)
+                    hub.release_if_drained(session)
+                    continue
+                data, text = frame
+                session.last_seen = loop.time()
+
+                if text is not None:
+                    # Управляющий фрейм: подтверждение или загрузка
+                    try:
+                        message = parse_control_message(text)
+                        if message["type"] == "pong":
+                            # Ответ на heartbeat: активность уже учтена
+                            pass
+                        elif message["type"] == "ack":
+                            await handle_ack(redis, resume_state, message)
+                        else:
+                            session.upload = await handle_upload_control(
+                                websocket, session.publisher, message,
+                                session.upload)
+                    except ProtocolError as e:
+                        await send_error_response(websocket, str(e))
+                    continue
+
+                if hub.draining:
+                    await send_error_response(websocket, DRAINING_ERROR)
+                    continue
+
+                # Лимит проверяется до любой работы с чанком
+                wait = await limiter.acquire(len(data or b""), loop.time())
+                if wait > 0:
+                    await send_rate_limited(websocket, wait)
+                    continue
+
+                if session.upload is not None:
+                    session.upload = await forward_fragment(
+                        websocket, session.publisher, session.upload, data)
+                    continue
 
                 # Валидируем аудио данные
                 is_valid, error_msg = validate_audio_data(data)
@@ -143,23 +487,19 @@ async def websocket_endpoint(websocket: WebSocket):
                     f"{len(data)} bytes"
                 )
 
-                # Публикуем бинарные данные в Redis
-                audio_b64 = base64.b64encode(data).decode('utf-8')
-                await redis.publish(
-                    AUDIO_CHANNEL,
-                    json.dumps({"client_id": client_id, "audio": audio_b64})
-                )
-                logger.info(
-                    f"Published audio chunk to Redis for client {client_id}")
+                # Публикуем данные в Redis: целиком или окнами агрегатора
+                seq = await publish_or_aggregate(
+                    session.publisher, session.aggregator, data)
 
                 # Отправляем подтверждение клиенту
-                await websocket.send_json({
-                    "status": "received",
-                    "size": len(data)
-                })
+                ack = {"status": "received", "size": len(data)}
+                if seq is not None:
+                    ack["seq"] = seq
+                await websocket.send_json(ack)
 
             except WebSocketDisconnect:
                 logger.info(f"Client {client_id} disconnected")
+                await flush_aggregator(session.publisher, session.aggregator)
                 break
             except Exception as e:
                 logger.error(
@@ -170,15 +510,188 @@ async def websocket_endpoint(websocket: WebSocket):
                 )
 
     except Exception as e:
-        logger.error(f"Error for client {client_id}: {e}")
+        logger.error(f"Error for client {session.client_id}: {e}")
         await websocket.close()
     finally:
         # Очистка ресурсов
-        if transcript_task:
-            transcript_task.cancel()
+        hub.unregister(session)
+        await session.close()
+        if session.resume_state is None and session.publisher is not None:
+            # Возобновляемая сессия может продолжиться после переподключения
+            await session.publisher.end()
+        if session.resume_state is not None and session.publisher is not None:
             try:
-                await transcript_task
-            except Exception:
-                pass
-        await redis.close()
-        logger.info(f"Client {client_id} cleanup completed")
+                await save_session_progress(
+                    redis, session.resume_state, session.publisher.next_seq)
+            except Exception as e:
+                logger.error(
+                    f"Failed to save session {session.client_id} progress: {e}")
+        logger.info(f"Client {session.client_id} cleanup completed")
+
+
+async def handle_stream_control(websocket, hub, client_id, message, streams,
+                                publishers):
+    """Обрабатывает фреймы open/close логических потоков соединения."""
+    message_type = message["type"]
+    stream_id = require_stream_id(message)
+
+    if message_type == "open":
+        if stream_id in streams:
+            raise ProtocolError(f"Stream {stream_id} is already open")
+        if len(streams) >= get_mux_max_streams():
+            raise ProtocolError(
+                f"Too many open streams (max {get_mux_max_streams()})")
+        # Формат объявляется при каждом открытии потока
+        normalizer = create_normalizer(message)
+        streams[stream_id] = create_aggregator()
+        # Нумерация потока продолжается при повторном открытии того же id,
+        # а конец сессии отправляется воркерам заново при его закрытии
+        if stream_id not in publishers:
+            publishers[stream_id] = SessionPublisher(
+                hub.redis, client_id, batcher=hub.batcher,
+                track_latency=hub.chunk_advisor is not None,
+                stream_id=stream_id)
+        publishers[stream_id].normalizer = normalizer
+        publishers[stream_id].ended = False
+        logger.info(f"Client {client_id} opened stream {stream_id}")
+        await websocket.send_json({
+            "status": "stream_opened",
+            "stream_id": stream_id
+        })
+        return
+
+    if message_type == "close":
+        if stream_id not in streams:
+            raise ProtocolError(f"Stream {stream_id} is not open")
+        await flush_aggregator(publishers[stream_id], streams.pop(stream_id))
+        await publishers[stream_id].end()
+        logger.info(f"Client {client_id} closed stream {stream_id}")
+        await websocket.send_json({
+            "status": "stream_closed",
+            "stream_id": stream_id
+        })
+        return
+
+    raise ProtocolError(f"Unknown control message type: {message_type}")
+
+
+async def flush_streams(streams, publishers):
+    """Сбрасывает неполные окна всех логических потоков соединения."""
+    for stream_id, aggregator in streams.items():
+        await flush_aggregator(publishers[stream_id], aggregator)
+
+
+@router.websocket("/ws/mux")
+async def multiplexed_websocket_endpoint(websocket: WebSocket):
+    """Обслуживает несколько логических аудио-потоков в одном соединении.
+
+    Бинарный фрейм начинается с 4-байтового идентификатора потока,
+    транскрипты возвращаются с тем же stream_id.
+    """
+    hub = await get_session_hub()
+    if hub.draining:
+        # Шлюз выводится из работы: клиент подключится к другому экземпляру
+        await websocket.close(code=DRAIN_CLOSE_CODE)
+        return
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    session = Session(websocket, new_session_id(), loop.time())
+    session.streams = streams = {}
+    session.publishers = publishers = {}
+    client_id = session.client_id
+    idle_flush_timeout = get_audio_idle_flush_ms() / 1000
+    logger.info(f"Multiplexed client {client_id} connected")
+    redis = hub.redis
+    # Лимит сессии действует на каждый поток соединения отдельно
+    limiter = create_client_limiter(websocket, redis, loop.time())
+
+    try:
+        # Одна регистрация на все потоки соединения
+        hub.register(session)
+        await send_history_token(redis, session)
+        hub.send_chunk_hint(session)
+
+        while True:
+            try:
+                frame = await receive_frame_or_idle(
+                    websocket,
+                    any(aggregator is not None and aggregator.pending
+                        for aggregator in streams.values()),
+                    idle_flush_timeout
+                )
+                if frame is None:
+                    await flush_streams(streams, publishers)
+                    hub.release_if_drained(session)
+                    continue
+                data, text = frame
+                session.last_seen = loop.time()
+
+                if text is not None:
+                    try:
+                        message = parse_control_message(text)
+                        if message["type"] != "pong":
+                            await handle_stream_control(
+                                websocket, hub, client_id, message,
+                                streams, publishers
+                            )
+                    except ProtocolError as e:
+                        await send_error_response(websocket, str(e))
+                    continue
+
+                if hub.draining:
+                    await send_error_response(websocket, DRAINING_ERROR)
+                    continue
+
+                try:
+                    stream_id, audio = decode_mux_frame(data or b"")
+                except ProtocolError as e:
+                    await send_error_response(websocket, str(e))
+                    continue
+                if stream_id not in streams:
+                    await send_error_response(
+                        websocket, f"Stream {stream_id} is not open")
+                    continue
+                wait = await limiter.acquire(
+                    len(audio), loop.time(), stream_id)
+                if wait > 0:
+                    await send_rate_limited(websocket, wait)
+                    continue
+
+                is_valid, error_msg = validate_audio_data(audio)
+                if not is_valid:
+                    await send_error_response(
+                        websocket, error_msg or "Invalid audio data")
+                    continue
+
+                seq = await publish_or_aggregate(
+                    publishers[stream_id], streams[stream_id], audio)
+                ack = {
+                    "status": "received",
+                    "stream_id": stream_id,
+                    "size": len(audio)
+                }
+                if seq is not None:
+                    ack["seq"] = seq
+                await websocket.send_json(ack)
+
+            except WebSocketDisconnect:
+                logger.info(f"Multiplexed client {client_id} disconnected")
+                await flush_streams(streams, publishers)
+                break
+            except Exception as e:
+                logger.error(
+                    f"Error processing audio for client {client_id}: {e}")
+                await send_error_response(
+                    websocket,
+                    f"Failed to process audio: {str(e)}"
+                )
+
+    except Exception as e:
+        logger.error(f"Error for client {client_id}: {e}")
+        await websocket.close()
+    finally:
+        hub.unregister(session)
+        await session.close()
+        for stream_id in streams:
+            await publishers[stream_id].end()
+        logger.info(f"Multiplexed client {client_id} cleanup completed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Синтетическая ступенчатая нагрузка для проверки автомасштабирования воркеров.
+
+Кладет чанки прямо в поток аудио с заданной по ступеням скоростью и раз
+в секунду печатает статус воркеров, опубликованный супервизором
+(workers:status): очередь, скорости, оценку времени разбора и число
+процессов супервизора.
+
+Пример (Redis и супервизор с WORKER_AUTOSCALE=1 уже запущены):
+    python tests/load/bench_autoscale_ramp.py --rates 50 200 800 200 0 --step 30
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import redis.asyncio as redis
+
+AUDIO_STREAM = "audio_chunks:stream"
+WORKER_STATUS_KEY = "workers:status"
+
+
+async def produce(client, rates, step: float, chunk: bytes):
+    """Публикует чанки со скоростью rates[i] в течение i-й ступени."""
+    audio = base64.b64encode(chunk).decode("utf-8")
+    seq = 0
+    for rate in rates:
+        deadline = time.monotonic() + step
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            # Пачка на 100 мс, чтобы не упираться в задержку Redis
+            async with client.pipeline(transaction=False) as pipe:
+                for _ in range(int(rate / 10)):
+                    pipe.xadd(AUDIO_STREAM, {"data": json.dumps({
+                        "client_id": "ramp", "seq": seq, "audio": audio})})
+                    seq += 1
+                await pipe.execute()
+            await asyncio.sleep(max(0.0, 0.1 - (time.monotonic() - started)))
+
+
+async def report(client, started: float):
+    """Печатает статус воркеров раз в секунду."""
+    print(f"{'t':>5} {'backlog':>8} {'in/s':>8} {'out/s':>8} "
+          f"{'eta s':>7} {'procs':>6}")
+    while True:
+        value = await client.get(WORKER_STATUS_KEY)
+        if value is not None:
+            status = json.loads(value)
+
+            def number(key):
+                return "-" if status[key] is None else f"{status[key]:.1f}"
+
+            print(f"{time.monotonic() - started:>5.0f} {status['backlog']:>8} "
+                  f"{number('arrival_rate'):>8} "
+                  f"{number('processing_rate'):>8} "
+                  f"{number('drain_eta_s'):>7} "
+                  f"{status.get('supervisor_processes', '-'):>6}")
+        await asyncio.sleep(1)
+
+
+async def run(args):
+    client = redis.from_url(args.redis_url)
+    started = time.monotonic()
+    reporter = asyncio.create_task(report(client, started))
+    try:
+        await produce(client, args.rates, args.step, b"\0" * args.chunk_size)
+        await asyncio.sleep(args.tail)
+    finally:
+        reporter.cancel()
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--rates", type=float, nargs="+",
+                        default=[50, 200, 800, 200, 0],
+                        help="скорость ступеней, чанков в секунду")
+    parser.add_argument("--step", type=float, default=30.0,
+                        help="длительность ступени, секунды")
+    parser.add_argument("--chunk-size", type=int, default=3200)
+    parser.add_argument("--tail", type=float, default=60.0,
+                        help="наблюдение после нагрузки, секунды")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
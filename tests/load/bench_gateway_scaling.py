@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк масштабирования шлюза по числу процессов.
+
+Для каждого числа процессов запускает app/gateway.py (GATEWAY_PROCESSES=N)
+и замеряет две величины:
+  - скорость установки WebSocket-соединений (соединений в секунду);
+  - пропускную способность по чанкам: --connections соединений
+    отправляют чанки и ждут подтверждения, --duration секунд.
+
+Нагрузку создают несколько процессов-клиентов (--client-procs), чтобы
+клиент не упирался в одно ядро раньше шлюза. Лимиты скорости клиентов
+в запущенном шлюзе выключены. Нужен Redis по REDIS_URL.
+
+Пример:
+    python tests/load/bench_gateway_scaling.py --processes 1 2 4 --client-procs 4
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import websockets
+
+APP_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+
+
+def spawn_gateway(processes: int, port: int) -> subprocess.Popen:
+    """Запускает многопроцессный шлюз без лимитов скорости."""
+    return subprocess.Popen(
+        [sys.executable, "gateway.py"],
+        cwd=APP_DIR,
+        env={**os.environ, "GATEWAY_PROCESSES": str(processes),
+             "GATEWAY_HOST": "127.0.0.1", "APP_PORT": str(port),
+             "RATE_LIMIT_TIERS": "{}", "LOOP_MONITOR": "0"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(url: str, attempts: int = 100):
+    """Ждет, пока шлюз начнет принимать соединения."""
+    for _ in range(attempts):
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Gateway at {url} is not reachable")
+
+
+async def connect_many(url: str, count: int, concurrency: int) -> int:
+    """Открывает и закрывает count соединений, возвращает число успешных."""
+    semaphore = asyncio.Semaphore(concurrency)
+    opened = 0
+
+    async def connect_one():
+        nonlocal opened
+        async with semaphore:
+            try:
+                connection = await websockets.connect(url, ping_interval=None)
+            except Exception:
+                return
+            opened += 1
+            await connection.close()
+
+    await asyncio.gather(*(connect_one() for _ in range(count)))
+    return opened
+
+
+async def stream_chunks(url: str, connections: int, duration: float,
+                        chunk: bytes) -> int:
+    """Шлет чанки по connections соединениям, возвращает число подтверждений."""
+    acked = 0
+    deadline = time.monotonic() + duration
+
+    async def stream():
+        nonlocal acked
+        async with websockets.connect(url, ping_interval=None) as connection:
+            while time.monotonic() < deadline:
+                await connection.send(chunk)
+                await connection.recv()
+                acked += 1
+
+    await asyncio.gather(*(stream() for _ in range(connections)),
+                         return_exceptions=True)
+    return acked
+
+
+def run_client(phase: str, url: str, amount: int, concurrency: int,
+               duration: float, chunk_size: int) -> int:
+    """Процесс-клиент: выполняет свою долю нагрузки фазы."""
+    if phase == "connect":
+        return asyncio.run(connect_many(url, amount, concurrency))
+    return asyncio.run(stream_chunks(url, amount, duration, b"\0" * chunk_size))
+
+
+def run_phase(pool, procs: int, phase: str, url: str, amount: int,
+              concurrency: int, duration: float, chunk_size: int):
+    """Делит нагрузку между процессами-клиентами, возвращает (итог, секунды)."""
+    started = time.monotonic()
+    futures = [pool.submit(run_client, phase, url, amount // procs,
+                           max(1, concurrency // procs), duration, chunk_size)
+               for _ in range(procs)]
+    total = sum(future.result() for future in futures)
+    return total, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--client-procs", type=int, default=4)
+    parser.add_argument("--connects", type=int, default=4000,
+                        help="соединений в фазе установки")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=200,
+                        help="соединений в фазе отправки чанков")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--chunk-size", type=int, default=3200)
+    args = parser.parse_args()
+
+    url = f"ws://127.0.0.1:{args.port}/ws"
+    print(f"{'procs':>5} {'conn/s':>9} {'chunks/s':>10} {'MiB/s':>7}")
+    with ProcessPoolExecutor(args.client_procs) as pool:
+        for processes in args.processes:
+            gateway = spawn_gateway(processes, args.port)
+            try:
+                asyncio.run(wait_ready(url))
+                opened, connect_time = run_phase(
+                    pool, args.client_procs, "connect", url, args.connects,
+                    args.concurrency, 0, 0)
+                acked, _ = run_phase(
+                    pool, args.client_procs, "stream", url, args.connections,
+                    0, args.duration, args.chunk_size)
+                rate = acked / args.duration
+                print(f"{processes:>5} {opened / connect_time:>9.0f} "
+                      f"{rate:>10.0f} "
+                      f"{rate * args.chunk_size / 2**20:>7.1f}")
+            finally:
+                gateway.terminate()
+                gateway.wait()
+
+
+if __name__ == "__main__":
+    main()
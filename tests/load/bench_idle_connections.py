@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк памяти шлюза на простаивающих WebSocket-соединениях.
+
+Открывает по очереди 10k/50k/100k соединений без трафика и после каждой
+ступени печатает RSS процесса шлюза и прирост RSS на одно соединение.
+
+Пример (шлюз уже запущен, pid известен):
+    python tests/load/bench_idle_connections.py --pid 12345
+
+Либо шлюз запускается самим бенчмарком (нужен доступный REDIS_URL):
+    python tests/load/bench_idle_connections.py --spawn
+
+Для 100k соединений нужны лимит открытых файлов выше 2x числа соединений
+(ulimit -n) и несколько адресов источника: на один адрес приходится
+не больше ~28k исходящих портов, поэтому соединения распределяются
+по 127.0.0.1..127.0.0.N (--source-ips).
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import websockets
+
+APP_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+
+
+def read_rss(pid: int) -> int:
+    """Возвращает RSS процесса в байтах по /proc/<pid>/status."""
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError(f"No VmRSS for pid {pid}")
+
+
+def raise_nofile_limit():
+    """Поднимает мягкий лимит открытых файлов до жесткого."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def spawn_gateway(port: int) -> subprocess.Popen:
+    """Запускает шлюз uvicorn с настройками docker-compose, без логов."""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--ws-per-message-deflate", "false",
+         "--log-level", "warning", "--no-access-log"],
+        cwd=APP_DIR,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+    )
+
+
+async def wait_ready(url: str, attempts: int = 50):
+    """Ждет, пока шлюз начнет принимать соединения."""
+    for _ in range(attempts):
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Gateway at {url} is not reachable")
+
+
+async def open_idle(url: str, count: int, source_ips: int,
+                    concurrency: int, connections: list):
+    """Дооткрывает соединения до count, распределяя их по адресам источника."""
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def open_one(index: int):
+        nonlocal failures
+        async with semaphore:
+            try:
+                connections.append(await websockets.connect(
+                    url,
+                    local_addr=(f"127.0.0.{index % source_ips + 1}", 0),
+                    ping_interval=None,
+                    open_timeout=30,
+                ))
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(
+        *(open_one(index) for index in range(len(connections), count)))
+    return failures
+
+
+async def run(args):
+    limit = raise_nofile_limit()
+    if limit < max(args.counts) + 100:
+        print(f"warning: RLIMIT_NOFILE={limit} is below the largest step")
+
+    gateway = None
+    pid = args.pid
+    if args.spawn:
+        gateway = spawn_gateway(args.port)
+        pid = gateway.pid
+    url = args.url or f"ws://127.0.0.1:{args.port}/ws"
+
+    connections: list = []
+    try:
+        await wait_ready(url)
+        await asyncio.sleep(args.settle)
+        baseline = read_rss(pid)
+        print(f"baseline RSS: {baseline / 2**20:.1f} MiB")
+        print(f"{'connections':>12} {'failed':>7} {'RSS MiB':>9} "
+              f"{'per conn KiB':>13} {'open s':>7}")
+
+        for count in sorted(args.counts):
+            started = time.monotonic()
+            failures = await open_idle(
+                url, count, args.source_ips, args.concurrency, connections)
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(args.settle)
+            rss = read_rss(pid)
+            per_connection = (rss - baseline) / max(len(connections), 1)
+            print(f"{len(connections):>12} {failures:>7} "
+                  f"{rss / 2**20:>9.1f} {per_connection / 1024:>13.2f} "
+                  f"{elapsed:>7.1f}")
+    finally:
+        await asyncio.gather(
+            *(connection.close() for connection in connections),
+            return_exceptions=True)
+        if gateway is not None:
+            gateway.terminate()
+            gateway.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--pid", type=int, help="pid процесса шлюза")
+    target.add_argument("--spawn", action="store_true",
+                        help="запустить шлюз uvicorn самостоятельно")
+    parser.add_argument("--url", help="адрес /ws (по умолчанию локальный)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--counts", type=int, nargs="+",
+                        default=[10000, 50000, 100000])
+    parser.add_argument("--source-ips", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="пауза перед замером RSS, секунды")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк нормализации аудио в шлюзе: стоимость секунды аудио.
+
+Для каждого объявленного клиентом формата прогоняет --seconds секунд
+аудио через AudioNormalizer чанками разной длительности (как их шлет
+клиент) и печатает время процессора на секунду аудио и запас реального
+времени (сколько потоков выдержит одно ядро). Для сравнения тот же
+формат приводится поотсчетным циклом на чистом Python (--python-baseline).
+
+Пример:
+    python tests/load/bench_normalize.py --seconds 30 --python-baseline
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+)
+
+from normalize import AudioFormat, AudioNormalizer, canonical_format  # type: ignore
+
+FORMATS = (
+    AudioFormat("pcm16", 8000, 1),
+    AudioFormat("pcm16", 16000, 2),
+    AudioFormat("pcm16", 44100, 2),
+    AudioFormat("float32", 48000, 1),
+    AudioFormat("float32", 48000, 2),
+)
+CHUNK_MS = (20, 100, 1000)
+
+
+def generate(source: AudioFormat, seconds: float) -> bytes:
+    """Шумоподобный сигнал формата source длительностью seconds."""
+    rng = np.random.default_rng(0)
+    signal = rng.uniform(-0.5, 0.5, (int(source.sample_rate * seconds),
+                                     source.channels))
+    if source.encoding == "pcm16":
+        return np.rint(signal * 32767).astype("<i2").tobytes()
+    return signal.astype("<f4").tobytes()
+
+
+def run_numpy(source: AudioFormat, target: AudioFormat, data: bytes,
+              chunk_ms: int) -> float:
+    """Время нормализации данных чанками по chunk_ms, в секундах."""
+    normalizer = AudioNormalizer(source, target)
+    chunk = source.sample_rate * chunk_ms // 1000 * source.frame_size
+    chunks = [data[offset:offset + chunk]
+              for offset in range(0, len(data), chunk)]
+    started = time.process_time()
+    for piece in chunks:
+        normalizer.feed(piece)
+    return time.process_time() - started
+
+
+def run_python(source: AudioFormat, target: AudioFormat, data: bytes) -> float:
+    """Время той же нормализации поотсчетным циклом без NumPy, в секундах."""
+    code = "h" if source.encoding == "pcm16" else "f"
+    scale = 32768.0 if source.encoding == "pcm16" else 1.0
+    started = time.process_time()
+    samples = struct.unpack(f"<{len(data) // struct.calcsize(code)}{code}",
+                            data)
+    frames = [sum(samples[index:index + source.channels])
+              / source.channels / scale
+              for index in range(0, len(samples), source.channels)]
+    step = source.sample_rate / target.sample_rate
+    output = []
+    position = 0.0
+    while position < len(frames) - 1:
+        index = int(position)
+        weight = position - index
+        value = frames[index] * (1 - weight) + frames[index + 1] * weight
+        output.append(max(-32768, min(32767, round(value * 32768))))
+        position += step
+    struct.pack(f"<{len(output)}h", *output)
+    return time.process_time() - started
+
+
+def report(label: str, elapsed: float, seconds: float):
+    per_second = elapsed / seconds
+    print(f"  {label:<16} {per_second * 1e6:10.1f} us/s audio   "
+          f"x{1 / per_second if per_second else float('inf'):10.0f} realtime")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10.0,
+                        help="длительность аудио на каждый формат")
+    parser.add_argument("--python-baseline", action="store_true",
+                        help="сравнить с поотсчетным циклом на Python")
+    args = parser.parse_args()
+
+    target = canonical_format()
+    print(f"Target: {target}")
+    for source in FORMATS:
+        print(f"{source}")
+        data = generate(source, args.seconds)
+        for chunk_ms in CHUNK_MS:
+            report(f"numpy {chunk_ms} ms",
+                   run_numpy(source, target, data, chunk_ms), args.seconds)
+        if args.python_baseline:
+            report("python", run_python(source, target, data), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пропускной способности Redis: один узел против Redis Cluster.
+
+Повторяет горячий путь сервиса на уровне Redis:
+  - audio: XADD чанков сессий в потоки шардов (как шлюз с AUDIO_SHARDING=1);
+  - transcripts: публикация транскриптов в каналы по хешу сессии
+    (PUBLISH на одном узле, SPUBLISH в кластере) и их прием подписчиком,
+    который слушает все каналы, как процесс шлюза.
+
+Для каждой фазы печатает операций в секунду на одном узле и в кластере.
+Нагрузку создают несколько процессов-клиентов (--client-procs), чтобы
+клиент не упирался в одно ядро раньше Redis.
+
+Кластер из docker-compose (профиль cluster) объявляет узлы по именам
+сервисов; с хоста они доступны на 127.0.0.1 с теми же портами, поэтому
+адреса узлов переназначаются на --remap-host.
+
+Пример:
+    docker compose --profile cluster up -d redis redis-node-1 redis-node-2 \\
+        redis-node-3 redis-cluster-init
+    python tests/load/bench_redis_cluster.py --client-procs 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import redis.asyncio as redis
+from redis.asyncio.cluster import RedisCluster
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "app"))
+)
+
+from redis_client import ShardedPubSub  # type: ignore
+from sharding import HashRing  # type: ignore
+
+STREAM_PREFIX = "bench:audio:"
+CHANNEL_PREFIX = "bench:transcripts:"
+STREAM_MAXLEN = 10000
+
+
+def connect(url: str, cluster: bool, remap_host: str):
+    """Клиент одного узла или кластера с переназначением адресов узлов."""
+    if not cluster:
+        return redis.from_url(url)
+    return RedisCluster.from_url(
+        url, address_remap=lambda address: (remap_host, address[1]))
+
+
+def channel_for(session: str, channels: int) -> str:
+    """Канал транскриптов сессии (хеш-тег раскладывает каналы по слотам)."""
+    return f"{CHANNEL_PREFIX}{{{zlib.crc32(session.encode()) % channels}}}"
+
+
+async def produce(url: str, cluster: bool, remap_host: str, phase: str,
+                  worker: int, concurrency: int, duration: float,
+                  payload: bytes, shards: int, channels: int) -> int:
+    """Шлет операции фазы concurrency задачами, возвращает их число."""
+    client = connect(url, cluster, remap_host)
+    ring = HashRing([f"shard-{index}" for index in range(shards)])
+    publish = client.spublish if cluster else client.publish
+    done = 0
+    deadline = time.monotonic() + duration
+
+    async def session(index: int):
+        nonlocal done
+        name = f"client-{worker}-{index}"
+        stream = f"{STREAM_PREFIX}{ring.get(name)}"
+        channel = channel_for(name, channels)
+        while time.monotonic() < deadline:
+            if phase == "audio":
+                await client.xadd(stream, {"data": payload},
+                                  maxlen=STREAM_MAXLEN, approximate=True)
+            else:
+                await publish(channel, payload)
+            done += 1
+
+    try:
+        await asyncio.gather(*(session(index) for index in range(concurrency)))
+    finally:
+        await client.close()
+    return done
+
+
+async def receive(url: str, cluster: bool, remap_host: str, channels: int,
+                  duration: float, ready) -> int:
+    """Подписчик всех каналов транскриптов; возвращает число сообщений."""
+    client = connect(url, cluster, remap_host)
+    names = [f"{CHANNEL_PREFIX}{{{index}}}" for index in range(channels)]
+    if cluster:
+        pubsub = ShardedPubSub(client)
+    else:
+        pubsub = client.pubsub()
+    received = 0
+    try:
+        await pubsub.subscribe(*names)
+        ready.set()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=0.1)
+            if message is not None and message["type"] == "message":
+                received += 1
+    finally:
+        await pubsub.close()
+        await client.close()
+    return received
+
+
+def run_producer(*args) -> int:
+    return asyncio.run(produce(*args))
+
+
+def run_receiver(url, cluster, remap_host, channels, duration, ready) -> int:
+    return asyncio.run(receive(url, cluster, remap_host, channels, duration,
+                               ready))
+
+
+async def cleanup(url: str, cluster: bool, remap_host: str, shards: int):
+    client = connect(url, cluster, remap_host)
+    try:
+        for index in range(shards):
+            await client.delete(f"{STREAM_PREFIX}shard-{index}")
+    finally:
+        await client.close()
+
+
+def run_setup(pool, manager, args, url: str, cluster: bool) -> dict:
+    """Прогоняет обе фазы на одном варианте Redis, возвращает оп/с."""
+    payload = b"\0" * args.payload_size
+    common = (url, cluster, args.remap_host)
+    per_proc = max(1, args.concurrency // args.client_procs)
+    results = {}
+
+    futures = [pool.submit(run_producer, *common, "audio", worker, per_proc,
+                           args.duration, payload, args.shards, args.channels)
+               for worker in range(args.client_procs)]
+    results["xadd/s"] = sum(f.result() for f in futures) / args.duration
+
+    ready = manager.Event()
+    receiver = pool.submit(run_receiver, *common, args.channels,
+                           args.duration + 2, ready)
+    ready.wait()
+    futures = [pool.submit(run_producer, *common, "transcripts", worker,
+                           per_proc, args.duration, payload, args.shards,
+                           args.channels)
+               for worker in range(args.client_procs)]
+    results["publish/s"] = sum(f.result() for f in futures) / args.duration
+    results["received/s"] = receiver.result() / args.duration
+
+    asyncio.run(cleanup(*common, args.shards))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--single-url", default="redis://localhost:6379/0")
+    parser.add_argument("--cluster-url", default="redis://localhost:7001/0")
+    parser.add_argument("--remap-host", default="127.0.0.1",
+                        help="адрес, на котором с хоста доступны узлы кластера")
+    parser.add_argument("--client-procs", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=256,
+                        help="одновременных сессий на все процессы")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--payload-size", type=int, default=4300,
+                        help="размер сообщения: чанк 3200 байт в base64 и JSON")
+    parser.add_argument("--shards", type=int, default=8,
+                        help="потоков шардов (воркеров)")
+    parser.add_argument("--channels", type=int, default=16,
+                        help="каналов транскриптов (TRANSCRIPT_CHANNEL_SHARDS)")
+    parser.add_argument("--setups", nargs="+", default=["single", "cluster"],
+                        choices=["single", "cluster"])
+    args = parser.parse_args()
+    urls = {"single": args.single_url, "cluster": args.cluster_url}
+
+    # Процесс-подписчик работает параллельно с процессами-издателями
+    with ProcessPoolExecutor(args.client_procs + 1) as pool:
+        with multiprocessing.Manager() as manager:
+            rows = [(setup, run_setup(
+                pool, manager, args, urls[setup], setup == "cluster"))
+                for setup in args.setups]
+    print(f"{'setup':>8} {'xadd/s':>10} {'publish/s':>10} {'received/s':>11}")
+    for name, results in rows:
+        print(f"{name:>8} {results['xadd/s']:>10.0f} "
+              f"{results['publish/s']:>10.0f} {results['received/s']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
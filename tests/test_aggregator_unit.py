@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import pytest
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from aggregator import AudioAggregator, duration_to_bytes  # type: ignore
+
+
+class TestAudioAggregator:
+    """Тесты для агрегатора аудио-окон."""
+
+    def test_small_chunks_coalesced(self):
+        """Тест склейки мелких чанков в одно окно."""
+        aggregator = AudioAggregator(window_size=8)
+
+        assert aggregator.feed(b"abc") == []
+        assert aggregator.feed(b"def") == []
+        assert aggregator.feed(b"ghij") == [b"abcdefgh"]
+        assert aggregator.pending == 2
+
+    def test_large_chunk_split(self):
+        """Тест нарезки большого чанка на несколько окон."""
+        aggregator = AudioAggregator(window_size=4)
+
+        windows = aggregator.feed(b"0123456789")
+
+        assert windows == [b"0123", b"4567"]
+        assert aggregator.flush() == b"89"
+
+    def test_overlap_carried_to_next_window(self):
+        """Тест переноса перекрытия в начало следующего окна."""
+        aggregator = AudioAggregator(window_size=6, overlap_size=2)
+
+        windows = aggregator.feed(b"abcdefghijkl")
+
+        assert windows == [b"abcdef", b"efghij"]
+        assert aggregator.pending == 2
+        assert aggregator.flush() == b"ijkl"
+
+    def test_flush_without_new_data(self):
+        """Тест сброса, когда в буфере только перекрытие."""
+        aggregator = AudioAggregator(window_size=4, overlap_size=2)
+
+        aggregator.feed(b"abcd")
+
+        assert aggregator.pending == 0
+        assert aggregator.flush() is None
+
+    def test_invalid_overlap(self):
+        """Тест отказа при перекрытии не меньше окна."""
+        with pytest.raises(ValueError):
+            AudioAggregator(window_size=4, overlap_size=4)
+
+    def test_duration_to_bytes(self):
+        """Тест перевода длительности в байты для PCM16 mono 16 кГц."""
+        assert duration_to_bytes(20) == 640
+        assert duration_to_bytes(1000) == 32000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import base64
+import os
+import pytest
+import sys
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from archive import (  # type: ignore
+    INDEX_SUFFIX,
+    SEGMENT_SUFFIX,
+    ArchiveConflictError,
+    AudioArchiver,
+    SegmentReader,
+    list_segments,
+    read_session,
+)
+
+MB = 1024 * 1024
+
+
+def create_archiver(directory, segment_bytes=MB, segment_seconds=3600,
+                    buffer_bytes=MB):
+    return AudioArchiver(str(directory), "host-1", segment_bytes,
+                         segment_seconds, buffer_bytes)
+
+
+def chunk(session, seq, size=100):
+    return f"{session}:{seq}:".encode().ljust(size, b"\0")
+
+
+class TestAudioArchiver:
+    """Тесты для записи аудио сессий в сегменты архива."""
+
+    @pytest.mark.asyncio
+    async def test_random_access_by_index(self, tmp_path):
+        """Тест чтения чанков сессий из сегмента по индексу."""
+        archiver = create_archiver(tmp_path)
+        for seq in range(5):
+            archiver.append("a", seq, chunk("a", seq))
+            archiver.append("b/1", seq, chunk("b/1", seq))
+        await archiver.close()
+
+        [path] = list_segments(str(tmp_path))
+        with SegmentReader(path) as reader:
+            assert sorted(reader.sessions()) == ["a", "b/1"]
+            assert bytes(reader.read("b/1", 3)) == chunk("b/1", 3)
+            assert reader.read("a", 9) is None
+            assert [(seq, bytes(audio)) for seq, audio in reader.chunks("a")] \
+                == [(seq, chunk("a", seq)) for seq in range(5)]
+
+    @pytest.mark.asyncio
+    async def test_buffer_written_in_blocks(self, tmp_path):
+        """Тест записи буфера на диск по заполнении, до закрытия архива."""
+        archiver = create_archiver(tmp_path, buffer_bytes=1000)
+        for seq in range(20):
+            archiver.append("a", seq, chunk("a", seq))
+        segment = archiver.segment
+        archiver._last_write.result(timeout=5)
+
+        assert os.path.getsize(segment + SEGMENT_SUFFIX) >= 1000
+        await archiver.close()
+        assert len(read_session(str(tmp_path), "a")) == 20
+
+    @pytest.mark.asyncio
+    async def test_rotation_by_size_and_age(self, tmp_path):
+        """Тест смены сегментов по размеру и возрасту."""
+        archiver = create_archiver(tmp_path / "size", segment_bytes=1000)
+        for seq in range(30):
+            archiver.append("a", seq, chunk("a", seq))
+        await archiver.close()
+        segments = list_segments(str(tmp_path / "size"))
+
+        assert len(segments) > 3
+        assert all(os.path.getsize(path) <= 1000 for path in segments)
+        assert read_session(str(tmp_path / "size"), "a") == [
+            (seq, chunk("a", seq)) for seq in range(30)]
+
+        archiver = create_archiver(tmp_path / "age", segment_seconds=0)
+        for seq in range(3):
+            archiver.append("a", seq, chunk("a", seq))
+        await archiver.close()
+        assert len(list_segments(str(tmp_path / "age"))) == 3
+
+    @pytest.mark.asyncio
+    async def test_redelivered_chunk_stored_once(self, tmp_path):
+        """Тест, что копии повторно доставленного чанка сводятся к одной."""
+        archiver = create_archiver(tmp_path, segment_seconds=0)
+        archiver.append("a", 0, b"first")
+        archiver.append("a", 0, b"first")
+        archiver.append("a", 1, b"second")
+        await archiver.close()
+
+        assert len(list_segments(str(tmp_path))) == 3
+        assert read_session(str(tmp_path), "a") == [
+            (0, b"first"), (1, b"second")]
+
+    @pytest.mark.asyncio
+    async def test_conflicting_seq_is_error(self, tmp_path):
+        """Тест ошибки для разного аудио под одним seq сессии."""
+        archiver = create_archiver(tmp_path / "one")
+        archiver.append("a", 0, b"first")
+        archiver.append("a", 0, b"other")
+        archiver.append("b", 0, b"first")
+        await archiver.close()
+
+        [path] = list_segments(str(tmp_path / "one"))
+        with SegmentReader(path) as reader:
+            with pytest.raises(ArchiveConflictError):
+                reader.chunks("a")
+            with pytest.raises(ArchiveConflictError):
+                reader.read("a", 0)
+            assert bytes(reader.read("b", 0)) == b"first"
+
+        archiver = create_archiver(tmp_path / "two", segment_seconds=0)
+        archiver.append("a", 0, b"first")
+        archiver.append("a", 0, b"other")
+        await archiver.close()
+        with pytest.raises(ArchiveConflictError):
+            read_session(str(tmp_path / "two"), "a")
+
+    @pytest.mark.asyncio
+    async def test_recovery_without_index_and_torn_tail(self, tmp_path):
+        """Тест чтения сегмента с потерянным индексом и оборванным концом."""
+        archiver = create_archiver(tmp_path)
+        for seq in range(4):
+            archiver.append("a", seq, chunk("a", seq))
+        await archiver.close()
+        [path] = list_segments(str(tmp_path))
+        base = path[:-len(SEGMENT_SUFFIX)]
+
+        # Индекс последнего блока не успел записаться, сегмент оборван
+        with open(base + INDEX_SUFFIX, "r+b") as index:
+            index.truncate(os.path.getsize(base + INDEX_SUFFIX) // 2)
+        with open(path, "r+b") as segment:
+            segment.truncate(os.path.getsize(path) - 10)
+
+        with SegmentReader(path) as reader:
+            assert [seq for seq, _ in reader.chunks("a")] == [0, 1, 2]
+
+        os.remove(base + INDEX_SUFFIX)
+        with SegmentReader(path) as reader:
+            assert bytes(reader.read("a", 2)) == chunk("a", 2)
+            assert reader.read("a", 3) is None
+
+
+class FakePipeline:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, message):
+        pass
+
+    async def execute(self):
+        return []
+
+
+class FakeRedis:
+    def pipeline(self, transaction=True):
+        return FakePipeline()
+
+
+class TestWorkerArchive:
+    """Тесты для архивирования аудио в воркере."""
+
+    @pytest.mark.asyncio
+    async def test_worker_archives_session_chunks(self, tmp_path):
+        """Тест сохранения чанков сессии и потока без повторов."""
+        import workers  # type: ignore
+        with patch("workers.create_transcript_cache", return_value=None), \
+                patch("workers.is_dedup_redis_enabled", return_value=False):
+            context = workers.WorkerContext(FakeRedis())
+            context.archive = create_archiver(tmp_path)
+
+            for payload in ({"client_id": 7, "seq": 0},
+                            {"client_id": 7, "seq": 1},
+                            {"client_id": 7, "seq": 1},
+                            {"client_id": 7, "seq": 0, "stream_id": 2}):
+                audio = chunk(payload["client_id"], payload["seq"])
+                await workers.handle_audio_message(context, {
+                    **payload, "audio": base64.b64encode(audio).decode()})
+            await context.archive.close()
+
+        assert read_session(str(tmp_path), "7") == [
+            (0, chunk(7, 0)), (1, chunk(7, 1))]
+        assert read_session(str(tmp_path), "7/2") == [(0, chunk(7, 0))]
+        [path] = list_segments(str(tmp_path))
+        with SegmentReader(path) as reader:
+            assert len(reader.chunks("7")) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import pytest
+import sys
+import os
+
+from redis.exceptions import ResponseError
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from autoscale import Autoscaler  # type: ignore
+from constants import AUDIO_STREAM, BULK_AUDIO_STREAM  # type: ignore
+from worker_status import (  # type: ignore
+    RateWindow,
+    drain_eta,
+    read_backlog,
+    summarize_backlog,
+)
+
+# Производительность одного воркера в синтетической нагрузке, чанков/с
+WORKER_RATE = 10
+
+
+def ramp(t):
+    """Синтетическая нагрузка: рост 5 -> 100 чанков/с, плато и спад."""
+    if t < 20:
+        return 5
+    if t < 80:
+        return 5 + (t - 20) * 95 / 60
+    if t < 140:
+        return 100
+    if t < 200:
+        return 100 - (t - 140) * 95 / 60
+    return 5
+
+
+def simulate(autoscaler, duration, workers=1):
+    """Прогоняет очередь под нагрузкой ramp, возвращает (t, воркеры, очередь)."""
+    arrivals, completions = RateWindow(5), RateWindow(5)
+    added = completed = backlog = 0.0
+    history = []
+    for t in range(duration):
+        added += ramp(t)
+        backlog += ramp(t)
+        processed = min(backlog, workers * WORKER_RATE)
+        backlog -= processed
+        completed += processed
+        status = summarize_backlog(
+            {"audio": {"length": int(backlog), "lag": int(backlog),
+                       "pending": 0, "consumers": workers}},
+            arrivals.add(t, int(added)),
+            completions.add(t, int(completed)))
+        workers = autoscaler.decide(status, workers, t)
+        history.append((t, workers, backlog))
+    return history
+
+
+class FakePipeline:
+    """Конвейер, возвращающий заранее заданные ответы XINFO."""
+
+    def __init__(self, replies):
+        self.replies = replies
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def xinfo_stream(self, stream):
+        pass
+
+    def xinfo_groups(self, stream):
+        pass
+
+    async def execute(self, raise_on_error=True):
+        return self.replies
+
+
+class FakeRedis:
+    def __init__(self, replies):
+        self.replies = replies
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.replies)
+
+
+class TestWorkerStatus:
+    """Тесты для оценки очереди аудио и скорости ее обработки."""
+
+    def test_rate_window(self):
+        """Тест скорости по окну замеров и сброса счетчика."""
+        window = RateWindow(window=5)
+        assert window.add(0, 0) is None
+        assert window.add(1, 10) == 10
+        for t in range(2, 10):
+            window.add(t, 10 * t)
+        assert window.add(10, 150) == pytest.approx((150 - 50) / 5)
+        assert window.add(11, 3) is None
+
+    def test_drain_eta(self):
+        """Тест оценки времени разбора очереди."""
+        assert drain_eta(0, None, None) == 0.0
+        assert drain_eta(100, 10.0, 30.0) == 5.0
+        assert drain_eta(100, 30.0, 30.0) is None
+        assert drain_eta(100, None, None) is None
+
+    @pytest.mark.asyncio
+    async def test_read_backlog(self):
+        """Тест чтения lag и pending, в том числе для несозданного потока."""
+        redis = FakeRedis([
+            {"length": 50, "entries-added": 120},
+            [{"name": b"transcribers", "consumers": 2, "pending": 4,
+              "entries-read": 100, "lag": None}],
+            ResponseError("no such key"),
+            ResponseError("no such key"),
+        ])
+
+        streams = await read_backlog(redis)
+
+        assert streams[AUDIO_STREAM] == {
+            "length": 50, "lag": 20, "pending": 4, "consumers": 2,
+            "added": 120, "completed": 96,
+        }
+        assert streams[BULK_AUDIO_STREAM]["lag"] == 0
+        status = summarize_backlog(streams, 10.0, 14.0)
+        assert status["backlog"] == 24
+        assert status["drain_eta_s"] == 6.0
+
+
+class TestAutoscaler:
+    """Тесты для автомасштабирования воркеров на синтетической нагрузке."""
+
+    def test_follows_load_ramp(self):
+        """Тест роста до пиковой нагрузки и возврата к минимуму после нее."""
+        autoscaler = Autoscaler(1, 16, target_drain=10, cooldown=30, settle=5)
+        history = simulate(autoscaler, 600)
+
+        peak = max(workers for _, workers, _ in history)
+        assert 100 / WORKER_RATE <= peak <= 12
+        # Очередь разбирается за целевое время на всем протяжении нагрузки
+        assert max(backlog for _, _, backlog in history) < 100 * 10
+        assert history[-1][1] == 1
+        assert history[-1][2] == 0
+
+    def test_respects_bounds_and_cooldown(self):
+        """Тест границ числа процессов и редкого уменьшения."""
+        autoscaler = Autoscaler(2, 6, target_drain=10, cooldown=30, settle=5)
+        history = simulate(autoscaler, 600, workers=2)
+
+        assert all(2 <= workers <= 6 for _, workers, _ in history)
+        assert max(workers for _, workers, _ in history) == 6
+        decreases = [t for (t, workers, _), (_, previous, _) in
+                     zip(history[1:], history) if workers < previous]
+        assert decreases
+        assert all(later - earlier >= 30
+                   for earlier, later in zip(decreases, decreases[1:]))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from bulk import (  # type: ignore
+    BulkJob,
+    iter_chunks,
+    release_bulk_slot,
+    try_acquire_bulk_slot,
+)
+from constants import BULK_AUDIO_STREAM  # type: ignore
+
+
+async def byte_stream(*pieces):
+    """Асинхронный поток байт для тестов."""
+    for piece in pieces:
+        yield piece
+
+
+class FakePubSub:
+    """Подписка, отдающая сообщения из очереди FakeRedis."""
+
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def subscribe(self, *channels):
+        pass
+
+    async def unsubscribe(self, *channels):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class FakeRedis:
+    """Redis, который сразу отвечает транскриптом на пакетный чанк."""
+
+    def __init__(self, copies=1):
+        self.queue = asyncio.Queue()
+        self.published = []
+        # Сколько раз доставляется транскрипт каждого чанка
+        self.copies = copies
+
+    def pubsub(self):
+        return FakePubSub(self.queue)
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        payload = json.loads(fields["data"])
+        self.published.append((stream, payload))
+        transcript = {
+            "client_id": payload["client_id"],
+            "seq": payload["seq"],
+            "text": f"chunk {payload['seq']}"
+        }
+        for _ in range(self.copies):
+            await self.queue.put({"data": json.dumps(transcript).encode()})
+
+
+class FakeWorkerPipeline:
+    """Конвейер воркера, публикующий транскрипты в очередь подписки."""
+
+    def __init__(self, queue):
+        self._queue = queue
+        self._messages = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, message):
+        self._messages.append(message)
+
+    async def execute(self):
+        for message in self._messages:
+            await self._queue.put({"data": message})
+        return []
+
+
+class WorkerRedis(FakeRedis):
+    """Redis, в котором пакетные чанки разбирает воркер."""
+
+    def __init__(self, context_factory):
+        super().__init__()
+        self.context = context_factory(self)
+
+    def pipeline(self, transaction=True):
+        return FakeWorkerPipeline(self.queue)
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        import workers  # type: ignore
+        payload = json.loads(fields["data"])
+        self.published.append((stream, payload))
+        await workers.handle_bulk_message(
+            self.context, payload, asyncio.Semaphore(1))
+
+
+class TestBulkChunking:
+    """Тесты для нарезки потока пакетной транскрипции."""
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_rechunks_stream(self):
+        """Тест нарезки кусков произвольного размера на ровные чанки."""
+        chunks = [
+            chunk async for chunk in iter_chunks(
+                byte_stream(b"ab", b"cdefg", b"h", b"ij"), 3)
+        ]
+
+        assert chunks == [b"abc", b"def", b"ghi", b"j"]
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_empty_stream(self):
+        """Тест пустого тела запроса."""
+        chunks = [chunk async for chunk in iter_chunks(byte_stream(), 3)]
+
+        assert chunks == []
+
+    def test_bulk_slots_limit(self):
+        """Тест ограничения числа одновременных пакетных задач."""
+        acquired = 0
+        while try_acquire_bulk_slot():
+            acquired += 1
+
+        assert acquired > 0
+        for _ in range(acquired):
+            release_bulk_slot()
+        assert try_acquire_bulk_slot() is True
+        release_bulk_slot()
+
+
+class TestBulkJob:
+    """Тесты для пакетной задачи транскрипции."""
+
+    @pytest.mark.asyncio
+    async def test_job_streams_ndjson(self):
+        """Тест выдачи транскриптов всех чанков и итоговой строки."""
+        redis = FakeRedis()
+        job = BulkJob(redis, chunk_size=4, max_inflight=2, result_timeout=5)
+
+        lines = [
+            json.loads(line)
+            async for line in job.run(byte_stream(b"0123456789"))
+        ]
+
+        assert [line["seq"] for line in lines[:-1]] == [0, 1, 2]
+        assert lines[-1] == {
+            "job_id": job.job_id,
+            "status": "completed",
+            "chunks": 3,
+            "size": 10
+        }
+        assert all(stream == BULK_AUDIO_STREAM
+                   for stream, _ in redis.published)
+
+    @pytest.mark.asyncio
+    async def test_redelivered_transcript_counted_once(self):
+        """Тест, что повтор транскрипта не освобождает место второй раз."""
+        redis = FakeRedis(copies=2)
+        job = BulkJob(redis, chunk_size=4, max_inflight=1, result_timeout=5)
+
+        lines = [
+            json.loads(line)
+            async for line in job.run(byte_stream(b"0123456789"))
+        ]
+
+        assert [line["seq"] for line in lines[:-1]] == [0, 1, 2]
+        assert lines[-1]["chunks"] == 3
+        assert job._inflight._value == 1
+
+    @pytest.mark.asyncio
+    async def test_streaming_transcripts_do_not_apply(self):
+        """Тест пакетной задачи при включенных потоковых транскриптах."""
+        import workers  # type: ignore
+        from streaming import StreamingDecoder  # type: ignore
+
+        def create_context(redis):
+            context = workers.WorkerContext(redis)
+            context.streaming = StreamingDecoder(100, 10.0, 10000, 0)
+            return context
+
+        with patch("workers.create_transcript_cache", return_value=None), \
+                patch("workers.is_dedup_redis_enabled", return_value=False):
+            redis = WorkerRedis(create_context)
+            job = BulkJob(redis, chunk_size=4, max_inflight=1,
+                          result_timeout=5)
+            # Итог фразы без seq (например, по простою) не считается
+            # результатом чанка
+            await redis.queue.put({"data": json.dumps({
+                "client_id": job.job_id, "text": "late",
+                "status": "final"}).encode()})
+            lines = [
+                json.loads(line)
+                async for line in job.run(byte_stream(b"0123456789"))
+            ]
+
+        assert [line["seq"] for line in lines[:-1]] == [0, 1, 2]
+        assert all(line["text"].startswith("Transcribed:")
+                   for line in lines[:-1])
+        assert lines[-1]["chunks"] == 3
+        assert len(redis.context.streaming) == 0
+        assert job._inflight._value == 1
+
+
+class TestDuplexStreamingResponse:
+    """Тесты для потокового ответа пакетной транскрипции."""
+
+    @pytest.mark.asyncio
+    async def test_background_runs_after_body(self):
+        """Тест запуска фоновой задачи после отправки тела ответа."""
+        from starlette.background import BackgroundTask
+        from main import DuplexStreamingResponse  # type: ignore
+        events = []
+
+        async def send(message):
+            events.append(message["type"])
+
+        async def receive():
+            raise AssertionError("receive must not be called")
+
+        response = DuplexStreamingResponse(
+            byte_stream(b"a", b"b"),
+            background=BackgroundTask(events.append, "background"))
+        await response({"type": "http"}, receive, send)
+
+        assert events[0] == "http.response.start"
+        assert events[-1] == "background"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from chunkhints import ChunkAdvisor  # type: ignore
+from normalize import AudioFormat  # type: ignore
+from sessions import Session, SessionHub  # type: ignore
+from ws import SessionPublisher  # type: ignore
+
+
+def create_advisor(initial_ms=400):
+    return ChunkAdvisor(min_ms=100, max_ms=2000, initial_ms=initial_ms,
+                        target_latency=0.5)
+
+
+class TestChunkAdvisor:
+    """Тесты для подбора рекомендуемой длительности чанка."""
+
+    def test_follows_worker_latency(self):
+        """Тест роста чанка при высокой задержке и спада при низкой."""
+        advisor = create_advisor()
+
+        advisor.observe(1.0)
+        assert advisor.update()
+        assert advisor.chunk_ms == 600
+
+        # Задержка между половиной цели и целью: рекомендация держится
+        advisor.latency = None
+        advisor.observe(0.4)
+        assert not advisor.update()
+
+        advisor.latency = None
+        advisor.observe(0.1)
+        assert advisor.update()
+        assert advisor.chunk_ms == 480
+
+    def test_bounds_and_missing_samples(self):
+        """Тест границ рекомендации и пересчета без новых замеров."""
+        advisor = create_advisor(initial_ms=1800)
+        advisor.observe(5.0)
+        advisor.update()
+        assert advisor.chunk_ms == 2000
+        assert not advisor.update()
+
+        advisor = create_advisor(initial_ms=110)
+        advisor.observe(0.01)
+        advisor.update()
+        assert advisor.chunk_ms == 100
+
+    def test_growing_queue_grows_chunk(self):
+        """Тест роста чанка, пока очередь воркеров растет."""
+        advisor = create_advisor()
+
+        assert not advisor.update({"backlog": 50, "drain_eta_s": 3.0})
+        assert advisor.update({"backlog": 80, "drain_eta_s": None})
+        assert advisor.chunk_ms == 600
+
+        # Приход заметно опережает обработку: очередь растет и без истории
+        advisor = create_advisor()
+        assert advisor.update({"backlog": 80, "drain_eta_s": None,
+                               "arrival_rate": 30.0,
+                               "processing_rate": 20.0})
+
+    def test_steady_queue_keeps_chunk(self):
+        """Тест равновесия прихода и обработки при непустой очереди."""
+        advisor = create_advisor()
+        status = {"backlog": 8, "drain_eta_s": None,
+                  "arrival_rate": 20.0, "processing_rate": 20.0}
+
+        for _ in range(10):
+            assert not advisor.update(dict(status))
+        # До первого замера скорости обработки
+        assert not advisor.update({"backlog": 8, "drain_eta_s": None,
+                                   "arrival_rate": 20.0,
+                                   "processing_rate": None})
+        assert advisor.chunk_ms == 400
+
+    def test_hint_size(self):
+        """Тест размера чанка в формате клиента с учетом MAX_AUDIO_SIZE."""
+        advisor = create_advisor(initial_ms=250)
+
+        assert advisor.hint() == {"status": "chunk_hint", "chunk_ms": 250,
+                                  "chunk_bytes": 8000, "max_bytes": 1048576}
+        stereo = advisor.hint(AudioFormat("float32", 48000, 2))
+        assert stereo["chunk_bytes"] == 96000
+        assert "chunk_bytes" not in advisor.hint(with_size=False)
+
+        with patch("chunkhints.get_max_audio_size", return_value=4001):
+            capped = advisor.hint()
+        assert (capped["chunk_bytes"], capped["chunk_ms"]) == (4000, 125)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class FakeRedis:
+    def __init__(self, status):
+        self.status = status
+
+    async def get(self, key):
+        return json.dumps(self.status)
+
+
+class TestGatewayChunkHints:
+    """Тесты для замера задержки и рассылки рекомендаций в шлюзе."""
+
+    @pytest.mark.asyncio
+    async def test_transcripts_measure_worker_latency(self):
+        """Тест замера задержки от публикации чанка до его транскрипта."""
+        hub = SessionHub(redis=None)
+        hub.chunk_advisor = create_advisor()
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = SessionPublisher(None, 1, track_latency=True)
+        session.publisher.next_seq = 3
+        session.publisher.sent.extend([(0, 10.0), (1, 10.1), (2, 10.2)])
+        hub.register(session)
+
+        for seq, now in ((1, 10.4), (2, 10.6), (0, 10.7)):
+            hub.route(json.dumps({"client_id": 1, "text": "t",
+                                  "seq": seq}).encode(), now)
+
+        assert hub.chunk_advisor.latency == pytest.approx(0.3 + 0.2 * 0.1)
+        assert not session.publisher.sent
+
+    @pytest.mark.asyncio
+    async def test_changed_hint_sent_to_sessions(self):
+        """Тест рассылки изменившейся рекомендации подключенным клиентам."""
+        hub = SessionHub(FakeRedis({"backlog": 10, "drain_eta_s": None,
+                                    "arrival_rate": 30.0,
+                                    "processing_rate": 20.0}))
+        hub.chunk_advisor = create_advisor()
+        single = Session(FakeWebSocket(), 1)
+        single.publisher = SessionPublisher(None, 1)
+        mux = Session(FakeWebSocket(), 2)
+        mux.publishers = {}
+        hub.register(single)
+        hub.register(mux)
+
+        task = asyncio.create_task(hub._advise_forever(0.01))
+        await asyncio.sleep(0.035)
+        task.cancel()
+
+        hints = [message["chunk_ms"] for message in single.websocket.sent]
+        assert hints[:2] == [600, 900]
+        assert "chunk_bytes" in single.websocket.sent[0]
+        assert "chunk_bytes" not in mux.websocket.sent[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from dedup import DedupIndex, SeqWindow, idempotency_key, session_key  # type: ignore
+from delivery import TranscriptDelivery  # type: ignore
+from sessions import new_session_id  # type: ignore
+
+
+class TestSeqWindow:
+    """Тесты для окна обработанных номеров."""
+
+    def test_add_and_contains(self):
+        """Тест отметки номера и обнаружения повтора."""
+        window = SeqWindow(8)
+
+        assert window.add(3) is True
+        assert 3 in window
+        assert 2 not in window
+        assert window.add(3) is False
+
+    def test_window_slides(self):
+        """Тест сдвига окна: номера старше окна считаются обработанными."""
+        window = SeqWindow(4)
+
+        for seq in range(4):
+            assert window.add(seq)
+        assert window.add(10) is True
+        assert 10 in window
+        assert 5 in window
+        assert 7 not in window
+        assert window.add(8) is True
+
+
+class TestDedupIndex:
+    """Тесты для индекса окон по сессиям."""
+
+    def test_sessions_are_independent(self):
+        """Тест раздельного учета номеров разных сессий."""
+        index = DedupIndex(window_size=16, max_sessions=4)
+
+        assert index.add("a", 0)
+        assert index.add("b", 0)
+        assert index.seen("a", 0)
+        assert not index.seen("a", 1)
+        assert not index.add("b", 0)
+
+    def test_evicts_least_recent_session(self):
+        """Тест вытеснения давно не использованной сессии."""
+        index = DedupIndex(window_size=16, max_sessions=2)
+
+        index.add("a", 0)
+        index.add("b", 0)
+        index.add("a", 1)
+        index.add("c", 0)
+
+        assert index.seen("a", 0)
+        assert not index.seen("b", 0)
+
+    def test_new_connections_start_new_sessions(self):
+        """Тест, что чанки нового соединения не считаются повторами."""
+        index = DedupIndex(window_size=16, max_sessions=16)
+
+        for _ in range(5):
+            payload = {"client_id": new_session_id(), "seq": 0}
+            assert index.add(session_key(payload), payload["seq"])
+
+    def test_idempotency_key(self):
+        """Тест ключа идемпотентности с учетом stream_id."""
+        assert idempotency_key({"client_id": 1, "seq": 5}) == "dedup:1:5"
+        assert idempotency_key(
+            {"client_id": 1, "stream_id": 2, "seq": 5}) == "dedup:1/2:5"
+        assert idempotency_key({"client_id": 1}) is None
+
+
+class TestTranscriptDelivery:
+    """Тесты для доставки транскриптов клиенту."""
+
+    def test_duplicates_suppressed(self):
+        """Тест отбрасывания повторного транскрипта того же seq."""
+        delivery = TranscriptDelivery(reorder=False)
+        response = {"status": "transcript", "seq": 0}
+
+        assert delivery.accept(response, now=0.0) == [response]
+        assert delivery.accept(dict(response), now=0.0) == []
+
+    def test_streams_deduplicated_separately(self):
+        """Тест независимого учета seq для разных stream_id."""
+        delivery = TranscriptDelivery(reorder=False)
+
+        assert delivery.accept({"seq": 0, "stream_id": 1}, now=0.0)
+        assert delivery.accept({"seq": 0, "stream_id": 2}, now=0.0)
+
+    def test_without_seq_always_delivered(self):
+        """Тест доставки транскриптов без seq без дедупликации."""
+        delivery = TranscriptDelivery(reorder=False)
+        response = {"status": "transcript"}
+
+        assert delivery.accept(response, now=0.0) == [response]
+        assert delivery.accept(response, now=0.0) == [response]
+
+    def test_reorder_with_duplicates(self):
+        """Тест упорядочивания, не нарушаемого повторами."""
+        delivery = TranscriptDelivery(reorder=True)
+
+        assert delivery.accept({"seq": 1}, now=0.0) == []
+        assert delivery.accept({"seq": 1}, now=0.0) == []
+        assert delivery.accept({"seq": 0}, now=0.0) == [{"seq": 0}, {"seq": 1}]
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import json
+import pytest
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from audio_queue import (  # type: ignore
+    MAX_DELIVERIES,
+    claim_dead_consumers,
+    heartbeat_key,
+)
+from backoff import Backoff  # type: ignore
+from constants import AUDIO_STREAM  # type: ignore
+
+
+def audio_fields(seq):
+    """Поля записи потока с аудио-сообщением."""
+    return {b"data": json.dumps({"client_id": "c", "seq": seq}).encode()}
+
+
+class FakeStreamRedis:
+    """Группа потребителей одного потока аудио в памяти."""
+
+    def __init__(self):
+        self.heartbeats = set()
+        # id -> поля записи (None — запись вытеснена из потока)
+        self.entries = {}
+        # id -> [владелец, число доставок]
+        self.pending = {}
+        self.consumers = set()
+        self.acked = []
+
+    def deliver(self, consumer, entry_id, fields, times=1):
+        self.consumers.add(consumer)
+        self.entries[entry_id] = fields
+        self.pending[entry_id] = [consumer, times]
+
+    async def exists(self, key):
+        return int(key in self.heartbeats)
+
+    async def xinfo_consumers(self, stream, group):
+        if stream != AUDIO_STREAM:
+            return []
+        return [
+            {"name": name.encode(),
+             "pending": sum(1 for owner, _ in self.pending.values()
+                            if owner == name)}
+            for name in sorted(self.consumers)
+        ]
+
+    async def xgroup_delconsumer(self, stream, group, name):
+        self.consumers.discard(name)
+
+    async def xpending_range(self, stream, group, min, max, count,
+                             consumername=None):
+        return [
+            {"message_id": entry_id, "consumer": owner.encode(),
+             "times_delivered": times}
+            for entry_id, (owner, times) in self.pending.items()
+            if owner == consumername
+        ][:count]
+
+    async def xack(self, stream, group, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+            self.acked.append(entry_id)
+
+    async def xclaim(self, stream, group, consumer, min_idle_time, ids):
+        self.consumers.add(consumer)
+        claimed = []
+        for entry_id in ids:
+            self.pending[entry_id] = [consumer, self.pending[entry_id][1] + 1]
+            claimed.append((entry_id, self.entries[entry_id]))
+        return claimed
+
+
+class TestBackoff:
+    """Тесты для задержки перезапуска воркера."""
+
+    def test_delay_grows_up_to_cap(self):
+        """Тест удвоения задержки до предела с долей случайности."""
+        backoff = Backoff(0.05, 0.4)
+        for expected in (0.05, 0.1, 0.2, 0.4, 0.4):
+            delay = backoff.next_delay()
+            assert expected / 2 <= delay <= expected
+
+    def test_reset_returns_to_base(self):
+        """Тест сброса задержки после устойчивой работы."""
+        backoff = Backoff(0.05, 5.0)
+        for _ in range(5):
+            backoff.next_delay()
+        backoff.reset()
+        assert backoff.next_delay() <= 0.05
+
+
+class TestClaimDeadConsumers:
+    """Тесты для перехвата работы упавших воркеров."""
+
+    @pytest.mark.asyncio
+    async def test_claims_entries_of_dead_worker(self):
+        """Тест перехвата записей воркера без heartbeat."""
+        redis = FakeStreamRedis()
+        redis.deliver("dead", b"1-0", audio_fields(0))
+        redis.deliver("dead", b"2-0", audio_fields(1))
+
+        claimed = await claim_dead_consumers(redis, "me")
+
+        assert claimed == [
+            (AUDIO_STREAM, b"1-0", audio_fields(0)),
+            (AUDIO_STREAM, b"2-0", audio_fields(1)),
+        ]
+        assert all(owner == "me" for owner, _ in redis.pending.values())
+
+    @pytest.mark.asyncio
+    async def test_live_worker_is_not_touched(self):
+        """Тест, что записи воркера с heartbeat остаются у него."""
+        redis = FakeStreamRedis()
+        redis.heartbeats.add(heartbeat_key("alive"))
+        redis.deliver("alive", b"1-0", audio_fields(0))
+        redis.deliver("me", b"2-0", audio_fields(1))
+
+        assert await claim_dead_consumers(redis, "me") == []
+        assert redis.pending[b"1-0"][0] == "alive"
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_without_pending_is_removed(self):
+        """Тест удаления из группы упавшего воркера без записей."""
+        redis = FakeStreamRedis()
+        redis.consumers.add("dead")
+
+        await claim_dead_consumers(redis, "me")
+
+        assert "dead" not in redis.consumers
+
+    @pytest.mark.asyncio
+    async def test_poisoned_and_trimmed_entries_are_acked(self):
+        """Тест подтверждения без обработки неисправимых и вытесненных записей."""
+        redis = FakeStreamRedis()
+        redis.deliver("dead", b"1-0", audio_fields(0), times=MAX_DELIVERIES)
+        redis.deliver("dead", b"2-0", None)
+        redis.deliver("dead", b"3-0", audio_fields(2))
+
+        claimed = await claim_dead_consumers(redis, "me")
+
+        assert claimed == [(AUDIO_STREAM, b"3-0", audio_fields(2))]
+        assert sorted(redis.acked) == [b"1-0", b"2-0"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import pytest
+import socket
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from gateway import listen_socket, select_implementation  # type: ignore
+
+
+class TestGatewayLauncher:
+    """Тесты для запуска многопроцессного шлюза."""
+
+    @pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT"),
+                        reason="SO_REUSEPORT is not supported")
+    def test_reuseport_sockets_share_port(self):
+        """Тест, что процессы шлюза слушают один порт своими сокетами."""
+        first = listen_socket("127.0.0.1", 0, True)
+        port = first.getsockname()[1]
+        second = listen_socket("127.0.0.1", port, True)
+        try:
+            assert second.getsockname()[1] == port
+            assert first.get_inheritable()
+        finally:
+            first.close()
+            second.close()
+
+    def test_port_is_exclusive_without_reuseport(self):
+        """Тест, что без SO_REUSEPORT порт занимает один сокет."""
+        first = listen_socket("127.0.0.1", 0, False)
+        try:
+            with pytest.raises(OSError):
+                listen_socket("127.0.0.1", first.getsockname()[1], False)
+        finally:
+            first.close()
+
+    def test_select_implementation(self):
+        """Тест выбора uvloop/httptools с откатом на стандартные."""
+        assert select_implementation("asyncio", "h11") == "asyncio"
+        assert select_implementation("no_such_module_xyz", "h11") == "h11"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
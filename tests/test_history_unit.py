@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+import asyncio
+import base64
+import json
+import pytest
+import struct
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from history import (  # type: ignore
+    HistoryWriter,
+    check_history_token,
+    history_key,
+    history_token_key,
+    issue_history_token,
+    load_history,
+)
+from streaming import StreamingDecoder  # type: ignore
+
+# 100 мс 16-битного моно-аудио 16 кГц: речь и тишина
+SPEECH = struct.pack("<1600h", *([3000, -3000] * 800))
+SILENCE = bytes(3200)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.commands.append(("xadd", key, fields["data"]))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append(("set", key, (value, nx)))
+
+    def get(self, key):
+        self.commands.append(("get", key, None))
+
+    def publish(self, channel, message):
+        self.redis.published += 1
+
+    async def execute(self):
+        if self.redis.down:
+            raise ConnectionError("Redis is down")
+        self.redis.pipelines += 1
+        results = []
+        for command, key, value in self.commands:
+            if command == "xadd":
+                self.redis.add(key, value)
+            elif command == "expire":
+                self.redis.ttls[key] = value
+            elif command == "set":
+                value, nx = value
+                if not (nx and key in self.redis.values):
+                    self.redis.values[key] = value.encode()
+            else:
+                results.append(self.redis.values.get(key))
+                continue
+            results.append(None)
+        return results
+
+
+class FakeRedis:
+    """Потоки Redis в памяти: XADD через конвейер и XRANGE с курсором."""
+
+    def __init__(self):
+        self.streams = {}
+        self.values = {}
+        self.ttls = {}
+        self.pipelines = 0
+        self.published = 0
+        self.down = False
+        self.closed = False
+        self.last_id = 0
+
+    def add(self, key, data):
+        self.last_id += 1
+        self.streams.setdefault(key, []).append(
+            (f"1000-{self.last_id}".encode(), {b"data": data}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def xrange(self, key, min="-", max="+", count=None):
+        entries = self.streams.get(key, [])
+        if min.startswith("("):
+            after = tuple(int(part) for part in min[1:].split("-"))
+            entries = [entry for entry in entries if tuple(
+                int(part) for part in entry[0].decode().split("-")) > after]
+        return entries[:count]
+
+    async def close(self):
+        self.closed = True
+
+
+def transcript(client_id, seq):
+    return json.dumps({"client_id": client_id, "text": f"t{seq}",
+                       "seq": seq}).encode()
+
+
+class TestHistoryWriter:
+    """Тесты для пакетной записи истории транскриптов."""
+
+    @pytest.mark.asyncio
+    async def test_append_is_batched(self):
+        """Тест, что транскрипты пишутся одним конвейером с продлением срока."""
+        redis = FakeRedis()
+        writer = HistoryWriter(redis, ttl=60, maxlen=100, batch_size=1000)
+        for seq in range(5):
+            writer.append(1, transcript(1, seq))
+            writer.append("s2", transcript("s2", seq))
+
+        assert redis.pipelines == 0
+        await writer.flush()
+
+        assert redis.pipelines == 1
+        assert len(redis.streams[history_key(1)]) == 5
+        assert redis.ttls == {
+            history_key(1): 60, history_key("s2"): 60,
+            history_token_key(1): 60, history_token_key("s2"): 60}
+
+    @pytest.mark.asyncio
+    async def test_full_batch_flushes_early(self):
+        """Тест записи по набору пачки, не дожидаясь интервала."""
+        redis = FakeRedis()
+        writer = HistoryWriter(redis, ttl=60, maxlen=100, batch_size=3)
+        writer.start(interval=60)
+        for seq in range(3):
+            writer.append(1, transcript(1, seq))
+        await asyncio.sleep(0.01)
+
+        assert len(redis.streams[history_key(1)]) == 3
+        writer.append(1, transcript(1, 3))
+        await writer.close()
+        assert len(redis.streams[history_key(1)]) == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried(self):
+        """Тест, что пачка возвращается в очередь при недоступности Redis."""
+        redis = FakeRedis()
+        redis.down = True
+        writer = HistoryWriter(redis, ttl=60, maxlen=100, batch_size=1000)
+        writer.append(1, transcript(1, 0))
+        await writer.flush()
+        writer.append(1, transcript(1, 1))
+
+        assert len(writer) == 2
+        redis.down = False
+        await writer.flush()
+        seqs = [json.loads(fields[b"data"])["seq"]
+                for _, fields in redis.streams[history_key(1)]]
+        assert seqs == [0, 1]
+
+    @pytest.mark.asyncio
+    async def test_requeue_drops_oldest(self):
+        """Тест, что при переполнении очереди вытесняются старые транскрипты."""
+        redis = FakeRedis()
+        redis.down = True
+        with patch("history.MAX_PENDING", 4):
+            writer = HistoryWriter(redis, ttl=60, maxlen=100, batch_size=1000)
+            for seq in range(3):
+                writer.append(1, transcript(1, seq))
+            await writer.flush()
+            for seq in range(3, 6):
+                writer.append(1, transcript(1, seq))
+            await writer.flush()
+
+            redis.down = False
+            await writer.flush()
+        seqs = [json.loads(fields[b"data"])["seq"]
+                for _, fields in redis.streams[history_key(1)]]
+        assert seqs == [2, 3, 4, 5]
+
+
+class TestHistoryApi:
+    """Тесты для постраничного чтения истории."""
+
+    @pytest.mark.asyncio
+    async def test_pages_follow_cursor(self):
+        """Тест обхода истории страницами по курсору."""
+        redis = FakeRedis()
+        for seq in range(5):
+            redis.add(history_key(1), transcript(1, seq))
+
+        page, has_more = await load_history(redis, 1, None, 2)
+        assert [item["seq"] for _, item in page] == [0, 1]
+        assert has_more
+
+        page, has_more = await load_history(redis, 1, page[-1][0], 2)
+        page, has_more = await load_history(redis, 1, page[-1][0], 2)
+        assert [item["seq"] for _, item in page] == [4]
+        assert not has_more
+
+    @pytest.mark.asyncio
+    async def test_endpoint(self):
+        """Тест ответа HTTP-эндпоинта истории сессии."""
+        from fastapi import HTTPException
+        import main  # type: ignore
+        redis = FakeRedis()
+        for seq in range(3):
+            redis.add(history_key(7), transcript(7, seq))
+        token = await issue_history_token(redis, 7)
+
+        async def get_redis_client():
+            return redis
+
+        with patch("main.get_redis_client", get_redis_client), \
+                patch("main.is_transcript_history_enabled", return_value=True):
+            first = await main.get_transcript_history("7", None, 2, token)
+            second = await main.get_transcript_history(
+                "7", first["next_cursor"], 2, token)
+            empty = await main.get_transcript_history(
+                "7", second["next_cursor"], 2, token)
+            for wrong in (None, "guess", await issue_history_token(redis, 8)):
+                with pytest.raises(HTTPException) as error:
+                    await main.get_transcript_history("7", None, 2, wrong)
+                assert error.value.status_code == 403
+
+        assert [item["text"] for item in first["transcripts"]] == ["t0", "t1"]
+        assert first["transcripts"][0]["status"] == "transcript"
+        assert first["has_more"]
+        assert [item["seq"] for item in second["transcripts"]] == [2]
+        assert empty["transcripts"] == []
+        assert empty["next_cursor"] == second["next_cursor"]
+        assert redis.closed
+
+        with patch("main.is_transcript_history_enabled", return_value=False):
+            with pytest.raises(HTTPException):
+                await main.get_transcript_history("7", None, 2, token)
+
+    @pytest.mark.asyncio
+    async def test_token_survives_resume(self):
+        """Тест, что повторное подключение сессии получает тот же токен."""
+        redis = FakeRedis()
+        token = await issue_history_token(redis, "s")
+
+        assert await issue_history_token(redis, "s") == token
+        assert await check_history_token(redis, "s", token)
+        assert not await check_history_token(redis, "other", token)
+
+
+class TestWorkerHistory:
+    """Тесты для записи истории в воркере."""
+
+    @pytest.mark.asyncio
+    async def test_worker_stores_final_transcripts(self):
+        """Тест, что промежуточные транскрипты не попадают в историю."""
+        import workers  # type: ignore
+        redis = FakeRedis()
+        with patch("workers.create_transcript_cache", return_value=None), \
+                patch("workers.is_dedup_redis_enabled", return_value=False):
+            context = workers.WorkerContext(redis)
+            context.history = HistoryWriter(redis, 60, 100, 1000)
+            context.streaming = StreamingDecoder(
+                max_sessions=100, idle_timeout=10.0, max_utterance_ms=1000,
+                silence_level=500)
+
+            for seq, audio in enumerate((SPEECH, SILENCE, SPEECH)):
+                await workers.handle_audio_message(context, {
+                    "client_id": "c1", "seq": seq,
+                    "audio": base64.b64encode(audio).decode("utf-8")})
+            await workers.handle_audio_message(
+                context, {"client_id": "c1", "end": True})
+            context.streaming = None
+            await workers.handle_audio_message(context, {
+                "client_id": "c2", "seq": 0,
+                "audio": base64.b64encode(SPEECH).decode("utf-8")})
+            await context.history.close()
+
+        page, _ = await load_history(redis, "c1", None, 10)
+        assert [(item["status"], item.get("seq")) for _, item in page] == [
+            ("final", 1), ("final", None)]
+        assert redis.published == 5
+        page, _ = await load_history(redis, "c2", None, 10)
+        assert [item["seq"] for _, item in page] == [0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
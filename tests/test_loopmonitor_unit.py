@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import asyncio
+import pytest
+import sys
+import os
+import time
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from loopmonitor import LoopMonitor  # type: ignore
+from metrics import Metrics  # type: ignore
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Отдельный реестр метрик для каждого теста."""
+    registry = Metrics()
+    monkeypatch.setattr("loopmonitor.metrics", registry)
+    return registry
+
+
+def blocking_handler():
+    """Синхронная работа, занимающая цикл событий."""
+    time.sleep(0.3)
+
+
+class TestLoopMonitor:
+    """Тесты для монитора задержки цикла событий."""
+
+    @pytest.mark.asyncio
+    async def test_records_lag_without_blocking(self, registry):
+        """Тест замеров задержки свободного цикла."""
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            monitor.stop()
+
+        histogram = registry.histograms["event_loop_lag_seconds"]
+        assert histogram.count >= 3
+        assert "slow_callbacks" not in registry.events
+
+    @pytest.mark.asyncio
+    async def test_captures_stack_of_slow_callback(self, registry):
+        """Тест снятия стека обработчика, заблокировавшего цикл."""
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            blocking_handler()
+            await asyncio.sleep(0.05)
+        finally:
+            monitor.stop()
+
+        assert registry.counters["slow_callbacks_total"] == 1
+        event, = registry.events["slow_callbacks"]
+        assert event["duration_ms"] >= 200
+        assert any("blocking_handler" in line for line in event["stack"])
+        snapshot = registry.snapshot()
+        assert snapshot["events"]["slow_callbacks"] == [event]
+        assert snapshot["histograms"]["event_loop_lag_seconds"]["count"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from normalize import (  # type: ignore
+    AudioFormat,
+    AudioNormalizer,
+    create_normalizer,
+    parse_audio_format,
+)
+from protocol import ProtocolError  # type: ignore
+
+CANONICAL = AudioFormat("pcm16", 16000, 1)
+
+
+def sine(rate, seconds=1.0, frequency=440.0, amplitude=0.5):
+    t = np.arange(int(rate * seconds)) / rate
+    return amplitude * np.sin(2 * np.pi * frequency * t)
+
+
+def feed_in_chunks(normalizer, data, sizes):
+    """Подает данные чанками заданных размеров по кругу."""
+    output, position, index = [], 0, 0
+    while position < len(data):
+        size = sizes[index % len(sizes)]
+        output.append(normalizer.feed(data[position:position + size]))
+        position += size
+        index += 1
+    return b"".join(output)
+
+
+class TestAudioFormat:
+    """Тесты для разбора объявленного клиентом формата."""
+
+    def test_parse_declared_format(self):
+        """Тест формата из параметров подключения и управляющего сообщения."""
+        assert parse_audio_format({}) is None
+        assert parse_audio_format({"resumable": "1"}) is None
+        assert parse_audio_format(
+            {"encoding": "float32", "sample_rate": "48000", "channels": "2"}
+        ) == AudioFormat("float32", 48000, 2)
+        # Пропущенные поля берутся из формата воркеров
+        assert parse_audio_format({"sample_rate": 8000}) == AudioFormat(
+            "pcm16", 8000, 1)
+
+    @pytest.mark.parametrize("params", [
+        {"encoding": "mp3"},
+        {"sample_rate": "fast"},
+        {"sample_rate": 1000},
+        {"channels": 0},
+        {"channels": True},
+    ])
+    def test_invalid_format_rejected(self, params):
+        """Тест отказа для неподдерживаемого формата."""
+        with pytest.raises(ProtocolError):
+            parse_audio_format(params)
+
+    def test_canonical_format_is_passed_through(self):
+        """Тест, что аудио в формате воркеров не обрабатывается."""
+        assert create_normalizer({}) is None
+        assert create_normalizer({"encoding": "pcm16", "sample_rate": 16000,
+                                  "channels": 1}) is None
+        assert create_normalizer({"channels": 2}) is not None
+
+
+class TestAudioNormalizer:
+    """Тесты для приведения аудио к формату воркеров."""
+
+    def test_float_stereo_downmix_and_resample(self):
+        """Тест float32 стерео 48 кГц в PCM16 моно 16 кГц."""
+        left = sine(48000)
+        stereo = np.stack((left, left * 0.5), axis=1).astype("<f4")
+        normalizer = AudioNormalizer(AudioFormat("float32", 48000, 2),
+                                     CANONICAL)
+
+        output = np.frombuffer(
+            normalizer.feed(stereo.tobytes()) + normalizer.flush(), "<i2")
+
+        expected = sine(16000) * 0.75 * 32768
+        assert abs(len(output) - 16000) <= 1
+        # Края искажает фильтр: поток продолжается крайними фреймами
+        error = np.abs(output - expected[:len(output)])[16:-16]
+        assert np.max(error) <= 2
+
+    @pytest.mark.parametrize("rate", [48000, 44100, 22050])
+    def test_downsample_filters_aliases(self, rate):
+        """Тест подавления тона выше новой частоты Найквиста."""
+        def level(frequency):
+            normalizer = AudioNormalizer(AudioFormat("float32", rate, 1),
+                                         CANONICAL)
+            data = sine(rate, frequency=frequency).astype("<f4").tobytes()
+            output = feed_in_chunks(normalizer, data, [4096, 1000])
+            samples = np.frombuffer(output, "<i2")[100:-100] / 32768
+            return np.sqrt(np.mean(samples ** 2))
+
+        # Тон 1 кГц проходит, тон 10 кГц (без фильтра — наложение на 6 кГц)
+        # подавляется больше чем на 60 дБ
+        assert level(1000) == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+        assert level(10000) < 0.5 * 10 ** (-60 / 20)
+
+    def test_upsample_interpolates(self):
+        """Тест линейной интерполяции при повышении частоты."""
+        normalizer = AudioNormalizer(AudioFormat("pcm16", 8000, 1),
+                                     CANONICAL)
+        output = normalizer.feed(np.array([0, 100, 200], "<i2").tobytes())
+        output += normalizer.feed(np.array([400], "<i2").tobytes())
+
+        assert np.frombuffer(output, "<i2").tolist() == [
+            0, 50, 100, 150, 200, 300]
+        # Отсчет на последнем входном фрейме отдается при завершении
+        assert np.frombuffer(normalizer.flush(), "<i2").tolist() == [400]
+        assert normalizer.flush() == b""
+
+    @pytest.mark.parametrize("source", [
+        AudioFormat("float32", 44100, 2),
+        AudioFormat("pcm16", 48000, 1),
+        AudioFormat("pcm16", 8000, 2),
+    ])
+    def test_chunking_does_not_change_output(self, source):
+        """Тест, что нарезка на чанки (и на середине отсчета) не влияет."""
+        signal = np.repeat(sine(source.sample_rate, 0.2)[:, None],
+                           source.channels, axis=1)
+        if source.encoding == "pcm16":
+            data = np.rint(signal * 32767).astype("<i2").tobytes()
+        else:
+            data = signal.astype("<f4").tobytes()
+
+        whole = AudioNormalizer(source, CANONICAL).feed(data)
+        chunked = feed_in_chunks(AudioNormalizer(source, CANONICAL), data,
+                                 [1, 333, 4097, 7, 2048])
+
+        assert chunked == whole
+        assert len(whole) % 2 == 0
+
+    def test_clipping(self):
+        """Тест насыщения отсчетов вне диапазона [-1, 1]."""
+        normalizer = AudioNormalizer(AudioFormat("float32", 16000, 1),
+                                     CANONICAL)
+        output = normalizer.feed(np.array([1.5, -2.0, 1.0], "<f4").tobytes())
+
+        assert np.frombuffer(output, "<i2").tolist() == [
+            32767, -32768, 32767]
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class FakePublisher:
+    client_id = "c"
+
+    def __init__(self, normalizer):
+        self.normalizer = normalizer
+        self.published = []
+        self.extra = []
+
+    async def publish(self, data, **extra):
+        self.published.append(data)
+        self.extra.append(extra)
+        return len(self.published) - 1
+
+
+class TestGatewayNormalization:
+    """Тесты для нормализации аудио в шлюзе перед публикацией."""
+
+    @pytest.mark.asyncio
+    async def test_publish_normalized_chunks(self):
+        """Тест публикации приведенного аудио и ожидания неполного фрейма."""
+        from ws import publish_or_aggregate  # type: ignore
+        publisher = FakePublisher(create_normalizer({"channels": "2"}))
+        stereo = np.array([[100, 300], [-100, -300]], "<i2").tobytes()
+
+        assert await publish_or_aggregate(publisher, None, stereo[:3]) is None
+        assert await publish_or_aggregate(publisher, None, stereo[3:]) == 0
+
+        assert np.frombuffer(publisher.published[0], "<i2").tolist() == [
+            200, -200]
+
+    @pytest.mark.asyncio
+    async def test_upload_fragments_normalized(self):
+        """Тест нормализации фрагментов загрузки и остатка на ее конце."""
+        from ws import forward_fragment, handle_upload_control  # type: ignore
+        websocket = FakeWebSocket()
+        publisher = FakePublisher(create_normalizer({"sample_rate": "8000"}))
+        data = np.array([0, 100, 200, 400], "<i2").tobytes()
+
+        upload = await handle_upload_control(
+            websocket, publisher, {"type": "begin", "upload_id": "u"}, None)
+        assert upload.normalizer is not publisher.normalizer
+        for seq, fragment in enumerate((data[:3], data[3:])):
+            await handle_upload_control(
+                websocket, publisher,
+                {"type": "continue", "upload_id": "u", "seq": seq}, upload)
+            upload = await forward_fragment(
+                websocket, publisher, upload, fragment)
+        assert await handle_upload_control(
+            websocket, publisher,
+            {"type": "end", "upload_id": "u", "seq": 2}, upload) is None
+
+        audio = b"".join(publisher.published)
+        assert np.frombuffer(audio, "<i2").tolist() == [
+            0, 50, 100, 150, 200, 300, 400]
+        assert [extra.get("fragment_seq") for extra in publisher.extra] == [
+            0, 1, 2]
+        assert publisher.extra[-1]["final"]
+        assert publisher.extra[-1]["size"] == len(data)
+        assert websocket.sent[-1]["size"] == len(data)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import asyncio
+import pytest
+import sys
+import os
+import threading
+import time
+import tracemalloc
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from profiling import ProfileBusyError, StackSampler, run_profile  # type: ignore
+
+retained = []
+
+
+def burn_cpu(seconds):
+    """Занимает цикл событий вычислениями."""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sum(range(1000))
+
+
+def allocate(count):
+    """Выделяет память, которая переживает окно профилирования."""
+    retained.extend(bytearray(1024) for _ in range(count))
+
+
+class TestProfiling:
+    """Тесты для профилирования процесса по запросу."""
+
+    def test_collapsed_format(self):
+        """Тест свернутых стеков: поток, кадры от корня и число сэмплов."""
+        sampler = StackSampler(hz=100)
+        thread = threading.Thread(target=lambda: [sampler.sample()
+                                                  for _ in range(2)])
+        thread.start()
+        thread.join()
+
+        line = sampler.collapsed().splitlines()[0]
+        stack, count = line.rsplit(" ", 1)
+        assert count == "2"
+        assert stack.startswith("MainThread;")
+        assert "test_collapsed_format (test_profiling_unit.py:" in stack
+
+    @pytest.mark.asyncio
+    async def test_profile_finds_hot_spot_and_allocations(self):
+        """Тест, что отчет показывает горячую функцию и источник памяти."""
+        profile = asyncio.create_task(run_profile(0.3, hz=200, top=5))
+        await asyncio.sleep(0.05)
+        burn_cpu(0.2)
+        allocate(1000)
+        report = await profile
+
+        hot = sum(int(line.rsplit(" ", 1)[1])
+                  for line in report["collapsed"].splitlines()
+                  if "burn_cpu" in line)
+        assert hot >= report["samples"] / 4
+        top = report["top_allocations"][0]
+        assert "test_profiling_unit.py" in top["location"]
+        assert top["size_bytes"] >= 1000 * 1024
+        assert not tracemalloc.is_tracing()
+        retained.clear()
+
+    @pytest.mark.asyncio
+    async def test_single_profile_at_a_time(self):
+        """Тест отказа второго профилирования во время первого."""
+        first = asyncio.create_task(run_profile(0.1, hz=50, top=5,
+                                                memory=False))
+        await asyncio.sleep(0)
+        with pytest.raises(ProfileBusyError):
+            await run_profile(0.1, hz=50, top=5)
+        report = await first
+
+        assert report["top_allocations"] is None
+        assert report["samples"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
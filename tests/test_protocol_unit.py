@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import base64
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from fragments import FragmentedUpload  # type: ignore
+from protocol import (  # type: ignore
+    ProtocolError,
+    decode_mux_frame,
+    encode_mux_frame,
+    parse_control_message,
+    require_stream_id,
+)
+
+
+class TestControlMessages:
+    """Тесты для разбора управляющих фреймов."""
+
+    def test_parse_valid_message(self):
+        """Тест разбора корректного управляющего фрейма."""
+        message = parse_control_message('{"type": "begin", "upload_id": "a"}')
+
+        assert message["type"] == "begin"
+        assert message["upload_id"] == "a"
+
+    def test_parse_invalid_json(self):
+        """Тест отказа на невалидном JSON."""
+        with pytest.raises(ProtocolError):
+            parse_control_message("not json")
+
+    def test_parse_without_type(self):
+        """Тест отказа на фрейме без поля type."""
+        with pytest.raises(ProtocolError):
+            parse_control_message('{"upload_id": "a"}')
+
+
+class TestFragmentedUpload:
+    """Тесты для состояния фрагментированной загрузки."""
+
+    def test_fragments_in_order(self):
+        """Тест приема фрагментов по порядку и завершения загрузки."""
+        upload = FragmentedUpload("u1", max_size=100)
+
+        upload.expect(0)
+        assert upload.accept(b"abc") == 0
+        upload.expect(1)
+        assert upload.accept(b"de") == 1
+        upload.finish(2)
+
+        assert upload.size == 5
+
+    def test_out_of_order_seq(self):
+        """Тест отказа на пропущенном номере фрагмента."""
+        upload = FragmentedUpload("u1", max_size=100)
+
+        with pytest.raises(ProtocolError):
+            upload.expect(1)
+
+    def test_fragment_without_continue(self):
+        """Тест отказа на фрагменте без фрейма continue."""
+        upload = FragmentedUpload("u1", max_size=100)
+
+        with pytest.raises(ProtocolError):
+            upload.accept(b"abc")
+
+    def test_upload_size_limit(self):
+        """Тест отказа при превышении лимита загрузки."""
+        upload = FragmentedUpload("u1", max_size=4)
+
+        upload.expect(0)
+        with pytest.raises(ProtocolError):
+            upload.accept(b"abcde")
+
+    def test_finish_with_wrong_count(self):
+        """Тест отказа при несовпадении числа фрагментов в end."""
+        upload = FragmentedUpload("u1", max_size=100)
+
+        upload.expect(0)
+        upload.accept(b"abc")
+
+        with pytest.raises(ProtocolError):
+            upload.finish(3)
+
+    @pytest.mark.asyncio
+    async def test_total_size_from_end_message(self):
+        """Тест итога загрузки, фрагменты которой разобрали разные воркеры."""
+        import workers  # type: ignore
+        with patch("workers.create_transcript_cache", return_value=None):
+            first = workers.WorkerContext(None)
+            second = workers.WorkerContext(None)
+        fragment = {"client_id": "c", "upload_id": "u", "fragment_seq": 0,
+                    "audio": base64.b64encode(b"abc").decode("utf-8")}
+
+        await workers.transcribe_payload(first, fragment)
+        await workers.transcribe_payload(second, {**fragment, "fragment_seq": 1})
+        text = await workers.transcribe_payload(second, {
+            "client_id": "c", "upload_id": "u", "fragment_seq": 2,
+            "final": True, "size": 6, "audio": ""})
+
+        assert "fragments: 2, size: 6 bytes" in text
+
+
+class TestMuxFrames:
+    """Тесты для заголовка мультиплексированных фреймов."""
+
+    def test_roundtrip(self):
+        """Тест кодирования и разбора фрейма с идентификатором потока."""
+        frame = encode_mux_frame(70000, b"audio")
+
+        assert len(frame) == 4 + 5
+        assert decode_mux_frame(frame) == (70000, b"audio")
+
+    def test_short_frame(self):
+        """Тест отказа на фрейме короче заголовка."""
+        with pytest.raises(ProtocolError):
+            decode_mux_frame(b"\x00\x01")
+
+    def test_stream_id_fits_header(self):
+        """Тест отказа на идентификаторе потока вне диапазона uint32."""
+        assert require_stream_id({"stream_id": 2 ** 32 - 1}) == 2 ** 32 - 1
+        for stream_id in (2 ** 32, -1, "7"):
+            with pytest.raises(ProtocolError):
+                require_stream_id({"stream_id": stream_id})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from audio_queue import publish_audio  # type: ignore
+from batcher import PublishBatcher, execute_commands  # type: ignore
+from constants import AUDIO_STREAM  # type: ignore
+from metrics import metrics  # type: ignore
+
+
+class FakePipeline:
+    """Конвейер, записывающий команды; ошибка — для каналов из failing."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def publish(self, channel, message):
+        self.commands.append((channel, message))
+        return self
+
+    def xadd(self, stream, fields, maxlen=None, approximate=True):
+        self.commands.append((stream, fields["data"]))
+        return self
+
+    async def execute(self, raise_on_error=True):
+        await asyncio.sleep(self.redis.rtt)
+        if self.redis.down:
+            raise ConnectionError("Redis is down")
+        self.redis.batches.append(self.commands)
+        return [ValueError(f"{channel} failed")
+                if channel in self.redis.failing else 1
+                for channel, _ in self.commands]
+
+
+class FakeRedis:
+    def __init__(self, rtt=0.0):
+        self.rtt = rtt
+        self.down = False
+        self.failing = set()
+        self.batches = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+def publish(batcher, channel, message):
+    return batcher.submit(lambda pipe: pipe.publish(channel, message))
+
+
+class TestPublishBatcher:
+    """Тесты для пакетной публикации в общих конвейерах."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_publishes_share_pipeline(self):
+        """Тест, что одновременные публикации уходят одним конвейером."""
+        redis = FakeRedis()
+        batcher = PublishBatcher(redis, max_batch=100, linger=0.01)
+
+        results = await asyncio.gather(
+            *(publish(batcher, "c", index) for index in range(10)))
+
+        assert results == [[1]] * 10
+        assert len(redis.batches) == 1
+        assert [message for _, message in redis.batches[0]] == list(range(10))
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_max_batch_size(self):
+        """Тест, что конвейер не превышает max_batch публикаций."""
+        redis = FakeRedis()
+        batcher = PublishBatcher(redis, max_batch=4, linger=1.0)
+
+        await asyncio.wait_for(asyncio.gather(
+            *(publish(batcher, "c", index) for index in range(10))), 0.5)
+
+        assert [len(batch) for batch in redis.batches] == [4, 4, 2]
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_session_order_across_batches(self):
+        """Тест сохранения порядка сообщений сессии между конвейерами."""
+        redis = FakeRedis(rtt=0.002)
+        batcher = PublishBatcher(redis, max_batch=3, linger=0.0)
+
+        async def session(name):
+            for seq in range(20):
+                await publish(batcher, name, seq)
+
+        await asyncio.gather(*(session(f"s{index}") for index in range(5)))
+
+        sent = [command for batch in redis.batches for command in batch]
+        for index in range(5):
+            assert [seq for name, seq in sent
+                    if name == f"s{index}"] == list(range(20))
+        # Пока конвейер в пути, сообщения сессий копятся в следующий
+        assert len(redis.batches) < 100
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_their_publishers(self):
+        """Тест, что ошибка команды достается только ее публикации."""
+        redis = FakeRedis()
+        redis.failing.add("bad")
+        batcher = PublishBatcher(redis, max_batch=10, linger=0.01)
+
+        results = await asyncio.gather(
+            publish(batcher, "good", 1), publish(batcher, "bad", 2),
+            return_exceptions=True)
+
+        assert results[0] == [1]
+        assert isinstance(results[1], ValueError)
+
+        redis.down = True
+        with pytest.raises(ConnectionError):
+            await publish(batcher, "good", 3)
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_metrics(self):
+        """Тест учета размеров конвейеров в гистограмме."""
+        metrics.histograms.pop("publish_batch_size", None)
+        batcher = PublishBatcher(FakeRedis(), max_batch=100, linger=0.01)
+
+        await asyncio.gather(*(publish(batcher, "c", index) for index in range(8)))
+
+        histogram = metrics.histograms["publish_batch_size"]
+        assert histogram.count == 1
+        assert histogram.total == 8
+        await batcher.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_pending(self):
+        """Тест отправки накопленных публикаций при закрытии."""
+        redis = FakeRedis()
+        batcher = PublishBatcher(redis, max_batch=100, linger=10.0)
+        pending = asyncio.ensure_future(publish(batcher, "c", 1))
+        await asyncio.sleep(0)
+
+        await asyncio.wait_for(batcher.close(), 0.5)
+
+        assert await pending == [1]
+        assert redis.batches == [[("c", 1)]]
+
+    @pytest.mark.asyncio
+    async def test_publish_audio_through_batcher(self):
+        """Тест отправки аудио и команд воркера через общий конвейер."""
+        redis = FakeRedis()
+        batcher = PublishBatcher(redis, max_batch=100, linger=0.01)
+        message = json.dumps({"client_id": "a", "seq": 0})
+
+        with patch("audio_queue.is_audio_stream_enabled", return_value=True):
+            await asyncio.gather(
+                publish_audio(redis, message, key="a", batcher=batcher),
+                execute_commands(
+                    redis, batcher, lambda pipe: pipe.publish("t", "x")))
+        await execute_commands(redis, None, lambda pipe: pipe.publish("t", "y"))
+
+        assert redis.batches == [[(AUDIO_STREAM, message), ("t", "x")],
+                                 [("t", "y")]]
+        await batcher.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
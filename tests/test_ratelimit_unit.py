@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+import ratelimit  # type: ignore
+from ratelimit import (  # type: ignore
+    ClientLimiter,
+    RateLimit,
+    TokenBucket,
+    create_client_limiter,
+)
+
+TIERS = {
+    "default": {"session": {"chunks_per_s": 2}},
+    "pro": {
+        "session": {"chunks_per_s": 100, "bytes_per_s": 0},
+        "key": {"chunks_per_s": 3},
+    },
+}
+
+
+class FakeWebSocket:
+    """Заголовки и параметры запроса WebSocket-соединения."""
+
+    def __init__(self, headers=None, query_params=None):
+        self.headers = headers or {}
+        self.query_params = query_params or {}
+
+
+@pytest.fixture(autouse=True)
+def tiers():
+    """Тарифы теста и чистые корзины API-ключей."""
+    ratelimit._key_limits.clear()
+    with patch("ratelimit.get_rate_limit_tiers", return_value=TIERS), \
+            patch("ratelimit.get_api_key_tiers", return_value={"k1": "pro"}), \
+            patch("ratelimit.get_rate_limit_burst", return_value=1.0), \
+            patch("ratelimit.is_rate_limit_redis_enabled", return_value=False):
+        yield
+
+
+class TestTokenBucket:
+    """Тесты для корзины токенов."""
+
+    def test_refill_and_wait_time(self):
+        """Тест пополнения корзины и расчета ожидания."""
+        bucket = TokenBucket(rate=10, capacity=5, now=0.0)
+        bucket.tokens = 0
+
+        assert bucket.wait_time(1, 0.0) == pytest.approx(0.1)
+        assert bucket.wait_time(1, 0.1) == 0.0
+        assert bucket.wait_time(1, 100.0) == 0.0
+        assert bucket.tokens == 5
+
+    def test_rejected_chunk_consumes_nothing(self):
+        """Тест, что чанк сверх лимита байт не тратит лимит чанков."""
+        with patch("ratelimit.get_max_audio_size", return_value=100):
+            limit = RateLimit(chunks_per_s=10, bytes_per_s=100, burst=1,
+                              now=0.0)
+        assert limit.wait_time(100, 0.0) == 0.0
+        limit.consume(100)
+
+        assert limit.wait_time(50, 0.0) == pytest.approx(0.5)
+        assert limit.chunks.tokens == 9
+
+    def test_capacity_fits_max_chunk(self):
+        """Тест, что крупнейший допустимый чанк проходит при малом лимите."""
+        with patch("ratelimit.get_max_audio_size", return_value=1000):
+            limit = RateLimit(0, bytes_per_s=10, burst=1, now=0.0)
+        assert limit.chunks is None
+        assert limit.wait_time(1000, 0.0) == 0.0
+
+
+class TestClientLimiter:
+    """Тесты для лимитов соединения по тарифам."""
+
+    @pytest.mark.asyncio
+    async def test_session_limit(self):
+        """Тест лимита сессии тарифа по умолчанию."""
+        limiter = create_client_limiter(FakeWebSocket(), None, 0.0)
+
+        assert await limiter.acquire(10, 0.0) == 0.0
+        assert await limiter.acquire(10, 0.0) == 0.0
+        assert await limiter.acquire(10, 0.0) == pytest.approx(0.5)
+        assert await limiter.acquire(10, 0.5) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_mux_streams_limited_separately(self):
+        """Тест отдельного лимита сессии для каждого потока /ws/mux."""
+        limiter = create_client_limiter(FakeWebSocket(), None, 0.0)
+
+        for stream_id in range(5):
+            assert await limiter.acquire(10, 0.0, stream_id) == 0.0
+            assert await limiter.acquire(10, 0.0, stream_id) == 0.0
+        assert await limiter.acquire(10, 0.0, 3) == pytest.approx(0.5)
+        # Лимит соединения без потоков не тронут
+        assert await limiter.acquire(10, 0.0) == 0.0
+
+    def test_no_limits_by_default(self):
+        """Тест, что без RATE_LIMIT_TIERS соединения не ограничиваются."""
+        from constants import DEFAULT_RATE_LIMIT_TIERS  # type: ignore
+        with patch("ratelimit.get_rate_limit_tiers",
+                   return_value=DEFAULT_RATE_LIMIT_TIERS):
+            limiter = create_client_limiter(FakeWebSocket(), None, 0.0)
+
+        assert limiter.session is None
+        assert limiter.api_key is None
+
+    @pytest.mark.asyncio
+    async def test_key_limit_is_shared_between_connections(self):
+        """Тест общей корзины API-ключа для нескольких соединений."""
+        first = create_client_limiter(
+            FakeWebSocket(headers={"x-api-key": "k1"}), None, 0.0)
+        second = create_client_limiter(
+            FakeWebSocket(query_params={"api_key": "k1"}), None, 0.0)
+
+        results = [await limiter.acquire(10, 0.0)
+                   for limiter in (first, second, first, second)]
+
+        assert results[:3] == [0.0, 0.0, 0.0]
+        assert results[3] > 0
+        assert first.tier == "pro"
+
+    @pytest.mark.asyncio
+    async def test_unknown_key_gets_default_tier(self):
+        """Тест, что неизвестный ключ не получает собственной квоты."""
+        limiter = create_client_limiter(
+            FakeWebSocket(headers={"x-api-key": "bogus"}), None, 0.0)
+
+        assert limiter.tier == "default"
+        assert limiter.api_key is None
+        assert "bogus" not in ratelimit._key_limits
+
+    @pytest.mark.asyncio
+    async def test_unlimited_tier(self):
+        """Тест тарифа без лимитов."""
+        limiter = ClientLimiter("missing", None, 0.0)
+        with patch("ratelimit.get_rate_limit_default_tier",
+                   return_value="none"):
+            unlimited = ClientLimiter("missing", None, 0.0)
+
+        assert limiter.session is not None
+        assert unlimited.session is None
+        assert await unlimited.acquire(10 ** 6, 0.0) == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+import asyncio
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from redis.crc import key_slot
+from redis_client import (  # type: ignore
+    ShardedPubSub,
+    group_by_slot,
+    publish_message,
+    transcript_channel,
+    transcript_channels,
+)
+
+
+def cluster_mode(enabled=True):
+    return patch("redis_client.is_redis_cluster_enabled", return_value=enabled)
+
+
+class FakeNode:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeNodePubSub:
+    """Подписка узла: подтверждения SSUBSCRIBE и сообщения из очереди."""
+
+    def __init__(self):
+        self.channels = []
+        self.queue = asyncio.Queue()
+        self.closed = False
+
+    async def ssubscribe(self, channel):
+        self.channels.append(channel)
+        self.queue.put_nowait({"type": "ssubscribe", "channel": channel,
+                               "data": len(self.channels)})
+
+    async def sunsubscribe(self, channel):
+        self.channels.remove(channel)
+
+    async def listen(self):
+        while True:
+            item = await self.queue.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeNodeClient:
+    async def close(self):
+        pass
+
+
+class FakeCluster:
+    """Кластер из двух узлов: канал принадлежит узлу по четности слота."""
+
+    async def initialize(self):
+        return self
+
+    def get_node_from_key(self, key):
+        return FakeNode(f"node-{key_slot(key.encode()) % 2}")
+
+
+class FakeShardedPubSub(ShardedPubSub):
+    def _connect(self, node):
+        return FakeNodeClient(), FakeNodePubSub()
+
+    def node(self, name):
+        return self._nodes[name][1]
+
+
+class TestClusterRouting:
+    """Тесты для каналов и ключей в режиме Redis Cluster."""
+
+    def test_single_node_uses_one_channel(self):
+        """Тест, что без кластера остается один канал транскриптов."""
+        with cluster_mode(False):
+            assert transcript_channel(123) == "transcripts"
+            assert transcript_channels() == ["transcripts"]
+            assert group_by_slot(["a", "b"]) == [["a", "b"]]
+
+    def test_transcript_channels_spread_over_slots(self):
+        """Тест деления транскриптов по хешу сессии на каналы разных слотов."""
+        with cluster_mode(), \
+                patch("redis_client.get_transcript_channel_shards",
+                      return_value=16):
+            channels = transcript_channels()
+            used = {transcript_channel(client_id) for client_id in range(1000)}
+
+            assert transcript_channel(42) == transcript_channel("42")
+        assert used == set(channels)
+        assert len({key_slot(channel.encode()) for channel in channels}) == 16
+
+    def test_streams_grouped_by_slot(self):
+        """Тест разбиения потоков на группы одного слота для XREADGROUP."""
+        keys = ["audio:{a}:1", "audio:{a}:2", "audio:{b}:1"]
+        with cluster_mode():
+            groups = group_by_slot(keys)
+
+        assert sorted(groups) == [["audio:{a}:1", "audio:{a}:2"],
+                                  ["audio:{b}:1"]]
+
+    def test_publish_uses_sharded_command(self):
+        """Тест выбора SPUBLISH в кластере и PUBLISH на одном узле."""
+        client = MagicMock()
+        with cluster_mode():
+            publish_message(client, "transcripts:{1}", b"m")
+        with cluster_mode(False):
+            publish_message(client, "transcripts", b"m")
+
+        client.spublish.assert_called_once_with("transcripts:{1}", b"m")
+        client.publish.assert_called_once_with("transcripts", b"m")
+
+
+class TestShardedPubSub:
+    """Тесты для подписки на шардированные каналы нескольких узлов."""
+
+    @pytest.mark.asyncio
+    async def test_messages_from_all_nodes(self):
+        """Тест слияния сообщений узлов без подтверждений подписки."""
+        channels = [f"transcripts:{{{shard}}}" for shard in range(8)]
+        pubsub = FakeShardedPubSub(FakeCluster())
+        await pubsub.subscribe(*channels)
+
+        assert sorted(pubsub._nodes) == ["node-0", "node-1"]
+        assert sorted(pubsub.node("node-0").channels
+                      + pubsub.node("node-1").channels) == sorted(channels)
+
+        for name in ("node-0", "node-1"):
+            pubsub.node(name).queue.put_nowait(
+                {"type": "smessage", "channel": name.encode(), "data": b"t"})
+        messages = [await pubsub.get_message(timeout=1.0) for _ in range(2)]
+
+        assert {message["channel"] for message in messages} == {
+            b"node-0", b"node-1"}
+        assert all(message["type"] == "message" for message in messages)
+        assert await pubsub.get_message(timeout=0.01) is None
+        await pubsub.close()
+
+    @pytest.mark.asyncio
+    async def test_node_error_reaches_reader(self):
+        """Тест, что обрыв подписки узла поднимается у читателя."""
+        pubsub = FakeShardedPubSub(FakeCluster())
+        await pubsub.subscribe("transcripts:{0}")
+        node = next(iter(pubsub._nodes))
+        pubsub.node(node).queue.put_nowait(ConnectionError("node down"))
+
+        with pytest.raises(ConnectionError):
+            await pubsub.get_message(timeout=1.0)
+
+        await pubsub.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import pytest
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from reorder import ReorderBuffer  # type: ignore
+
+
+class TestReorderBuffer:
+    """Тесты для буфера упорядочивания транскриптов."""
+
+    def test_in_order_passthrough(self):
+        """Тест выдачи элементов, пришедших по порядку."""
+        buffer = ReorderBuffer(max_size=4, timeout=1.0)
+
+        assert buffer.push(0, "a", now=0.0) == ["a"]
+        assert buffer.push(1, "b", now=0.0) == ["b"]
+        assert buffer.next_deadline() is None
+
+    def test_out_of_order_reordered(self):
+        """Тест удержания элементов до прихода пропущенного номера."""
+        buffer = ReorderBuffer(max_size=4, timeout=1.0)
+
+        assert buffer.push(1, "b", now=0.0) == []
+        assert buffer.push(2, "c", now=0.1) == []
+        assert buffer.push(0, "a", now=0.2) == ["a", "b", "c"]
+        assert len(buffer) == 0
+
+    def test_gap_released_after_timeout(self):
+        """Тест выдачи после таймаута ожидания пропущенного номера."""
+        buffer = ReorderBuffer(max_size=4, timeout=1.0)
+
+        buffer.push(1, "b", now=0.0)
+
+        assert buffer.expire(now=0.5) == []
+        assert buffer.next_deadline() == 1.0
+        assert buffer.expire(now=1.0) == ["b"]
+
+    def test_late_item_delivered_immediately(self):
+        """Тест выдачи опоздавшего элемента после пропуска его номера."""
+        buffer = ReorderBuffer(max_size=4, timeout=1.0)
+
+        buffer.push(1, "b", now=0.0)
+        buffer.expire(now=2.0)
+
+        assert buffer.push(0, "a", now=2.1) == ["a"]
+
+    def test_overflow_skips_gap(self):
+        """Тест выдачи при переполнении буфера."""
+        buffer = ReorderBuffer(max_size=2, timeout=10.0)
+
+        buffer.push(1, "b", now=0.0)
+        buffer.push(2, "c", now=0.0)
+
+        assert buffer.push(3, "d", now=0.0) == ["b", "c", "d"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import pytest
+from unittest.mock import MagicMock
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from resume import ResumeState, append_replay, replay_key  # type: ignore
+
+
+class TestResumeState:
+    """Тесты для состояния возобновляемой сессии."""
+
+    def test_missed_transcripts_after_ack(self):
+        """Тест выбора неподтвержденных транскриптов для повтора."""
+        state = ResumeState(
+            session_id="s1",
+            resume_token="t1",
+            last_acked_seq=1,
+            replay=[{"seq": 0}, {"seq": 1}, {"seq": 2}, {"seq": 3}]
+        )
+
+        assert state.missed_transcripts() == [{"seq": 2}, {"seq": 3}]
+        assert state.last_processed_seq == 3
+
+    def test_empty_replay(self):
+        """Тест сессии без обработанных чанков."""
+        state = ResumeState(session_id="s1", resume_token="t1")
+
+        assert state.missed_transcripts() == []
+        assert state.last_processed_seq == -1
+
+    def test_append_replay_bounded(self):
+        """Тест добавления транскрипта в ограниченный буфер повтора."""
+        pipe = MagicMock()
+
+        append_replay(pipe, "s1", b"{}")
+
+        pipe.rpush.assert_called_once_with(replay_key("s1"), b"{}")
+        start, end = pipe.ltrim.call_args.args[1:]
+        assert start < 0 and end == -1
+        pipe.expire.assert_called_once()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from delivery import TranscriptDelivery  # type: ignore
+from sessions import Session, SessionHub, new_session_id  # type: ignore
+from timerwheel import TimerWheel  # type: ignore
+
+
+class FakeWebSocket:
+    """Минимальная замена WebSocket, запоминающая отправленные сообщения."""
+
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+def transcript(client_id, seq, text="hello"):
+    return json.dumps(
+        {"client_id": client_id, "text": text, "seq": seq}).encode("utf-8")
+
+
+class TestSessionHub:
+    """Тесты для раздачи транскриптов сессиям общей подпиской."""
+
+    @pytest.mark.asyncio
+    async def test_routes_by_client_id(self):
+        """Тест доставки транскрипта только сессии-получателю."""
+        hub = SessionHub(redis=None)
+        first = Session(FakeWebSocket(), 1)
+        second = Session(FakeWebSocket(), 2)
+        hub.register(first)
+        hub.register(second)
+
+        hub.route(transcript(2, 0), now=0.0)
+        await asyncio.sleep(0)
+
+        assert first.websocket.sent == []
+        assert second.websocket.sent == [{
+            "client_id": 2, "text": "hello", "status": "transcript", "seq": 0
+        }]
+
+    @pytest.mark.asyncio
+    async def test_processes_share_channel(self):
+        """Тест, что процессы шлюза на общем канале не путают сессии."""
+        hubs = [SessionHub(redis=None) for _ in range(4)]
+        sessions = [Session(FakeWebSocket(), new_session_id()) for _ in hubs]
+        for hub, session in zip(hubs, sessions):
+            hub.register(session)
+
+        # Каждый процесс получает все транскрипты общего канала
+        for hub in hubs:
+            for session in sessions:
+                hub.route(transcript(session.client_id, 0), now=0.0)
+        await asyncio.sleep(0)
+
+        for session in sessions:
+            assert [item["client_id"] for item in session.websocket.sent] \
+                == [session.client_id]
+
+    @pytest.mark.asyncio
+    async def test_unknown_and_invalid_ignored(self):
+        """Тест пропуска транскриптов чужих сессий и невалидных данных."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        hub.register(session)
+
+        hub.route(transcript(99, 0), now=0.0)
+        hub.route(b"", now=0.0)
+        hub.route(b"not json", now=0.0)
+        await asyncio.sleep(0)
+
+        assert session.websocket.sent == []
+        assert len(hub) == 1
+
+    @pytest.mark.asyncio
+    async def test_unregister(self):
+        """Тест прекращения доставки после отключения сессии."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        hub.register(session)
+        hub.unregister(session)
+
+        hub.route(transcript(1, 0), now=0.0)
+        await asyncio.sleep(0)
+
+        assert session.websocket.sent == []
+        assert len(hub) == 0
+
+    @pytest.mark.asyncio
+    async def test_reorder_timeout_tracked(self):
+        """Тест выдачи удержанного транскрипта по таймауту пропуска."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        session._delivery = TranscriptDelivery(reorder=True)
+        hub.register(session)
+
+        hub.route(transcript(1, 1), now=0.0)
+        assert hub.next_wait(0.0) is not None
+
+        hub.expire(now=100.0)
+        await asyncio.sleep(0)
+
+        assert [item["seq"] for item in session.websocket.sent] == [1]
+        assert hub.next_wait(100.0) is None
+
+    @pytest.mark.asyncio
+    async def test_resumed_session_reorders_from_start_seq(self):
+        """Тест, что возобновленная сессия не ждет транскриптов с seq 0."""
+        from ws import SessionPublisher  # type: ignore
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), "s")
+        session.publisher = SessionPublisher(None, "s", start_seq=5)
+        hub.register(session)
+
+        with patch("sessions.is_transcript_reorder_enabled",
+                   return_value=True):
+            hub.route(transcript("s", 6), now=0.0)
+            hub.route(transcript("s", 5), now=0.0)
+            # Опоздавший транскрипт чанка до отключения отдается сразу
+            hub.route(transcript("s", 3), now=0.0)
+        await asyncio.sleep(0)
+
+        assert [item["seq"] for item in session.websocket.sent] == [5, 6, 3]
+        assert hub.next_wait(0.0) is None
+
+
+class TestSession:
+    """Тесты для очереди отправки сессии."""
+
+    @pytest.mark.asyncio
+    async def test_send_preserves_order(self):
+        """Тест отправки сообщений в порядке постановки в очередь."""
+        session = Session(FakeWebSocket(), 1)
+
+        session.send([{"n": 0}, {"n": 1}])
+        session.send([{"n": 2}])
+        await asyncio.sleep(0)
+
+        assert session.websocket.sent == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+    @pytest.mark.asyncio
+    async def test_writer_released_when_idle(self):
+        """Тест завершения задачи отправки после опустошения очереди."""
+        session = Session(FakeWebSocket(), 1)
+
+        session.send([{"n": 0}])
+        await asyncio.sleep(0)
+        await session.close()
+
+        assert session._writer is None
+        assert not hasattr(session, "__dict__")
+
+
+class TestTimerWheel:
+    """Тесты для колеса таймеров."""
+
+    def test_expires_in_deadline_order(self):
+        """Тест выдачи элементов только после их срока."""
+        wheel = TimerWheel(tick=1.0, size=8, now=0.0)
+        wheel.schedule("a", 2.0)
+        wheel.schedule("b", 5.0)
+
+        assert wheel.advance(1.5) == []
+        assert wheel.advance(2.0) == ["a"]
+        assert wheel.advance(10.0) == ["b"]
+        assert len(wheel) == 0
+
+    def test_deadline_beyond_rotation(self):
+        """Тест срока дальше одного оборота колеса."""
+        wheel = TimerWheel(tick=1.0, size=4, now=0.0)
+        wheel.schedule("late", 9.0)
+
+        assert wheel.advance(5.0) == []
+        assert wheel.advance(8.5) == []
+        assert wheel.advance(9.0) == ["late"]
+
+    def test_past_deadline_fires_next_tick(self):
+        """Тест срока в прошлом: элемент выдается на следующем тике."""
+        wheel = TimerWheel(tick=1.0, size=4, now=3.0)
+        wheel.schedule("now", 1.0)
+
+        assert wheel.advance(4.0) == ["now"]
+
+
+class TestIdleReaping:
+    """Тесты для heartbeat и закрытия простаивающих соединений."""
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_then_reap(self):
+        """Тест heartbeat молчащему клиенту и закрытия после таймаута."""
+        hub = SessionHub(redis=None, heartbeat_interval=2.0, idle_timeout=5.0)
+        session = Session(FakeWebSocket(), 1, now=0.0)
+        hub.register(session)
+
+        hub.check_idle(now=2.0)
+        await asyncio.sleep(0)
+        assert session.websocket.sent == [{"status": "ping"}]
+
+        hub.check_idle(now=5.0)
+        await asyncio.sleep(0.01)
+        assert len(hub) == 0
+        assert session.websocket.closed == 1001
+
+    @pytest.mark.asyncio
+    async def test_activity_postpones_reaping(self):
+        """Тест продления срока при активности клиента."""
+        hub = SessionHub(redis=None, idle_timeout=5.0)
+        session = Session(FakeWebSocket(), 1, now=0.0)
+        hub.register(session)
+
+        session.last_seen = 4.0
+        hub.check_idle(now=5.0)
+        assert len(hub) == 1
+
+        hub.check_idle(now=9.0)
+        await asyncio.sleep(0)
+        assert len(hub) == 0
+
+    @pytest.mark.asyncio
+    async def test_disconnected_session_skipped(self):
+        """Тест пропуска уже отключенной сессии."""
+        hub = SessionHub(redis=None, idle_timeout=5.0)
+        session = Session(FakeWebSocket(), 1, now=0.0)
+        hub.register(session)
+        hub.unregister(session)
+
+        hub.check_idle(now=10.0)
+        await asyncio.sleep(0)
+        assert session.websocket.closed is None
+
+
+class FakePublisher:
+    """Публикатор с заданным диапазоном опубликованных seq."""
+
+    def __init__(self, start_seq=0, next_seq=0):
+        self.start_seq = start_seq
+        self.next_seq = next_seq
+        self.ended = False
+        self.ends = 0
+
+    async def end(self):
+        self.ended = True
+        self.ends += 1
+
+
+class TestDrain:
+    """Тесты для вывода шлюза из работы."""
+
+    @pytest.mark.asyncio
+    async def test_idle_session_closed_immediately(self):
+        """Тест закрытия сессии без транскриптов в обработке."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = FakePublisher()
+        hub.register(session)
+
+        await asyncio.wait_for(hub.drain(timeout=1.0), 1.0)
+
+        assert session.websocket.sent[0]["status"] == "draining"
+        assert session.websocket.closed == 1012
+        assert len(hub) == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_inflight_transcripts(self):
+        """Тест ожидания транскриптов опубликованного аудио."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = FakePublisher(start_seq=0, next_seq=2)
+        hub.register(session)
+
+        drain = asyncio.create_task(hub.drain(timeout=5.0))
+        await asyncio.sleep(0.01)
+        assert session.inflight == 2
+        assert session.websocket.closed is None
+
+        hub.route(transcript(1, 0), now=0.0)
+        hub.route(transcript(1, 0), now=0.0)
+        assert session.inflight == 1
+        hub.route(transcript(1, 1), now=0.0)
+        await asyncio.wait_for(drain, 1.0)
+
+        statuses = [item["status"] for item in session.websocket.sent]
+        assert statuses == ["draining", "transcript", "transcript"]
+        assert session.websocket.closed == 1012
+
+    @pytest.mark.asyncio
+    async def test_waits_for_final_of_open_utterance(self):
+        """Тест закрытия после итога фразы, выданного по концу сессии."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = FakePublisher(start_seq=0, next_seq=1)
+        hub.register(session)
+
+        drain = asyncio.create_task(hub.drain(timeout=5.0))
+        await asyncio.sleep(0.01)
+        hub.route(json.dumps({"client_id": 1, "text": "hel", "seq": 0,
+                              "status": "partial"}).encode(), now=0.0)
+        await asyncio.sleep(0.01)
+        assert session.inflight == 0
+        assert session.publisher.ends == 1
+        assert session.websocket.closed is None
+
+        hub.route(json.dumps({"client_id": 1, "text": "hello",
+                              "status": "final"}).encode(), now=0.0)
+        await asyncio.wait_for(drain, 1.0)
+
+        statuses = [item["status"] for item in session.websocket.sent]
+        assert statuses == ["draining", "partial", "final"]
+        assert session.websocket.closed == 1012
+        assert session.publisher.ends == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_forces_close(self):
+        """Тест закрытия сессии по истечении срока вывода."""
+        hub = SessionHub(redis=None)
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = FakePublisher(start_seq=0, next_seq=1)
+        hub.register(session)
+
+        await asyncio.wait_for(hub.drain(timeout=0.05), 1.0)
+
+        assert session.websocket.closed == 1012
+        assert session.inflight == 1
+
+    @pytest.mark.asyncio
+    async def test_transcripts_of_previous_connection_not_counted(self):
+        """Тест учета только seq, опубликованных текущим соединением."""
+        session = Session(FakeWebSocket(), 1)
+        session.publisher = FakePublisher(start_seq=5, next_seq=6)
+
+        session.track_transcript({"seq": 3})
+        assert session.inflight == 1
+        session.track_transcript({"seq": 5})
+        assert session.inflight == 0
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import json
+import pytest
+import sys
+import os
+import time
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from audio_queue import publish_audio  # type: ignore
+from constants import AUDIO_STREAM, BULK_AUDIO_STREAM  # type: ignore
+from sharding import (  # type: ignore
+    HashRing,
+    ShardRouter,
+    load_shards,
+    shard_stream,
+)
+
+KEYS = [f"client-{index}" for index in range(10000)]
+
+
+def owners(ring):
+    return {key: ring.get(key) for key in KEYS}
+
+
+class FakeRedis:
+    """Redis с множеством шардов и записью добавленных в потоки сообщений."""
+
+    def __init__(self, shards):
+        self.shards = shards
+        self.reads = 0
+        self.added = []
+
+    async def zrange(self, key, start, end, withscores=False):
+        self.reads += 1
+        return [(shard.encode(), score) for shard, score in self.shards.items()]
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        self.added.append((stream, json.loads(fields["data"])))
+
+
+class TestHashRing:
+    """Тесты для кольца консистентного хеширования."""
+
+    def test_empty_ring(self):
+        """Тест кольца без шардов."""
+        assert HashRing().get("client") is None
+
+    def test_keys_spread_evenly(self):
+        """Тест равномерного распределения сессий по шардам."""
+        ring = HashRing(["w-0", "w-1", "w-2", "w-3"])
+        counts = {}
+        for owner in owners(ring).values():
+            counts[owner] = counts.get(owner, 0) + 1
+
+        assert set(counts) == {"w-0", "w-1", "w-2", "w-3"}
+        assert all(1500 < count < 3500 for count in counts.values())
+
+    def test_join_moves_only_new_shard_keys(self):
+        """Тест, что новый шард забирает около 1/N сессий и только себе."""
+        before = owners(HashRing(["w-0", "w-1", "w-2", "w-3"]))
+        after = owners(HashRing(["w-0", "w-1", "w-2", "w-3", "w-4"]))
+
+        moved = [key for key in KEYS if before[key] != after[key]]
+
+        assert all(after[key] == "w-4" for key in moved)
+        assert 0.1 < len(moved) / len(KEYS) < 0.3
+
+    def test_leave_moves_only_departed_shard_keys(self):
+        """Тест, что уход шарда переносит только его сессии."""
+        before = owners(HashRing(["w-0", "w-1", "w-2", "w-3"]))
+        after = owners(HashRing(["w-0", "w-1", "w-3"]))
+
+        moved = {key for key in KEYS if before[key] != after[key]}
+
+        assert moved == {key for key in KEYS if before[key] == "w-2"}
+
+
+class TestShardRouting:
+    """Тесты для маршрутизации аудио сессий по шардам."""
+
+    @pytest.mark.asyncio
+    async def test_load_shards(self):
+        """Тест разделения шардов на живые и выведенные."""
+        now = time.time() * 1000
+        redis = FakeRedis({"w-0": now + 5000, "w-1": now - 10})
+
+        live, retired = await load_shards(redis)
+
+        assert live == ["w-0"]
+        assert retired == {"w-1": now - 10}
+
+    @pytest.mark.asyncio
+    async def test_router_refreshes_once_per_interval(self):
+        """Тест чтения состава шардов не чаще периода обновления."""
+        redis = FakeRedis({"w-0": time.time() * 1000 + 5000})
+        router = ShardRouter(vnodes=16, refresh_ms=60000)
+
+        for key in KEYS[:100]:
+            assert await router.route(redis, key) == "w-0"
+
+        assert redis.reads == 1
+
+    @pytest.mark.asyncio
+    async def test_sessions_published_to_shard_streams(self):
+        """Тест, что чанки сессии идут в поток ее шарда, а пакетные — в общий."""
+        expires = time.time() * 1000 + 5000
+        redis = FakeRedis({"w-0": expires, "w-1": expires})
+        router = ShardRouter(vnodes=16, refresh_ms=60000)
+        ring = HashRing(["w-0", "w-1"], 16)
+
+        with patch("audio_queue.is_audio_sharding_enabled", return_value=True), \
+                patch("audio_queue.is_audio_stream_enabled", return_value=True), \
+                patch("audio_queue.get_shard_router", return_value=router):
+            for client_id in ("a", "b", "c", "d"):
+                for seq in range(2):
+                    await publish_audio(
+                        redis, json.dumps({"client_id": client_id, "seq": seq}),
+                        key=client_id)
+            await publish_audio(redis, json.dumps({"job_id": "j"}), bulk=True)
+
+        for stream, payload in redis.added[:-1]:
+            assert stream == shard_stream(ring.get(payload["client_id"]))
+        assert redis.added[-1][0] == BULK_AUDIO_STREAM
+
+    @pytest.mark.asyncio
+    async def test_no_live_shards_falls_back_to_shared_stream(self):
+        """Тест отправки в общий поток, пока ни один шард не зарегистрирован."""
+        redis = FakeRedis({})
+
+        with patch("audio_queue.is_audio_sharding_enabled", return_value=True), \
+                patch("audio_queue.is_audio_stream_enabled", return_value=True), \
+                patch("audio_queue.get_shard_router",
+                      return_value=ShardRouter(16, 60000)):
+            await publish_audio(redis, json.dumps({"client_id": "a"}), key="a")
+
+        assert redis.added[0][0] == AUDIO_STREAM
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
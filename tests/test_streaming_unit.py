@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import base64
+import json
+import pytest
+import sys
+import os
+import struct
+from unittest.mock import patch
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from sessions import build_transcript_response  # type: ignore
+from streaming import StreamingDecoder, is_silence  # type: ignore
+
+# 100 мс 16-битного моно-аудио 16 кГц: речь и тишина
+SPEECH = struct.pack("<1600h", *([3000, -3000] * 800))
+SILENCE = bytes(3200)
+
+
+def chunk(seq, client_id="c1", **fields):
+    return {"client_id": client_id, "seq": seq, **fields}
+
+
+def create_decoder(**overrides):
+    options = {"max_sessions": 100, "idle_timeout": 10.0,
+               "max_utterance_ms": 1000, "silence_level": 500}
+    options.update(overrides)
+    return StreamingDecoder(**options)
+
+
+class TestStreamingDecoder:
+    """Тесты для состояний фраз сессий в воркере."""
+
+    def test_silence_detection(self):
+        """Тест определения тишины по пиковой амплитуде."""
+        assert is_silence(SILENCE, 2, 500)
+        assert not is_silence(SPEECH, 2, 500)
+        assert is_silence(struct.pack("<2h", 100, -499), 2, 500)
+        assert is_silence(b"", 2, 500)
+
+    def test_partials_then_final_on_silence(self):
+        """Тест промежуточных транскриптов фразы и итога на паузе."""
+        decoder = create_decoder()
+
+        first, _ = decoder.feed(chunk(0), SPEECH, 0.0)
+        second, _ = decoder.feed(chunk(1), SPEECH, 0.1)
+        final, _ = decoder.feed(chunk(2), SILENCE, 0.2)
+        idle, _ = decoder.feed(chunk(3), SILENCE, 0.3)
+        after, _ = decoder.feed(chunk(4), SPEECH, 0.4)
+
+        assert [first.status, second.status, final.status] == [
+            "partial", "partial", "final"]
+        assert "1 chunks, 100 ms" in first.text
+        assert "2 chunks, 200 ms" in final.text
+        assert final.utterance == first.utterance == 0
+        assert (idle.status, idle.text) == ("partial", "")
+        assert (after.status, after.utterance) == ("partial", 1)
+
+    def test_final_at_max_utterance(self):
+        """Тест принудительного завершения слишком длинной фразы."""
+        decoder = create_decoder(max_utterance_ms=300)
+
+        statuses = [decoder.feed(chunk(seq), SPEECH, seq)[0].status
+                    for seq in range(4)]
+
+        assert statuses == ["partial", "partial", "final", "partial"]
+
+    def test_end_of_session(self):
+        """Тест итога незавершенной фразы в конце сессии."""
+        decoder = create_decoder()
+        decoder.feed(chunk(0, stream_id=7), SPEECH, 0.0)
+
+        assert decoder.end({"client_id": "c1"}) == []
+        final, = decoder.end({"client_id": "c1", "stream_id": 7})
+
+        assert final.status == "final"
+        assert final.source() == {"client_id": "c1", "stream_id": 7}
+        assert len(decoder) == 0
+
+    def test_idle_sessions_expire(self):
+        """Тест завершения фраз и удаления простаивающих сессий."""
+        decoder = create_decoder(idle_timeout=5.0)
+        decoder.feed(chunk(0, "a"), SPEECH, 0.0)
+        decoder.feed(chunk(0, "b"), SILENCE, 1.0)
+        decoder.feed(chunk(0, "c"), SPEECH, 4.0)
+
+        finals = decoder.expire(6.0)
+
+        assert [final.client_id for final in finals] == ["a"]
+        assert len(decoder) == 1
+
+    def test_sessions_bounded(self):
+        """Тест вытеснения самой давней сессии сверх лимита с ее итогом."""
+        decoder = create_decoder(max_sessions=2)
+        decoder.feed(chunk(0, "a"), SPEECH, 0.0)
+        decoder.feed(chunk(0, "b"), SPEECH, 1.0)
+        decoder.feed(chunk(1, "a"), SPEECH, 2.0)
+
+        _, evicted = decoder.feed(chunk(0, "c"), SPEECH, 3.0)
+
+        assert [final.client_id for final in evicted] == ["b"]
+        assert len(decoder) == 2
+
+
+class FakePipeline:
+    def __init__(self, published):
+        self.published = published
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, message):
+        self.published.append(json.loads(message))
+
+    async def execute(self):
+        return []
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.published)
+
+
+class TestStreamingWorker:
+    """Тесты для потоковых транскриптов в воркере и шлюзе."""
+
+    @pytest.mark.asyncio
+    async def test_worker_streams_partial_and_final(self):
+        """Тест сообщений воркера по чанкам и по концу сессии."""
+        import workers  # type: ignore
+        redis = FakeRedis()
+        with patch("workers.create_transcript_cache", return_value=None), \
+                patch("workers.is_dedup_redis_enabled", return_value=False):
+            context = workers.WorkerContext(redis)
+            context.streaming = create_decoder()
+
+            for seq, audio in enumerate((SPEECH, SILENCE, SPEECH)):
+                await workers.handle_audio_message(context, {
+                    "client_id": "c1", "seq": seq,
+                    "audio": base64.b64encode(audio).decode("utf-8")})
+            await workers.handle_audio_message(
+                context, {"client_id": "c1", "end": True})
+
+        statuses = [(message["status"], message.get("seq"))
+                    for message in redis.published]
+        assert statuses == [("partial", 0), ("final", 1), ("partial", 2),
+                            ("final", None)]
+        assert redis.published[-1]["utterance"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reopened_stream_ends_again(self):
+        """Тест конца сессии при каждом закрытии повторно открытого потока."""
+        from types import SimpleNamespace
+        from ws import handle_stream_control  # type: ignore
+        hub = SimpleNamespace(redis=None, batcher=None, chunk_advisor=None)
+        streams, publishers, ends = {}, {}, []
+
+        class FakeWebSocket:
+            async def send_json(self, data):
+                pass
+
+        async def publish_audio(redis, message, **kwargs):
+            ends.append(json.loads(message))
+
+        with patch("ws.publish_audio", publish_audio), \
+                patch("ws.is_transcript_streaming_enabled", return_value=True):
+            for message_type in ("open", "close", "open", "close"):
+                await handle_stream_control(
+                    FakeWebSocket(), hub, "c1",
+                    {"type": message_type, "stream_id": 7},
+                    streams, publishers)
+
+        assert [message["stream_id"] for message in ends] == [7, 7]
+        assert all(message["end"] for message in ends)
+
+    def test_gateway_forwards_status(self):
+        """Тест пересылки статуса и номера фразы клиенту."""
+        response = build_transcript_response(
+            {"client_id": "c1", "text": "t", "status": "final",
+             "utterance": 3, "seq": 5}, "c1")
+        legacy = build_transcript_response({"client_id": "c1", "text": "t"},
+                                           "c1")
+
+        assert response["status"] == "final"
+        assert response["utterance"] == 3
+        assert response["seq"] == 5
+        assert legacy["status"] == "transcript"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import pytest
+from unittest.mock import AsyncMock
+import sys
+import os
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+)
+
+from metrics import Histogram, metrics  # type: ignore
+from transcript_cache import TranscriptCache, audio_key  # type: ignore
+
+
+class TestTranscriptCache:
+    """Тесты для кэша транскриптов."""
+
+    def test_audio_key_stable(self):
+        """Тест детерминированного ключа для одинаковых данных."""
+        assert audio_key(b"hold music") == audio_key(b"hold music")
+        assert audio_key(b"hold music") != audio_key(b"ivr prompt")
+
+    @pytest.mark.asyncio
+    async def test_hit_and_miss(self):
+        """Тест попадания и промаха локального уровня."""
+        cache = TranscriptCache(max_bytes=1024)
+        hits = metrics.counters.get("transcript_cache_hits_local", 0)
+        misses = metrics.counters.get("transcript_cache_misses", 0)
+
+        assert await cache.get("k1") is None
+        await cache.set("k1", "text")
+
+        assert await cache.get("k1") == "text"
+        assert metrics.counters["transcript_cache_hits_local"] == hits + 1
+        assert metrics.counters["transcript_cache_misses"] == misses + 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_bytes(self):
+        """Тест вытеснения самой старой записи при превышении лимита."""
+        cache = TranscriptCache(max_bytes=20)
+
+        await cache.set("a", "123456789")
+        await cache.set("b", "123456789")
+        await cache.get("a")
+        await cache.set("c", "123456789")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "123456789"
+        assert cache.size <= 20
+
+    @pytest.mark.asyncio
+    async def test_redis_tier(self):
+        """Тест чтения из общего Redis-уровня при промахе локального."""
+        redis = AsyncMock()
+        redis.get = AsyncMock(return_value=b"shared text")
+        cache = TranscriptCache(max_bytes=1024, redis=redis, ttl=60)
+
+        assert await cache.get("k1") == "shared text"
+        # Повторное чтение обслуживается локальным уровнем
+        assert await cache.get("k1") == "shared text"
+        redis.get.assert_called_once()
+
+        await cache.set("k2", "text")
+        redis.set.assert_called_once()
+        assert redis.set.call_args.kwargs["ex"] == 60
+
+
+class TestMetrics:
+    """Тесты для реестра метрик."""
+
+    def test_histogram_buckets(self):
+        """Тест распределения наблюдений по бакетам."""
+        histogram = Histogram((0.1, 1.0))
+
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {"0.1": 1, "1.0": 2, "+Inf": 1}
+        assert snapshot["count"] == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])